@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Benchmark of Checksummer throughput by file size class.
+
+Creates a set of files in each size class in a temporary folder and reports
+the hashing throughput in MB/s for a range of buffer sizes and with memory
+mapping. Files are hashed once before timing so the figures are for the page
+cache, use --cold to advise the kernel to drop the cached pages first.
+
+Usage: python benchmarks/checksum_benchmark.py [--algorithm SHA-256] [--total-mb 64]
+"""
+import argparse
+import os
+from pathlib import Path
+import tempfile
+import time
+
+from eark_validator.infopacks.manifest import Checksummer
+from eark_validator.model import ChecksumAlg
+
+KIB = 1024
+MIB = 1024 * KIB
+SIZE_CLASSES = {
+    '4 KiB': 4 * KIB,
+    '64 KiB': 64 * KIB,
+    '1 MiB': MIB,
+    '16 MiB': 16 * MIB,
+    '128 MiB': 128 * MIB
+}
+CONFIGURATIONS = {
+    '4 KiB buffer': { 'buffer_size': 4 * KIB },
+    '1 MiB buffer': { 'buffer_size': MIB },
+    '8 MiB buffer': { 'buffer_size': 8 * MIB },
+    'mmap': { 'buffer_size': MIB, 'mmap_threshold': 0 }
+}
+
+def _create_files(folder: Path, size: int, total: int) -> list[Path]:
+    block = os.urandom(min(size, MIB))
+    paths = []
+    for index in range(max(1, total // size)):
+        path = folder.joinpath(f'{size}-{index}.bin')
+        with open(path, 'wb') as dest:
+            for _ in range(size // len(block)):
+                dest.write(block)
+        paths.append(path)
+    return paths
+
+def _drop_cache(paths: list[Path]) -> None:
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    for path in paths:
+        with open(path, 'rb') as file:
+            os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+def _throughput(summer: Checksummer, paths: list[Path], cold: bool) -> float:
+    if cold:
+        _drop_cache(paths)
+    start = time.perf_counter()
+    total = 0
+    for path in paths:
+        summer.hash_file(path)
+        total += path.stat().st_size
+    return total / MIB / (time.perf_counter() - start)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Checksummer throughput by file size class.')
+    parser.add_argument('--algorithm', default='SHA-256', help='checksum algorithm to use')
+    parser.add_argument('--total-mb', type=int, default=64,
+                        help='approximate MiB of data hashed per size class')
+    parser.add_argument('--cold', action='store_true',
+                        help='advise the kernel to drop cached pages before each run')
+    args = parser.parse_args()
+    algorithm = ChecksumAlg.from_string(args.algorithm)
+    print(f'{"size class":>10} {"configuration":>14} {"MB/s":>10}')
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name, size in SIZE_CLASSES.items():
+            paths = _create_files(Path(temp_dir), size, max(size, args.total_mb * MIB))
+            for label, options in CONFIGURATIONS.items():
+                summer = Checksummer(algorithm, **options)
+                _throughput(summer, paths, False)
+                rate = _throughput(summer, paths, args.cold)
+                print(f'{name:>10} {label:>14} {rate:>10.1f}')
+            for path in paths:
+                path.unlink()
+
+if __name__ == '__main__':
+    main()
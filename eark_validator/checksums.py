@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Verification of the file sizes and checksums declared in package METS files."""
+from functools import partial
+import posixpath
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from eark_validator.infopacks.archives import archive_type, hash_members, hash_zip_entries
+from eark_validator.infopacks.checksum_cache import ChecksumCache
+from eark_validator.infopacks.hardlinks import HardlinkDigests
+from eark_validator.infopacks.locality import order_entries
+from eark_validator.infopacks.manifest import ChecksumVerifier, DigestMap, MultiChecksummer
+from eark_validator.infopacks.package_handler import PackageContext
+from eark_validator.infopacks.package_view import PackageView
+from eark_validator.infopacks.throttle import IOThrottle
+from eark_validator.mets import MetsFiles
+from eark_validator.model import ArchiveType, Checksum, FileOrder, ManifestEntry, Result, Severity
+from eark_validator.model.validation_report import ChecksumResults, MetadataStatus
+
+METS_NAME = 'METS.xml'
+REPS = 'representations'
+FILE_PREFIX = 'file://./'
+SIZE_RULE = 'CSIP69'
+CHECKSUM_RULE = 'CSIP71'
+LOCATION_RULE = 'CSIP79'
+
+def validate(context: PackageContext, workers: Optional[int]=None,
+             cache: Optional[ChecksumCache]=None,
+             throttle: Optional[IOThrottle]=None,
+             order: FileOrder=FileOrder.MANIFEST,
+             links: Optional[HardlinkDigests]=None) -> Tuple[bool, ChecksumResults]:
+    """Compare the size and checksum of every file referenced by the package
+    and representation METS files with the package content.
+
+    File entries are streamed from the METS files and checked by up to
+    workers threads. Sizes are compared first, files of the wrong size are
+    not hashed. If the package is on disk digests of unchanged files are
+    taken from the optional checksum cache and files with several hard links
+    are only read once. Reads are rate limited by the optional throttle.
+
+    Files are checked in METS document order by default. Other orders, e.g.
+    physical order to reduce seeking, apply to packages on disk and need all
+    of the entries to be read first.
+
+    Archived packages whose payload hasn't been extracted are verified by
+    streaming the archive members through the hashers, so no payload is
+    written to disk. Files hashed while the archive was unpacked, see
+    PackageHandler.prepare_context, are checked against the recorded digests
+    without being read again, an archive whose files were all hashed isn't
+    read at all."""
+    if context.is_archive and not context.is_extracted:
+        return _validate_archive(context, workers, throttle)
+    messages: List[Result] = []
+    file_count = 0
+    verifier = ChecksumVerifier(workers, cache)
+    cache = cache if context.is_extracted else None
+    links = links if links is not None else HardlinkDigests()
+    digests = DigestMap(context.manifest) if context.is_extracted and context.manifest else None
+    entries: Iterable[ManifestEntry] = _mets_entries(context.view)
+    if order != FileOrder.MANIFEST and context.is_extracted:
+        entries = order_entries(context.root, entries, order)
+    for _, results in verifier.run(partial(_check_entry, context, cache=cache, throttle=throttle,
+                                           links=links, digests=digests),
+                                   entries, largest_first=False):
+        file_count += 1
+        messages.extend(results)
+    return _checksum_results(file_count, messages)
+
+def _validate_archive(context: PackageContext, workers: Optional[int]=None,
+                      throttle: Optional[IOThrottle]=None) -> Tuple[bool, ChecksumResults]:
+    """Verify the METS file entries of an archived package against its members.
+
+    Entries are streamed from the METS files, those with digests recorded
+    while the archive was unpacked are checked without reading it. ZIP
+    members are looked up in the central directory as entries are read, so
+    memory doesn't grow with the number of entries. TAR members can only be
+    read in archive order, so the remaining entries are held, one per
+    member, until the archive has been read once."""
+    messages: List[Result] = []
+    file_count = 0
+    digests = DigestMap(context.manifest) if context.manifest else None
+    def _unverified() -> Iterator[tuple[str, ManifestEntry]]:
+        nonlocal file_count
+        for entry in _mets_entries(context.view):
+            file_count += 1
+            location = str(entry.path)
+            normalised = posixpath.normpath(location)
+            if normalised.startswith(('../', '/')) or normalised == '..':
+                messages.append(_result(LOCATION_RULE, location,
+                                        f'File {location} is not within the package.'))
+                continue
+            recorded = digests.get(normalised) if digests is not None else None
+            if recorded is not None and recorded.size != entry.size:
+                messages.extend(_compare(entry, recorded.size, []))
+                continue
+            calculated = digests.lookup(normalised, entry.size,
+                                        [ checksum.algorithm for checksum in entry.checksums ]) \
+                if recorded is not None else None
+            if calculated is not None:
+                messages.extend(_compare(entry, entry.size, calculated))
+                continue
+            yield f'{context.root.name}/{normalised}', entry
+    if archive_type(context.original_path) == ArchiveType.ZIP:
+        for entry, size, calculated in hash_zip_entries(context.original_path, _unverified(),
+                                                        workers, throttle):
+            if size is None:
+                messages.append(_result(LOCATION_RULE, str(entry.path),
+                                        f'File {entry.path} is missing.'))
+            else:
+                messages.extend(_compare(entry, size, calculated))
+        return _checksum_results(file_count, messages)
+    entries: dict[str, ManifestEntry] = {}
+    for name, entry in _unverified():
+        entries.setdefault(name, entry)
+    wanted = { name: (entry.size, [ checksum.algorithm for checksum in entry.checksums ])
+               for name, entry in entries.items() }
+    hashed = hash_members(context.original_path, wanted, workers, throttle) if wanted else ()
+    for name, size, calculated in hashed:
+        entry = entries.pop(name)
+        messages.extend(_compare(entry, size, calculated))
+    messages.extend(_result(LOCATION_RULE, str(entry.path), f'File {entry.path} is missing.')
+                    for entry in entries.values())
+    return _checksum_results(file_count, messages)
+
+def _checksum_results(file_count: int, messages: List[Result]) -> Tuple[bool, ChecksumResults]:
+    # Results arrive in completion order, sort them for a stable report
+    messages.sort(key=lambda result: (result.location, result.rule_id))
+    status = MetadataStatus.INVALID if messages else MetadataStatus.VALID
+    return not messages, ChecksumResults.model_validate({
+        'status': status,
+        'file_count': file_count,
+        'messages': messages
+        })
+
+def _mets_entries(view: PackageView) -> Iterator[ManifestEntry]:
+    """Yield a manifest entry, with a path relative to the package root, for
+    each file referenced by the package and representation METS files."""
+    mets_paths = [ METS_NAME ]
+    if view.is_dir(REPS):
+        folders, _ = view.list_dir(REPS)
+        mets_paths.extend(f'{REPS}/{rep}/{METS_NAME}' for rep in sorted(folders))
+    for mets_path in mets_paths:
+        if not view.is_file(mets_path):
+            continue
+        prefix = mets_path[:-len(METS_NAME)]
+        with view.open(mets_path) as mets_stream:
+            for entry in MetsFiles.iter_file_entries(mets_stream, mets_path):
+                path = str(entry.path)
+                path = path[len(FILE_PREFIX):] if path.startswith(FILE_PREFIX) else path
+                yield ManifestEntry.model_validate({
+                    'path': prefix + path,
+                    'size': entry.size,
+                    'checksums': [ entry.checksum ]
+                    })
+
+def _check_entry(context: PackageContext, entry: ManifestEntry,
+                 cache: Optional[ChecksumCache]=None,
+                 throttle: Optional[IOThrottle]=None,
+                 links: Optional[HardlinkDigests]=None,
+                 digests: Optional[DigestMap]=None) -> List[Result]:
+    view: PackageView = context.view
+    location = str(entry.path)
+    try:
+        if not view.is_file(location):
+            return [ _result(LOCATION_RULE, location, f'File {location} is missing.') ]
+        size = view.size(location)
+    except ValueError:
+        return [ _result(LOCATION_RULE, location, f'File {location} is not within the package.') ]
+    if size != entry.size:
+        return _compare(entry, size, [])
+    recorded = digests.lookup(location, size, [ checksum.algorithm for checksum in entry.checksums ]) \
+        if digests is not None else None
+    if recorded is not None:
+        return _compare(entry, size, recorded)
+    summer = MultiChecksummer([ checksum.algorithm for checksum in entry.checksums ], cache=cache,
+                              throttle=throttle, links=links)
+    if context.is_extracted:
+        calculated = summer.hash_file(context.root.joinpath(location))
+    else:
+        with view.open(location) as stream:
+            calculated = summer.hash_stream(stream)
+    return _compare(entry, size, calculated)
+
+def _compare(entry: ManifestEntry, size: int, calculated: List[Checksum]) -> List[Result]:
+    """Return the results for a file's size and calculated checksums, the
+    checksums aren't compared if the size is wrong."""
+    location = str(entry.path)
+    if size != entry.size:
+        return [ _result(SIZE_RULE, location,
+                         f'File {location} METS size {entry.size}, file size {size}.') ]
+    return [ _result(CHECKSUM_RULE, location,
+                     f'File {location} METS {expected.algorithm.value} checksum '
+                     f'{expected.value}, calculated checksum {actual.value}.')
+             for expected, actual in zip(entry.checksums, calculated)
+             if expected != actual ]
+
+def _result(rule_id: str, location: str, message: str) -> Result:
+    return Result.model_validate({
+        'rule_id': rule_id,
+        'location': location,
+        'message': message,
+        'severity': Severity.ERROR
+        })
@@ -37,6 +37,7 @@ import argparse
 
 from eark_validator.model import ValidationReport
 import eark_validator.packages as PACKAGES
+from eark_validator.infopacks.checksum_cache import ChecksumCache
 from eark_validator.infopacks.package_handler import PackageHandler
 from eark_validator.specifications.specification import SpecificationVersion
 
@@ -73,6 +74,11 @@ def parse_command_line():
                         dest='inputChecksumFlag',
                         default=False,
                         help='Calculate and verify package checksums.')
+    PARSER.add_argument('--checksum-cache',
+                        dest='checksum_cache',
+                        default=None,
+                        metavar='DB',
+                        help='SQLite file used to cache checksums of unchanged files between runs.')
     PARSER.add_argument('-m', '--manifest',
                         action='store_true',
                         dest='inputManifestFlag',
@@ -122,17 +128,23 @@ def main():
         print(json.dumps(ValidationReport.model_json_schema(), indent=2))
         sys.exit(0)
 
+    cache = ChecksumCache(Path(args.checksum_cache)) if args.checksum_cache else None
     # Iterate the file arguments
     for file_arg in args.files:
-        _loop_exit, _ = _validate_ip(file_arg, args.specification_version)
+        _loop_exit, _ = _validate_ip(file_arg, args.specification_version,
+                                     args.inputChecksumFlag, cache)
         _exit = _loop_exit if (_loop_exit > 0) else _exit
+    if cache is not None:
+        cache.close()
     sys.exit(_exit)
 
-def _validate_ip(path: str, version: SpecificationVersion) -> Tuple[int, Optional[ValidationReport]]:
+def _validate_ip(path: str, version: SpecificationVersion, checksums: bool=False,
+                 cache: Optional[ChecksumCache]=None) -> Tuple[int, Optional[ValidationReport]]:
     ret_stat, checked_path = _check_path(path)
     if ret_stat > 0:
         return ret_stat, None
-    report = PACKAGES.PackageValidator(checked_path, version).validation_report
+    report = PACKAGES.PackageValidator(checked_path, version, checksums=checksums,
+                                       checksum_cache=cache).validation_report
     print(f'Path {checked_path}, struct result is: {report.structure.status.value}')
     # for message in report.structure.messages:
     print(report.model_dump_json())
@@ -0,0 +1,810 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Member level access to archived information packages.
+"""
+import bz2
+from functools import lru_cache
+import lzma
+import os
+from pathlib import Path, PurePosixPath
+import shutil
+from stat import S_ISREG
+import struct
+import tarfile
+import tempfile
+import threading
+import time
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional
+import zipfile
+import zlib
+
+from eark_validator.const import NO_PATH
+from eark_validator.infopacks.concurrency import AdaptiveConcurrency, run_bounded
+from eark_validator.infopacks.throttle import IOThrottle
+from eark_validator.model import (
+    ArchiveType,
+    Checksum,
+    ChecksumAlg,
+    ExtractionBudget,
+    Fingerprint,
+    FingerprintStrategy,
+    ManifestEntry,
+    ThroughputStatistics
+)
+
+REPRESENTATIONS = 'representations'
+DATA = 'data'
+CHUNK_SIZE = 1024 * 1024
+SAMPLE_SIZE = 64 * 1024
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+TAR_BLOCK = 512
+ZIP_MAGIC = (b'PK\x03\x04', b'PK\x05\x06')
+COMPRESSED_TAR_MAGIC = (
+    (b'\x1f\x8b', ArchiveType.TAR_GZ, lambda: zlib.decompressobj(16 + zlib.MAX_WBITS)),
+    (b'BZh', ArchiveType.TAR_BZ2, bz2.BZ2Decompressor),
+    (b'\xfd7zXZ\x00', ArchiveType.TAR_XZ, lzma.LZMADecompressor)
+)
+
+class PackageError(Exception):
+    """Exception used to mark validation error when unpacking archive."""
+
+class ExtractionLimitError(PackageError):
+    """PackageError raised when an extraction exceeds its ExtractionBudget."""
+    def __init__(self, limit: str, maximum: float, value: float):
+        super().__init__(f'Unpacking archive exceeds the {limit} limit of {maximum}: {value}.')
+        self.limit: str = limit
+        """The name of the exceeded ExtractionBudget field."""
+        self.maximum: float = maximum
+        self.value: float = value
+
+class BudgetTracker():
+    """Thread safe accounting of an extraction against an ExtractionBudget.
+
+    Members and bytes are charged as they're written so that limits are
+    enforced while extracting. Once a limit is exceeded every subsequent
+    charge raises, stopping any concurrent workers."""
+    def __init__(self, budget: Optional[ExtractionBudget], archive_size: int):
+        self._budget: ExtractionBudget = budget if budget else ExtractionBudget()
+        self._archive_size: int = max(1, archive_size)
+        self._start: float = time.monotonic()
+        self._members: int = 0
+        self._bytes: int = 0
+        self._exceeded: Optional[ExtractionLimitError] = None
+        self._lock = threading.Lock()
+
+    @property
+    def members(self) -> int:
+        """Returns the number of members charged."""
+        return self._members
+
+    @property
+    def bytes(self) -> int:
+        """Returns the number of uncompressed bytes charged."""
+        return self._bytes
+
+    def add_member(self) -> None:
+        """Charge an archive member, raising an ExtractionLimitError if a
+        limit is exceeded."""
+        with self._lock:
+            self._members += 1
+            self._check('max_members', self._budget.max_members, self._members)
+            self._check_time()
+
+    def add_bytes(self, count: int) -> None:
+        """Charge uncompressed bytes written, raising an ExtractionLimitError
+        if a limit is exceeded."""
+        with self._lock:
+            self._bytes += count
+            self._check('max_bytes', self._budget.max_bytes, self._bytes)
+            self._check('max_ratio', self._budget.max_ratio, self._bytes / self._archive_size)
+            self._check_time()
+
+    def check_declared(self, total_bytes: int) -> None:
+        """Check the uncompressed size declared by an archive's member
+        directory before extracting, so that over sized archives are
+        rejected before anything is written."""
+        with self._lock:
+            self._check('max_bytes', self._budget.max_bytes, total_bytes)
+            self._check('max_ratio', self._budget.max_ratio, total_bytes / self._archive_size)
+
+    def _check_time(self) -> None:
+        self._check('max_seconds', self._budget.max_seconds, time.monotonic() - self._start)
+
+    def _check(self, limit: str, maximum: Optional[float], value: float) -> None:
+        if self._exceeded:
+            raise ExtractionLimitError(self._exceeded.limit, self._exceeded.maximum,
+                                       self._exceeded.value)
+        if maximum is not None and value > maximum:
+            self._exceeded = ExtractionLimitError(limit, maximum, value)
+            raise self._exceeded
+
+def archive_type(to_test: Path) -> ArchiveType:
+    """Detect the archive format of a file from its magic bytes.
+
+    Results are memoized by path, size and modification time, so repeated
+    checks of the same file cost a single stat call. Compressed files are
+    only reported as TAR archives if their first decompressed block is a
+    valid TAR header. Files without a known magic number are reported as
+    ZIP archives if they end with a ZIP directory, e.g. self extracting
+    archives with data in front of the first member. Files that can't be
+    read aren't archives."""
+    try:
+        stat = os.stat(to_test)
+        if not S_ISREG(stat.st_mode):
+            return ArchiveType.NONE
+        return _sniff(os.path.abspath(to_test), stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        return ArchiveType.NONE
+
+@lru_cache(maxsize=1024)
+def _sniff(path: str, size: int, mtime_ns: int) -> ArchiveType: # pylint: disable=W0613
+    """Detect the archive type of the file at path, size and mtime_ns are
+    only used to key the cached result."""
+    with open(path, 'rb') as raw:
+        header = raw.read(TAR_BLOCK)
+        if header.startswith(ZIP_MAGIC):
+            return ArchiveType.ZIP
+        if _is_tar_header(header):
+            return ArchiveType.TAR
+        for magic, detected, decompressor in COMPRESSED_TAR_MAGIC:
+            if header.startswith(magic):
+                raw.seek(0)
+                if _is_tar_header(_decompress_block(raw, decompressor())):
+                    return detected
+                break
+        # Probe for the end of central directory record, as zipfile.is_zipfile
+        return ArchiveType.ZIP if zipfile.is_zipfile(raw) else ArchiveType.NONE
+
+def _decompress_block(raw: BinaryIO, decompressor) -> bytes:
+    """Decompress the start of a compressed stream, returning at least the
+    first TAR block if the stream holds that much data."""
+    block = b''
+    try:
+        while len(block) < TAR_BLOCK and not decompressor.eof:
+            chunk = raw.read(SAMPLE_SIZE)
+            if not chunk:
+                break
+            block += decompressor.decompress(chunk)
+    except (OSError, EOFError, zlib.error, lzma.LZMAError):
+        return b''
+    return block[:TAR_BLOCK]
+
+def _is_tar_header(block: bytes) -> bool:
+    """Returns True if block is a TAR member header with a valid checksum."""
+    if len(block) < TAR_BLOCK:
+        return False
+    try:
+        recorded = int(block[148:156].replace(b'\0', b' ').strip() or b'-1', 8)
+    except ValueError:
+        return False
+    # The checksum is calculated with the checksum field itself set to spaces,
+    # some writers sum signed bytes, both are accepted as they are by tarfile
+    unsigned = sum(block[:148]) + sum(block[156:512]) + 8 * ord(' ')
+    signed = sum(struct.unpack('148b8x356b', block[:512])) + 8 * ord(' ')
+    return recorded in (unsigned, signed)
+
+def member_parts(member_name: str) -> tuple[str, ...]:
+    """Returns the normalised path components of an archive member name."""
+    return PurePosixPath(member_name).parts
+
+def member_path(member_name: str) -> str:
+    """Returns the normalised archive member name, e.g. ./pkg/METS.xml and
+    pkg//METS.xml are both pkg/METS.xml."""
+    return PurePosixPath(member_name).as_posix()
+
+def is_payload(member_name: str) -> bool:
+    """Returns True if the archive member is representation payload, i.e. a
+    member of <root>/representations/<rep>/data rather than package metadata."""
+    parts = member_parts(member_name)
+    return len(parts) > 4 and parts[1] == REPRESENTATIONS and parts[3] == DATA
+
+def member_sizes(archive: Path) -> dict[str, int]:
+    """Returns a dictionary of the file member names of an archive and their
+    uncompressed sizes. TAR hard links are given the size of the member they
+    link to."""
+    if archive_type(archive) == ArchiveType.ZIP:
+        with zipfile.ZipFile(archive) as zip_ip:
+            return { info.filename: info.file_size for info in zip_ip.infolist()
+                     if not info.is_dir() }
+    sizes: dict[str, int] = {}
+    linked: dict[str, int] = {}
+    with tarfile.open(archive) as tar_ip:
+        for info in tar_ip:
+            if info.isfile():
+                sizes[info.name] = linked[member_path(info.name)] = info.size
+            elif info.islnk() and member_path(info.linkname) in linked:
+                sizes[info.name] = linked[member_path(info.linkname)]
+    return sizes
+
+def archive_root(archive: Path) -> str:
+    """Returns the name of the single root folder of an archived package,
+    read from the ZIP central directory or the TAR member headers without
+    extracting anything.
+
+    Raises:
+        PackageError: if the archive doesn't unpack to a single folder, i.e.
+            is not a CSIPSTR1 conformant package.
+    """
+    if archive_type(archive) == ArchiveType.ZIP:
+        with zipfile.ZipFile(archive) as zip_ip:
+            members = [ (info.filename, info.is_dir()) for info in zip_ip.infolist() ]
+    else:
+        with tarfile.open(archive) as tar_ip:
+            members = [ (info.name, info.isdir()) for info in tar_ip ]
+    check = RootCheck()
+    for name, is_dir in members:
+        check.add(name, is_dir)
+    return check.finish()
+
+class RootCheck():
+    """Incremental check that archive members share a single root folder.
+
+    Members are added as they are read from an archive, a PackageError is
+    raised as soon as a second root, or a file at the root, is seen."""
+    def __init__(self):
+        self._root: Optional[str] = None
+
+    def add(self, member_name: str, is_dir: bool=False) -> None:
+        """Check the next archive member, raising a PackageError if it breaks
+        the single root folder layout."""
+        parts = member_parts(member_name)
+        if not parts:
+            return
+        if self._root is None:
+            self._root = parts[0]
+        elif parts[0] != self._root:
+            raise PackageError('Unpacking archive yields more than one child, '
+                               f'{self._root} and {parts[0]}.')
+        if len(parts) == 1 and not is_dir:
+            raise PackageError(f'Unpacking archive yields a single file child {parts[0]}.')
+
+    def finish(self) -> str:
+        """Returns the name of the root folder, raising a PackageError if no
+        members have been added."""
+        if self._root is None:
+            raise PackageError('Unpacking archive yields 0 children.')
+        return self._root
+
+def extract_members(archive: Path, destination: Path, payload: bool=True,
+                    workers: Optional[int]=None, budget: Optional[ExtractionBudget]=None,
+                    throttle: Optional[IOThrottle]=None,
+                    controller: Optional[AdaptiveConcurrency]=None,
+                    algorithms: Iterable[ChecksumAlg]=(),
+                    entries: Optional[list[ManifestEntry]]=None) -> ThroughputStatistics:
+    """Extract an archive to destination. If payload is False representation
+    payload files are skipped, although their parent folders are created so
+    the package structure is complete.
+
+    ZIP members are extracted by up to workers threads, or as many as the
+    adaptive controller allows, see extract_zip. TAR archives are unpacked in
+    a single pass by stream_tar. Either way members are checked to be within
+    destination, charged against the budget as they're written and hashed
+    with algorithms while they're written. If entries is given an entry, with
+    the member name as path and its checksums, is appended for each file
+    written. If a throttle is given extraction is rate limited. Returns the
+    extraction throughput statistics."""
+    detected = archive_type(archive)
+    if detected == ArchiveType.ZIP:
+        return extract_zip(archive, destination, payload, workers, budget, throttle, controller,
+                           algorithms, entries)
+    start = time.perf_counter()
+    if not detected.is_tar:
+        return ThroughputStatistics()
+    _, listing = stream_tar(archive, destination, payload, algorithms, budget, throttle)
+    written = [ entry for entry in listing if payload or not is_payload(str(entry.path)) ]
+    if entries is not None:
+        entries.extend(written)
+    return ThroughputStatistics(files=len(written), bytes=sum(entry.size for entry in written),
+                                seconds=time.perf_counter() - start)
+
+def extract_zip(archive: Path, destination: Path, payload: bool=True,
+                workers: Optional[int]=None, budget: Optional[ExtractionBudget]=None,
+                throttle: Optional[IOThrottle]=None,
+                controller: Optional[AdaptiveConcurrency]=None,
+                algorithms: Iterable[ChecksumAlg]=(),
+                entries: Optional[list[ManifestEntry]]=None) -> ThroughputStatistics:
+    """Extract the members of a ZIP archive to destination in parallel.
+
+    All member names are checked and the folder tree is created before any
+    file is written. File members are then decompressed and written by a
+    bounded pool of threads, each reading through its own archive file handle,
+    zlib releases the GIL while decompressing. If payload is False
+    representation payload files are skipped but their folders are created.
+
+    The member count and declared sizes are checked against the budget
+    before anything is written, bytes are then charged as they're written.
+    The caller is responsible for removing the partial output if an
+    ExtractionLimitError is raised.
+
+    Args:
+        workers: the maximum number of extraction threads, defaults to
+            DEFAULT_WORKERS, 1 extracts members sequentially.
+        budget: the resource limits for the extraction, None for unlimited.
+        throttle: the rate limiter for the bytes written, None for unlimited.
+        controller: adapts the number of members written at once, within its
+            bounds, in place of workers.
+        algorithms: the checksum algorithms each member is hashed with as
+            it's written.
+        entries: if given an entry, with the member name as path, is appended
+            for each file written, with its checksums.
+
+    Returns:
+        ThroughputStatistics: the number and size of the files written.
+    """
+    start = time.perf_counter()
+    workers = max(1, workers or DEFAULT_WORKERS)
+    tracker = BudgetTracker(budget, os.path.getsize(archive))
+    with zipfile.ZipFile(archive) as zip_ip:
+        infos = zip_ip.infolist()
+    targets = [ (info, safe_target(destination, info.filename)) for info in infos ]
+    files: list[tuple[zipfile.ZipInfo, Path]] = [
+        (info, target) for info, target in targets
+        if not info.is_dir() and (payload or not is_payload(info.filename)) ]
+    for _ in infos:
+        tracker.add_member()
+    tracker.check_declared(sum(info.file_size for info, _ in files))
+    for info, target in targets:
+        (target if info.is_dir() else target.parent).mkdir(parents=True, exist_ok=True)
+    algorithms = list(algorithms)
+    written: list[tuple[zipfile.ZipInfo, list[Checksum]]] = []
+    if controller is None and (workers == 1 or len(files) < 2):
+        with zipfile.ZipFile(archive) as zip_ip:
+            for info, target in files:
+                written.append((info, _write_zip_member(zip_ip, info, target, tracker, throttle,
+                                                        algorithms)))
+    else:
+        handles = threading.local()
+        opened: list[zipfile.ZipFile] = []
+        def _extract(member: tuple[zipfile.ZipInfo, Path]) -> list[Checksum]:
+            if not hasattr(handles, 'zip_ip'):
+                handles.zip_ip = zipfile.ZipFile(archive)
+                opened.append(handles.zip_ip)
+            return _write_zip_member(handles.zip_ip, *member, tracker, throttle, algorithms)
+        try:
+            for (info, _), checksums in run_bounded(_extract, files, min(workers, len(files)),
+                                                    controller,
+                                                    lambda member: member[0].file_size):
+                written.append((info, checksums))
+        finally:
+            for zip_ip in opened:
+                zip_ip.close()
+        if controller is not None:
+            workers = controller.limit
+    if entries is not None:
+        entries.extend(ManifestEntry(path=info.filename, size=info.file_size, checksums=checksums)
+                       for info, checksums in written)
+    return ThroughputStatistics(files=len(files), bytes=sum(info.file_size for info, _ in files),
+                                seconds=time.perf_counter() - start,
+                                workers=min(workers, max(1, len(files))))
+
+def _write_zip_member(zip_ip: zipfile.ZipFile, info: zipfile.ZipInfo, target: Path,
+                      tracker: BudgetTracker, throttle: Optional[IOThrottle]=None,
+                      algorithms: Iterable[ChecksumAlg]=()) -> list[Checksum]:
+    with zip_ip.open(info) as source:
+        return write_member(source, target, algorithms, tracker, throttle)
+
+def extract_member(archive: Path, member_name: str, target: Path) -> None:
+    """Extract a single archive member to the file target. The member is
+    written to a temporary file that replaces target once complete, so
+    concurrent readers never see a partial file."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with open_member(archive, member_name) as source:
+        with tempfile.NamedTemporaryFile(dir=target.parent, delete=False) as partial:
+            shutil.copyfileobj(source, partial)
+    os.replace(partial.name, target)
+
+def extract_payload(archive: Path, destination: Path) -> None:
+    """Write the representation payload members of a TAR archive beneath
+    destination in a single sequential pass, so a compressed archive is only
+    decompressed once however many payload files are read. Hard links to
+    members that aren't payload are read at random once the pass is done."""
+    links: list[tuple[Path, str]] = []
+    with tarfile.open(archive, mode='r|*') as tar_ip:
+        for member in tar_ip:
+            if not is_payload(member.name) or not (member.isfile() or member.islnk()):
+                continue
+            target = safe_target(destination, member.name)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if member.isfile():
+                write_member(tar_ip.extractfile(member), target)
+                continue
+            linked = safe_target(destination, member.linkname)
+            if linked.is_file():
+                shutil.copyfile(linked, target)
+            else:
+                links.append((target, member.linkname))
+    for target, link_name in links:
+        extract_member(archive, link_name, target)
+
+def fingerprint(archive: Path,
+                strategy: FingerprintStrategy=FingerprintStrategy.STRUCTURE) -> Fingerprint:
+    """Calculate a fingerprint identifying an archive file.
+
+    Only the FULL strategy reads the entire archive. STRUCTURE reads the ZIP
+    central directory or the member headers of an uncompressed TAR, compressed
+    TAR archives can't be scanned without decompressing them so are sampled
+    instead. Every strategy but FULL includes the size, modification time and
+    inode of the archive file, so an archive edited in place, even without
+    changing its size, isn't mistaken for its earlier content."""
+    if strategy == FingerprintStrategy.FULL:
+        implementation = ChecksumAlg.get_implementation(ChecksumAlg.SHA1)
+        with open(archive, 'rb') as raw:
+            for chunk in iter(lambda: raw.read(CHUNK_SIZE), b''):
+                implementation.update(chunk)
+        return _fingerprint(strategy, implementation)
+    implementation = ChecksumAlg.get_implementation(ChecksumAlg.SHA1)
+    stat = os.stat(archive)
+    implementation.update(f'{stat.st_size}:{stat.st_mtime_ns}:{stat.st_ino}'.encode())
+    if strategy == FingerprintStrategy.STAT:
+        implementation.update(f':{stat.st_dev}'.encode())
+        return _fingerprint(strategy, implementation)
+    if strategy == FingerprintStrategy.STRUCTURE and _hash_structure(archive, implementation):
+        return _fingerprint(strategy, implementation)
+    with open(archive, 'rb') as raw:
+        for offset in sorted({ 0, max(0, stat.st_size // 2 - SAMPLE_SIZE // 2),
+                               max(0, stat.st_size - SAMPLE_SIZE) }):
+            raw.seek(offset)
+            implementation.update(raw.read(SAMPLE_SIZE))
+    return _fingerprint(FingerprintStrategy.SAMPLED, implementation)
+
+def _hash_structure(archive: Path, implementation) -> bool:
+    """Hash the member directory of an archive, returning False if the archive
+    has no directory that can be read without decompressing it."""
+    detected = archive_type(archive)
+    if detected == ArchiveType.ZIP:
+        with zipfile.ZipFile(archive) as zip_ip:
+            for info in zip_ip.infolist():
+                implementation.update(f'{info.filename}:{info.CRC}:{info.compress_size}:'
+                                      f'{info.file_size}:{info.header_offset}\n'.encode())
+        return True
+    if detected == ArchiveType.TAR:
+        with tarfile.open(archive, mode='r:') as tar_ip:
+            for info in tar_ip:
+                implementation.update(f'{info.name}:{info.size}:{info.mtime}:{info.chksum}:'
+                                      f'{info.offset_data}\n'.encode())
+        return True
+    return False
+
+def _fingerprint(strategy: FingerprintStrategy, implementation) -> Fingerprint:
+    return Fingerprint(strategy=strategy, value=implementation.hexdigest().upper())
+
+def stream_tar(archive: Path, destination: Path, payload: bool=True,
+               algorithms: Iterable[ChecksumAlg]=(),
+               budget: Optional[ExtractionBudget]=None,
+               throttle: Optional[IOThrottle]=None,
+               on_written: Optional[Callable[[str, Path], None]]=None
+               ) -> tuple[Checksum, list[ManifestEntry]]:
+    """Unpack a, possibly compressed, TAR archive in a single sequential pass.
+
+    While the archive is read once, start to finish, the SHA-1 identity of the
+    archive file is calculated, members are written to destination, the
+    payload of each written member is hashed with the requested algorithms
+    and the member listing is recorded. If payload is False representation
+    payload files are listed but not written, they're still hashed with the
+    requested algorithms as they're read.
+
+    Members are checked for a single root folder as they are read, so a
+    non-conformant package is rejected at the first offending member. Members
+    and bytes written are charged against the budget as they're streamed, an
+    ExtractionLimitError is raised as soon as a limit is exceeded. Reading the
+    archive is rate limited by the throttle if one is given.
+
+    If on_written is given it's called with the member name and target path
+    of each file once it's been written, before the next member is read.
+
+    Returns:
+        tuple[Checksum, list[ManifestEntry]]: the archive SHA-1 and an entry
+        for every file member, with member names as paths.
+    """
+    identity = ChecksumAlg.get_implementation(ChecksumAlg.SHA1)
+    entries: list[ManifestEntry] = []
+    # Skipped payload members by normalised name, for hard links to them
+    skipped: dict[str, ManifestEntry] = {}
+    root_check = RootCheck()
+    tracker = BudgetTracker(budget, os.path.getsize(archive))
+    with open(archive, 'rb') as raw:
+        reader = _HashingReader(_ThrottledReader(raw, throttle) if throttle else raw, identity)
+        with tarfile.open(fileobj=reader, mode='r|*') as tar_ip:
+            for member in tar_ip:
+                target = safe_target(destination, member.name)
+                root_check.add(member.name, member.isdir())
+                tracker.add_member()
+                if member.isdir():
+                    target.mkdir(parents=True, exist_ok=True)
+                    continue
+                if not member.isfile() and not member.islnk():
+                    # Symbolic links and special files are not unpacked
+                    continue
+                checksums: list[Checksum] = []
+                size = member.size
+                target.parent.mkdir(parents=True, exist_ok=True)
+                if member.islnk():
+                    # Hard links reference a member that has already been read
+                    linked = safe_target(destination, member.linkname)
+                    if member_path(member.linkname) in skipped:
+                        size = skipped[member_path(member.linkname)].size
+                        checksums = skipped[member_path(member.linkname)].checksums
+                    elif linked.is_file():
+                        size = linked.stat().st_size
+                        with open(linked, 'rb') as source:
+                            checksums = write_member(source, target, algorithms, tracker)
+                    else:
+                        size = 0
+                elif payload or not is_payload(member.name):
+                    checksums = write_member(tar_ip.extractfile(member), target, algorithms,
+                                             tracker)
+                else:
+                    # The skipped payload is read anyway, hash it on the way past
+                    with tar_ip.extractfile(member) as source:
+                        checksums = hash_member(source, algorithms)
+                if on_written is not None and target.is_file():
+                    on_written(member.name, target)
+                entry = ManifestEntry.model_validate({
+                    'path': member.name,
+                    'size': size,
+                    'checksums': checksums
+                    })
+                if not payload and is_payload(member.name):
+                    skipped[member_path(member.name)] = entry
+                entries.append(entry)
+        # Read any trailing padding so the identity covers the whole file
+        while reader.read(CHUNK_SIZE):
+            pass
+    root_check.finish()
+    return Checksum.model_validate({
+        'algorithm': ChecksumAlg.SHA1,
+        'value': identity.hexdigest()
+        }, strict=True), entries
+
+def hash_members(archive: Path, wanted: dict[str, tuple[int, list[ChecksumAlg]]],
+                 workers: Optional[int]=None,
+                 throttle: Optional[IOThrottle]=None) -> Iterator[tuple[str, int, list[Checksum]]]:
+    """Hash archive members in place, without writing anything to disk.
+
+    wanted maps normalised member names, see member_path, to their expected
+    size and the algorithms to hash them with. For each wanted member found
+    the normalised member name, its size and its checksums are yielded,
+    members of the wrong size are yielded with no checksums. Wanted members
+    missing from the archive aren't yielded.
+
+    TAR archives are read in a single sequential pass, rate limited on the
+    archive bytes read. Every regular TAR member is hashed and its digests
+    kept, so hard link members are given the size and checksums of the
+    member they link to. ZIP members are decompressed and hashed by up to
+    workers threads, each reading through its own archive file handle, rate
+    limited on the bytes hashed, members of the wrong size aren't read."""
+    detected = archive_type(archive)
+    if detected == ArchiveType.ZIP:
+        yield from _hash_zip_members(archive, wanted, workers, throttle)
+        return
+    if not detected.is_tar:
+        return
+    all_algorithms = list(dict.fromkeys(algorithm for _, algorithms in wanted.values()
+                                        for algorithm in algorithms))
+    hashed: dict[str, tuple[int, list[Checksum]]] = {}
+    with open(archive, 'rb') as raw, \
+            tarfile.open(fileobj=_ThrottledReader(raw, throttle) if throttle else raw,
+                         mode='r|*') as tar_ip:
+        for member in tar_ip:
+            name = member_path(member.name)
+            if member.islnk():
+                # Hard links carry no data, they share a member read earlier
+                if member_path(member.linkname) not in hashed:
+                    continue
+                hashed[name] = hashed[member_path(member.linkname)]
+            elif member.isfile():
+                with tar_ip.extractfile(member) as stream:
+                    hashed[name] = (member.size, hash_member(stream, all_algorithms))
+            if name not in wanted or name not in hashed:
+                continue
+            size, algorithms = wanted[name]
+            actual, checksums = hashed[name]
+            if actual != size:
+                yield name, actual, []
+                continue
+            by_algorithm = { checksum.algorithm: checksum for checksum in checksums }
+            yield name, actual, [ by_algorithm[algorithm] for algorithm in algorithms ]
+
+def _hash_zip_members(archive: Path, wanted: dict[str, tuple[int, list[ChecksumAlg]]],
+                      workers: Optional[int]=None,
+                      throttle: Optional[IOThrottle]=None
+                      ) -> Iterator[tuple[str, int, list[Checksum]]]:
+    with zipfile.ZipFile(archive) as zip_ip:
+        infos = [ info for info in zip_ip.infolist()
+                  if member_path(info.filename) in wanted and not info.is_dir() ]
+    handles = threading.local()
+    opened: list[zipfile.ZipFile] = []
+    def _hash(info: zipfile.ZipInfo) -> list[Checksum]:
+        size, algorithms = wanted[member_path(info.filename)]
+        if info.file_size != size:
+            return []
+        if not hasattr(handles, 'zip_ip'):
+            handles.zip_ip = zipfile.ZipFile(archive)
+            opened.append(handles.zip_ip)
+        with handles.zip_ip.open(info) as stream:
+            return hash_member(stream, algorithms, throttle)
+    try:
+        for info, checksums in run_bounded(_hash, infos, max(1, workers or DEFAULT_WORKERS),
+                                           weight=lambda info: info.file_size):
+            yield member_path(info.filename), info.file_size, checksums
+    finally:
+        for zip_ip in opened:
+            zip_ip.close()
+
+def hash_zip_entries(archive: Path, entries: Iterable[tuple[str, ManifestEntry]],
+                     workers: Optional[int]=None,
+                     throttle: Optional[IOThrottle]=None
+                     ) -> Iterator[tuple[ManifestEntry, Optional[int], list[Checksum]]]:
+    """Hash the ZIP members of a stream of manifest entries, each paired with
+    its normalised member name, without writing anything to disk.
+
+    Entries are consumed lazily and each member is looked up in the central
+    directory as its entry is read, so memory is bounded by the central
+    directory and the entries in flight rather than the number of entries.
+    Each entry is yielded in completion order with its member's size and
+    checksums, in the order of the entry's algorithms. Entries of the wrong
+    size are yielded with no checksums without being read, entries with no
+    member with a size of None. Members are hashed by up to workers threads,
+    rate limited on the bytes hashed."""
+    with zipfile.ZipFile(archive) as zip_ip:
+        normalised: Optional[dict[str, zipfile.ZipInfo]] = None
+        def _info(name: str) -> Optional[zipfile.ZipInfo]:
+            nonlocal normalised
+            try:
+                info = zip_ip.getinfo(name)
+            except KeyError:
+                if normalised is None:
+                    # Only members whose stored names aren't normalised are indexed
+                    normalised = { member_path(info.filename): info for info in zip_ip.infolist()
+                                   if member_path(info.filename) != info.filename }
+                info = normalised.get(name)
+            return None if info is None or info.is_dir() else info
+        handles = threading.local()
+        opened: list[zipfile.ZipFile] = []
+        def _hash(request: tuple[ManifestEntry, Optional[zipfile.ZipInfo]]) -> list[Checksum]:
+            entry, info = request
+            if info is None or info.file_size != entry.size:
+                return []
+            if not hasattr(handles, 'zip_ip'):
+                handles.zip_ip = zipfile.ZipFile(archive)
+                opened.append(handles.zip_ip)
+            with handles.zip_ip.open(info) as stream:
+                return hash_member(stream, [ checksum.algorithm for checksum in entry.checksums ],
+                                   throttle)
+        requests = ((entry, _info(name)) for name, entry in entries)
+        try:
+            for (entry, info), checksums in run_bounded(
+                    _hash, requests, max(1, workers or DEFAULT_WORKERS),
+                    weight=lambda request: request[1].file_size if request[1] else 0):
+                yield entry, info.file_size if info is not None else None, checksums
+        finally:
+            for handle in opened:
+                handle.close()
+
+def hash_member(source: BinaryIO, algorithms: Iterable[ChecksumAlg],
+                throttle: Optional[IOThrottle]=None) -> list[Checksum]:
+    """Hash a member stream with each of the requested algorithms, reading
+    it to exhaustion, rate limited by the throttle if given."""
+    implementations = { algorithm: ChecksumAlg.get_implementation(algorithm)
+                        for algorithm in algorithms }
+    for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+        if throttle is not None:
+            throttle.consume(len(chunk))
+        for implementation in implementations.values():
+            implementation.update(chunk)
+    return [ Checksum.model_validate({
+                'algorithm': algorithm,
+                'value': implementation.hexdigest()
+                }, strict=True) for algorithm, implementation in implementations.items() ]
+
+def write_member(source: BinaryIO, target: Path, algorithms: Iterable[ChecksumAlg]=(),
+                 tracker: Optional[BudgetTracker]=None,
+                 throttle: Optional[IOThrottle]=None) -> list[Checksum]:
+    """Copy a member stream to the file target, hashing the bytes written
+    with each of the requested algorithms. If a budget tracker is supplied
+    each chunk is charged before it's written, writes are rate limited by the
+    throttle if given."""
+    implementations = { algorithm: ChecksumAlg.get_implementation(algorithm)
+                        for algorithm in algorithms }
+    with open(target, 'wb') as dest:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+            if tracker:
+                tracker.add_bytes(len(chunk))
+            if throttle is not None:
+                throttle.consume(len(chunk))
+            dest.write(chunk)
+            for implementation in implementations.values():
+                implementation.update(chunk)
+    return [ Checksum.model_validate({
+                'algorithm': algorithm,
+                'value': implementation.hexdigest()
+                }, strict=True) for algorithm, implementation in implementations.items() ]
+
+def safe_target(destination: Path, member_name: str) -> Path:
+    """Returns the path a member should be unpacked to, raising a PackageError
+    if the member name would resolve outside of destination."""
+    member_path = PurePosixPath(member_name)
+    if member_path.is_absolute() or '..' in member_path.parts:
+        raise PackageError(f'Archive member {member_name} is outside the package.')
+    return Path(destination).joinpath(*member_path.parts)
+
+def open_member(archive: Path, member_name: str):
+    """Open a single archive member for reading, the archive is closed with
+    the returned stream. Raises a KeyError or FileNotFoundError if the member
+    isn't in the archive."""
+    if archive_type(archive) == ArchiveType.ZIP:
+        zip_ip = zipfile.ZipFile(archive) # pylint: disable=R1732
+        return _ClosingStream(zip_ip.open(member_name), zip_ip)
+    tar_ip = tarfile.open(archive) # pylint: disable=R1732
+    stream = tar_ip.extractfile(member_name)
+    if stream is None:
+        tar_ip.close()
+        raise FileNotFoundError(NO_PATH.format(f'{archive}/{member_name}'))
+    return _ClosingStream(stream, tar_ip)
+
+class _HashingReader():
+    """File wrapper that hashes every byte read through it."""
+    def __init__(self, raw: BinaryIO, implementation):
+        self._raw = raw
+        self._implementation = implementation
+
+    def read(self, size: int=-1) -> bytes:
+        data = self._raw.read(size)
+        self._implementation.update(data)
+        return data
+
+class _ThrottledReader():
+    """File wrapper that rate limits the bytes read through it."""
+    def __init__(self, raw: BinaryIO, throttle: IOThrottle):
+        self._raw = raw
+        self._throttle = throttle
+
+    def read(self, size: int=-1) -> bytes:
+        data = self._raw.read(size)
+        self._throttle.consume(len(data))
+        return data
+
+    def seek(self, offset: int, whence: int=os.SEEK_SET) -> int:
+        return self._raw.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._raw.tell()
+
+class _ClosingStream():
+    """Member stream that also closes its archive when closed."""
+    def __init__(self, stream, archive):
+        self._stream = stream
+        self._archive = archive
+
+    def read(self, size: int=-1) -> bytes:
+        return self._stream.read(size)
+
+    def __enter__(self) -> '_ClosingStream':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._stream.close()
+        self._archive.close()
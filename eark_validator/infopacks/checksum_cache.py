@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Persistent cache of file checksums keyed by file identity.
+"""
+import os
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from eark_validator.model import CacheStatistics, CacheTrust, Checksum, ChecksumAlg
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS checksums (
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    algorithm TEXT NOT NULL,
+    value TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (device, inode, size, mtime_ns, algorithm)
+)"""
+KEY_CLAUSE = 'device = ? AND inode = ? AND size = ? AND mtime_ns = ? AND algorithm = ?'
+FLUSH_ENTRIES = 1024
+FLUSH_SECONDS = 5.0
+TOUCH_SECONDS = 3600.0
+
+class ChecksumCache():
+    """SQLite backed cache of file digests.
+
+    Digests are keyed by the device, inode, size and modification time of the
+    file they were calculated from, and the algorithm, so any change to a
+    file's identity or content that updates its mtime misses the cache. The
+    trust policy decides whether cached digests are used at all, with
+    ALWAYS_REHASH the cache is refreshed but never read.
+
+    Writes are batched, new digests and last used times are committed in a
+    single transaction once FLUSH_ENTRIES are pending or FLUSH_SECONDS have
+    passed, and when the cache is flushed or closed. Other connections to the
+    database only see the writes once they're committed. A hit only updates
+    the last used time of a digest if it's older than TOUCH_SECONDS, so
+    prune's max_age is only accurate to that interval.
+
+    A cache instance can be shared by the threads of a verification pool."""
+    def __init__(self, path: Path, trust: CacheTrust=CacheTrust.TRUST_UNCHANGED):
+        self._path: Path = Path(path)
+        self._trust: CacheTrust = trust
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._evictions = 0
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self._path, check_same_thread=False,
+                                           isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        # A lost batch only costs rehashing, WAL keeps the database consistent
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(SCHEMA)
+        self._writes: dict[tuple, tuple[str, float]] = {}
+        self._touches: dict[tuple, float] = {}
+        self._flushed: float = time.monotonic()
+
+    @property
+    def path(self) -> Path:
+        """Returns the path of the SQLite database file."""
+        return self._path
+
+    @property
+    def trust(self) -> CacheTrust:
+        """Returns the trust policy applied to cached digests."""
+        return self._trust
+
+    @trust.setter
+    def trust(self, value: CacheTrust) -> None:
+        self._trust = value
+
+    @property
+    def statistics(self) -> CacheStatistics:
+        """Returns the hit, miss and eviction counts for this cache instance."""
+        with self._lock:
+            return CacheStatistics(hits=self._hits, misses=self._misses, evictions=self._evictions)
+
+    def get(self, stat: os.stat_result, algorithm: ChecksumAlg) -> Optional[Checksum]:
+        """Returns the cached digest of the file with the given stat result,
+        None if there's no trusted digest."""
+        with self._lock:
+            if self._trust == CacheTrust.ALWAYS_REHASH:
+                self._misses += 1
+                return None
+            key = _key(stat, algorithm)
+            if key in self._writes:
+                value = self._writes[key][0]
+            else:
+                row = self._connection.execute(
+                    f'SELECT value, last_used FROM checksums WHERE {KEY_CLAUSE}', key).fetchone()
+                if row is None:
+                    self._misses += 1
+                    return None
+                value, last_used = row
+                now = time.time()
+                if now - last_used > TOUCH_SECONDS:
+                    self._touches[key] = now
+                    self._flush_if_due()
+            self._hits += 1
+        return Checksum.model_validate({ 'algorithm': algorithm, 'value': value }, strict=True)
+
+    def put(self, stat: os.stat_result, checksum: Checksum) -> None:
+        """Record the digest of the file with the given stat result."""
+        with self._lock:
+            key = _key(stat, checksum.algorithm)
+            self._writes[key] = (checksum.value, time.time())
+            self._touches.pop(key, None)
+            self._flush_if_due()
+
+    def flush(self) -> None:
+        """Commit the pending digests and last used times."""
+        with self._lock:
+            self._flush()
+
+    def prune(self, max_age: Optional[float]=None, max_entries: Optional[int]=None) -> int:
+        """Remove digests unused for more than max_age seconds, then the least
+        recently used digests beyond max_entries. Returns the number removed."""
+        removed = 0
+        with self._lock:
+            self._flush()
+            if max_age is not None:
+                removed += self._connection.execute('DELETE FROM checksums WHERE last_used < ?',
+                                                    (time.time() - max_age,)).rowcount
+            if max_entries is not None:
+                removed += self._connection.execute(
+                    'DELETE FROM checksums WHERE rowid NOT IN '
+                    '(SELECT rowid FROM checksums ORDER BY last_used DESC LIMIT ?)',
+                    (max_entries,)).rowcount
+            self._evictions += removed
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._flush()
+            return self._connection.execute('SELECT COUNT(*) FROM checksums').fetchone()[0]
+
+    def close(self) -> None:
+        """Commit any pending writes and close the database connection."""
+        with self._lock:
+            try:
+                self._flush()
+            finally:
+                self._connection.close()
+
+    def _flush_if_due(self) -> None:
+        if len(self._writes) + len(self._touches) >= FLUSH_ENTRIES or \
+                time.monotonic() - self._flushed >= FLUSH_SECONDS:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Write the pending changes in one transaction, the lock must be held."""
+        self._flushed = time.monotonic()
+        if not self._writes and not self._touches:
+            return
+        self._connection.execute('BEGIN')
+        try:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO checksums VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [ (*key, value, used) for key, (value, used) in self._writes.items() ])
+            self._connection.executemany(
+                f'UPDATE checksums SET last_used = ? WHERE {KEY_CLAUSE}',
+                [ (used, *key) for key, used in self._touches.items() ])
+            self._connection.execute('COMMIT')
+        except BaseException:
+            self._connection.execute('ROLLBACK')
+            raise
+        self._writes.clear()
+        self._touches.clear()
+
+    def __enter__(self) -> 'ChecksumCache':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+def _key(stat: os.stat_result, algorithm: ChecksumAlg) -> tuple[int, int, int, int, str]:
+    return (_signed(stat.st_dev), _signed(stat.st_ino), stat.st_size, stat.st_mtime_ns,
+            algorithm.value)
+
+def _signed(value: int) -> int:
+    """Map an unsigned 64 bit device or inode number to SQLite's signed integers."""
+    return value - (1 << 64) if value >= (1 << 63) else value
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Bounded worker pools with optional adaptive concurrency for file I/O.
+"""
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import math
+import os
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+from eark_validator.model import ConcurrencyStatistics
+
+DEFAULT_MAX_WORKERS = min(32, 4 * (os.cpu_count() or 1))
+MIN_WINDOW = 8
+T = TypeVar('T')
+R = TypeVar('R')
+_END = object()
+
+class AdaptiveConcurrency:
+    """Chooses how many I/O tasks run at once with additive increase,
+    multiplicative decrease.
+
+    Task completions are grouped into measurement windows of at least
+    MIN_WINDOW tasks, or twice the current level. At the end of each window
+    the achieved throughput is compared with the previous window. If it fell
+    by more than tolerance, or latency rose by more than tolerance without a
+    matching throughput gain, the storage is saturated and the level is
+    multiplied by decrease. Otherwise the level grows by increase. The level
+    always stays within min_workers and max_workers.
+
+    A controller is thread safe and keeps its level between runs, so a single
+    instance shared by hashing or extraction settles on a level suited to
+    the storage being read."""
+    def __init__(self, min_workers: int=1, max_workers: int=DEFAULT_MAX_WORKERS,
+                 initial: Optional[int]=None, increase: int=1, decrease: float=0.5,
+                 tolerance: float=0.1):
+        if not 1 <= min_workers <= max_workers:
+            raise ValueError(f'Worker bounds {min_workers} to {max_workers} are invalid.')
+        if not 0 < decrease < 1:
+            raise ValueError(f'Decrease factor {decrease} must be between 0 and 1.')
+        self._lock = threading.Lock()
+        self._min: int = min_workers
+        self._max: int = max_workers
+        self._increase: int = max(1, increase)
+        self._decrease: float = decrease
+        self._tolerance: float = tolerance
+        self._limit: int = min(max_workers, max(min_workers, initial or min_workers))
+        self._increases = self._decreases = 0
+        self._throughput: Optional[float] = None
+        self._latency: float = 0.0
+        self._reset_window()
+
+    @property
+    def min_workers(self) -> int:
+        """Return the lowest concurrency level allowed."""
+        return self._min
+
+    @property
+    def max_workers(self) -> int:
+        """Return the highest concurrency level allowed."""
+        return self._max
+
+    @property
+    def limit(self) -> int:
+        """Return the current concurrency level."""
+        return self._limit
+
+    @property
+    def statistics(self) -> ConcurrencyStatistics:
+        """Return the current level and the last window's measurements."""
+        with self._lock:
+            return ConcurrencyStatistics(workers=self._limit,
+                                         bytes_per_second=self._throughput or 0.0,
+                                         latency=self._latency, increases=self._increases,
+                                         decreases=self._decreases)
+
+    def record(self, count: int, seconds: float) -> None:
+        """Record a completed task that processed count bytes in seconds."""
+        with self._lock:
+            self._bytes += count
+            self._seconds += seconds
+            self._tasks += 1
+            if self._tasks < max(MIN_WINDOW, 2 * self._limit):
+                return
+            elapsed = max(time.perf_counter() - self._start, 1e-9)
+            self._adjust(self._bytes / elapsed, self._seconds / self._tasks)
+            self._reset_window()
+
+    def _adjust(self, throughput: float, latency: float) -> None:
+        previous, previous_latency = self._throughput, self._latency
+        self._throughput, self._latency = throughput, latency
+        if previous is None:
+            self._grow()
+            return
+        slower = throughput < previous * (1 - self._tolerance)
+        queued = latency > previous_latency * (1 + self._tolerance) and \
+            throughput < previous * (1 + self._tolerance)
+        if slower or queued:
+            self._shrink()
+        else:
+            self._grow()
+
+    def _grow(self) -> None:
+        if self._limit < self._max:
+            self._limit = min(self._max, self._limit + self._increase)
+            self._increases += 1
+
+    def _shrink(self) -> None:
+        if self._limit > self._min:
+            self._limit = max(self._min, math.floor(self._limit * self._decrease))
+            self._decreases += 1
+
+    def _reset_window(self) -> None:
+        self._start: float = time.perf_counter()
+        self._bytes = self._tasks = 0
+        self._seconds: float = 0.0
+
+def run_bounded(function: Callable[[T], R], items: Iterable[T], workers: int,
+                controller: Optional[AdaptiveConcurrency]=None,
+                weight: Callable[[T], int]=lambda item: 0) -> Iterator[tuple[T, R]]:
+    """Apply function to each item on a thread pool, yielding each item with
+    its result in completion order.
+
+    Items are consumed lazily. Without a controller up to twice workers tasks
+    are queued. With a controller the pool is sized to its maximum and only
+    its current level of tasks are in flight, each task's duration and weight
+    in bytes are reported to it. Pending tasks are cancelled if the caller
+    stops iterating or a task raises."""
+    ordered: Iterator[T] = iter(items)
+    if controller is None and workers <= 1:
+        for item in ordered:
+            yield item, function(item)
+        return
+    def _timed(item: T) -> R:
+        start = time.perf_counter()
+        result = function(item)
+        controller.record(weight(item), time.perf_counter() - start)
+        return result
+    task = _timed if controller is not None else function
+    executor = ThreadPoolExecutor(max_workers=controller.max_workers if controller else workers)
+    pending: dict[Future, T] = {}
+    def _fill() -> None:
+        depth = controller.limit if controller is not None else 2 * workers
+        while len(pending) < depth:
+            item = next(ordered, _END)
+            if item is _END:
+                return
+            pending[executor.submit(task, item)] = item
+    try:
+        _fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                _fill()
+                yield item, future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
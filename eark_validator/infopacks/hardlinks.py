@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Sharing of digests between the hard links to a file.
+"""
+from concurrent.futures import Future
+import os
+import threading
+from typing import Callable, Iterable
+
+from eark_validator.model import Checksum, ChecksumAlg, HardlinkStatistics
+
+class HardlinkDigests:
+    """Digests of multiply linked files, keyed by device and inode.
+
+    The first caller to hash a file with more than one link calculates its
+    digests, concurrent and later callers for other links to the same inode
+    wait for and reuse them. Files with a single link are never recorded.
+    The key includes the size and change time so a file rewritten during a
+    run is hashed again."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._digests: dict[tuple, Future] = {}
+        self._files = self._bytes = 0
+
+    @property
+    def statistics(self) -> HardlinkStatistics:
+        """Returns the number of files and bytes that weren't re-read."""
+        with self._lock:
+            return HardlinkStatistics(files=self._files, bytes=self._bytes)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._digests)
+
+    def hash_file(self, stat: os.stat_result, algorithms: Iterable[ChecksumAlg],
+                  calculate: Callable[[list[ChecksumAlg]], list[Checksum]]) -> list[Checksum]:
+        """Return the checksums of the file with the given stat for each
+        algorithm. calculate is called with the algorithms to hash if no other
+        link to the file has been, or is being, hashed with them."""
+        algorithms = list(algorithms)
+        if stat.st_nlink < 2:
+            return calculate(algorithms)
+        key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns)
+        with self._lock:
+            shared = self._digests.get(key)
+            owner = shared is None
+            if owner:
+                shared = self._digests[key] = Future()
+        if owner:
+            try:
+                checksums = calculate(algorithms)
+            except BaseException as ex:
+                with self._lock:
+                    del self._digests[key]
+                shared.set_exception(ex)
+                raise
+            shared.set_result({ checksum.algorithm: checksum for checksum in checksums })
+            return checksums
+        try:
+            known: dict[ChecksumAlg, Checksum] = shared.result()
+        except BaseException: # pylint: disable=W0718
+            # The owner failed, let this caller hash and report its own error
+            return calculate(algorithms)
+        missing = [ algorithm for algorithm in algorithms if algorithm not in known ]
+        if missing:
+            # Only the algorithms the first link wasn't hashed with are calculated
+            known = dict(known)
+            known.update({ checksum.algorithm: checksum for checksum in calculate(missing) })
+            return [ known[algorithm] for algorithm in algorithms ]
+        with self._lock:
+            self._files += 1
+            self._bytes += stat.st_size
+        return [ known[algorithm] for algorithm in algorithms ]
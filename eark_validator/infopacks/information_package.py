@@ -24,6 +24,7 @@
 #
 """Module covering information package structure validation and navigation."""
 from pathlib import Path
+from typing import BinaryIO
 from lxml import etree
 
 from eark_validator.const import NO_PATH, NOT_FILE, NOT_VALID_FILE
@@ -32,7 +33,8 @@ from eark_validator.ipxml.namespaces import Namespaces
 from eark_validator.model import PackageDetails
 from eark_validator.model.package_details import InformationPackage
 from eark_validator.model.validation_report import Result
-from .package_handler import PackageHandler
+from .package_handler import PackageContext, PackageHandler
+from .package_view import PackageView
 
 CONTENTINFORMATIONTYPE = 'contentinformationtype'
 QUAL_CONTENTINFORMATIONTYPE = Namespaces.CSIP.qualify(CONTENTINFORMATIONTYPE.upper())
@@ -51,10 +53,17 @@ class InformationPackages:
             raise FileNotFoundError(NO_PATH.format(mets_file))
         if not mets_file.is_file():
             raise ValueError(NOT_FILE.format(mets_file))
+        return InformationPackages.details_from_mets_stream(mets_file, mets_file.parent.name,
+                                                            mets_file)
+
+    @staticmethod
+    def details_from_mets_stream(mets_stream: BinaryIO | Path, package_name: str,
+                                 source_name: str='') -> PackageDetails:
+        """Parse the package details from a METS file stream, e.g. an archive member."""
         ns = {}
         label = othertype = contentinformationtype = oaispackagetype = ''
         try:
-            parsed_mets = etree.iterparse(mets_file, events=['start', 'start-ns'])
+            parsed_mets = etree.iterparse(mets_stream, events=['start', 'start-ns'])
             for event, element in parsed_mets:
                 if event == 'start-ns':
                     # Add namespace id to the dictionary
@@ -68,9 +77,9 @@ class InformationPackages:
                     else:
                         break
         except (etree.XMLSyntaxError, AttributeError) as ex:
-            raise ValueError(NOT_VALID_FILE.format(mets_file, 'XML')) from ex
+            raise ValueError(NOT_VALID_FILE.format(source_name, 'XML')) from ex
         return PackageDetails.model_validate({
-            'name': mets_file.parent.stem,
+            'name': Path(package_name).stem,
             'label': label,
             'othertype': othertype,
             CONTENTINFORMATIONTYPE: contentinformationtype,
@@ -78,27 +87,32 @@ class InformationPackages:
         })
 
     @staticmethod
-    def from_path(package_path: Path) -> InformationPackage:
-        if not package_path.exists():
-            raise FileNotFoundError(NO_PATH.format(package_path))
-        handler: PackageHandler = PackageHandler()
-        to_parse:Path = handler.prepare_package(package_path)
-        mets_path: Path = to_parse.joinpath(METS_FILE)
-        if not mets_path.is_file():
+    def from_path(package_path: Path | PackageContext) -> InformationPackage:
+        view: PackageView = _resolve_context(package_path).view
+        if not view.is_file(METS_FILE):
             raise ValueError('No METS file found in package')
-        mets: MetsFile = MetsFiles.from_file(to_parse.joinpath(METS_FILE))
+        with view.open(METS_FILE) as mets_stream:
+            mets: MetsFile = MetsFiles.from_stream(mets_stream, METS_FILE)
+        with view.open(METS_FILE) as mets_stream:
+            details: PackageDetails = InformationPackages.details_from_mets_stream(
+                mets_stream, view.name, METS_FILE)
         return InformationPackage.model_validate({
             METS: mets,
-            'details': InformationPackages.details_from_mets_file(to_parse.joinpath(METS_FILE))
+            'details': details
         })
 
     @staticmethod
-    def validate(package_path: Path) -> Result:
-        if not package_path.exists():
-            raise FileNotFoundError(NO_PATH.format(package_path))
-        handler: PackageHandler = PackageHandler()
-        to_parse:Path = handler.prepare_package(package_path)
-        mets_path: Path = to_parse.joinpath(METS_FILE)
-        if not mets_path.is_file():
+    def validate(package_path: Path | PackageContext) -> Result:
+        view: PackageView = _resolve_context(package_path).view
+        if not view.is_file(METS_FILE):
             raise ValueError('No METS file found in package')
         return True
+
+def _resolve_context(package_path: Path | PackageContext) -> PackageContext:
+    if isinstance(package_path, PackageContext):
+        # Already resolved for this validation run, don't unpack again
+        return package_path
+    if not package_path.exists():
+        raise FileNotFoundError(NO_PATH.format(package_path))
+    handler: PackageHandler = PackageHandler()
+    return handler.prepare_context(package_path)
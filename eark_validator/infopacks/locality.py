@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Ordering of files by their physical location to reduce seeks when reading.
+"""
+import os
+from pathlib import Path
+import struct
+from typing import Iterable, Optional
+
+from eark_validator.model import FileOrder, ManifestEntry
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FS_IOC_FIEMAP = 0xC020660B
+FIBMAP = 1
+FIEMAP_MAX_OFFSET = 0xFFFFFFFFFFFFFFFF
+# struct fiemap header followed by a single struct fiemap_extent
+_FIEMAP = struct.Struct('=QQLLLL')
+_EXTENT = struct.Struct('=QQQQQLLLL')
+UNKNOWN = float('inf')
+
+def physical_offset(path: Path | str) -> Optional[int]:
+    """Return the physical byte offset of the first extent of the file at
+    path, or None if the file system or platform can't report it.
+
+    FIEMAP is tried first, then FIBMAP, which usually needs elevated
+    privileges. Empty and inline files have no extent."""
+    if fcntl is None:
+        return None
+    try:
+        with open(path, 'rb') as file:
+            offset = _fiemap(file.fileno())
+            return offset if offset is not None else _fibmap(file.fileno())
+    except OSError:
+        return None
+
+def locality_key(path: Path | str, order: FileOrder) -> tuple:
+    """Return a sort key for the file at path in the given order, inode and
+    physical orders group files by device. Files that can't be stat'ed sort
+    last."""
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return (UNKNOWN, UNKNOWN, UNKNOWN)
+    if order == FileOrder.PHYSICAL:
+        offset = physical_offset(path)
+        if offset is not None:
+            return (stat_result.st_dev, 0, offset)
+        # Files without a known extent follow those with one, in inode order
+        return (stat_result.st_dev, 1, stat_result.st_ino)
+    return (stat_result.st_dev, 0, stat_result.st_ino)
+
+def order_entries(root: Path, entries: Iterable[ManifestEntry],
+                  order: FileOrder) -> list[ManifestEntry]:
+    """Return the entries, whose paths are relative to root, in the given
+    order. Manifest order leaves the entries as they are."""
+    if order == FileOrder.MANIFEST:
+        return list(entries)
+    if order == FileOrder.SIZE:
+        return sorted(entries, key=lambda entry: entry.size, reverse=True)
+    keyed = [ (locality_key(os.path.join(root, entry.path), order), position, entry)
+              for position, entry in enumerate(entries) ]
+    keyed.sort(key=lambda item: item[:2])
+    return [ entry for _, _, entry in keyed ]
+
+def _fiemap(fileno: int) -> Optional[int]:
+    request = bytearray(_FIEMAP.size + _EXTENT.size)
+    _FIEMAP.pack_into(request, 0, 0, FIEMAP_MAX_OFFSET, 0, 0, 1, 0)
+    try:
+        fcntl.ioctl(fileno, FS_IOC_FIEMAP, request)
+    except (OSError, ValueError):
+        return None
+    if not _FIEMAP.unpack_from(request)[3]:
+        return None
+    return _EXTENT.unpack_from(request, _FIEMAP.size)[1]
+
+def _fibmap(fileno: int) -> Optional[int]:
+    try:
+        block = struct.unpack('i', fcntl.ioctl(fileno, FIBMAP, struct.pack('i', 0)))[0]
+        block_size = os.fstat(fileno).st_blksize
+    except (OSError, ValueError):
+        return None
+    return block * block_size if block > 0 else None
@@ -23,31 +23,181 @@
 # under the License.
 #
 """Information Package manifests."""
+from functools import partial
+import mmap
 import os
-import pickle
-from pathlib import Path
-from typing import Optional
+from pathlib import Path, PurePosixPath
+from stat import S_ISREG
+import threading
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional, TypeVar
 
 from eark_validator.const import NO_PATH, NOT_DIR, NOT_FILE
+from eark_validator.infopacks.archives import archive_root, hash_members
+from eark_validator.infopacks.checksum_cache import ChecksumCache
+from eark_validator.infopacks.concurrency import AdaptiveConcurrency, run_bounded
+from eark_validator.infopacks.hardlinks import HardlinkDigests
+from eark_validator.infopacks.locality import locality_key, order_entries
+from eark_validator.infopacks.manifest_file import ManifestReader, ManifestWriter
+from eark_validator.infopacks.sampling import ManifestSampler
+from eark_validator.infopacks.throttle import IOThrottle
 from eark_validator.mets import MetsFiles
-from eark_validator.model import Checksum, ChecksumAlg, Manifest, ManifestEntry
-from eark_validator.model.manifest import SourceType
+from eark_validator.model import Checksum, ChecksumAlg, FileOrder, Manifest, ManifestEntry
+from eark_validator.model.manifest import IssueType, ManifestIssue, SampleSummary, SourceType
 from eark_validator.model.metadata import FileEntry
 from eark_validator.utils import get_path
 
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+DEFAULT_WORKERS = os.cpu_count() or 1
+_BUFFERS = threading.local()
+T = TypeVar('T')
 
-class Checksummer:
-    def __init__(self, algorithm: ChecksumAlg | str):
-        if isinstance(algorithm, ChecksumAlg):
-            self._algorithm: ChecksumAlg = algorithm
+class MultiChecksummer:
+    """Calculates the checksums of a file or stream with several algorithms
+    in a single read.
+
+    Data is read into a large buffer, reused by every checksummer on the same
+    thread, and passed to each hash through a memoryview so that no bytes
+    objects are allocated per chunk. Files of at least mmap_threshold bytes
+    are memory mapped instead, None disables memory mapping.
+
+    If a ChecksumCache is supplied files are only read if a digest isn't
+    available from the cache, and calculated digests are added to it. Reads
+    are rate limited by the optional IOThrottle. If HardlinkDigests are given
+    a file with several hard links is only read for the first of them."""
+    def __init__(self, algorithms: Iterable[ChecksumAlg | str],
+                 buffer_size: int=DEFAULT_BUFFER_SIZE, mmap_threshold: Optional[int]=None,
+                 cache: Optional[ChecksumCache]=None, throttle: Optional[IOThrottle]=None,
+                 links: Optional[HardlinkDigests]=None):
+        self._algorithms: list[ChecksumAlg] = []
+        for algorithm in algorithms:
+            algorithm = _to_algorithm(algorithm)
+            if algorithm not in self._algorithms:
+                self._algorithms.append(algorithm)
+        self._buffer_size: int = buffer_size
+        self._mmap_threshold: Optional[int] = mmap_threshold
+        self._cache: Optional[ChecksumCache] = cache
+        self._throttle: Optional[IOThrottle] = throttle
+        self._links: Optional[HardlinkDigests] = links
+
+    @property
+    def algorithms(self) -> list[ChecksumAlg]:
+        """Return the distinct checksum algorithms used by this checksummer."""
+        return list(self._algorithms)
+
+    @property
+    def buffer_size(self) -> int:
+        """Return the size in bytes of the read buffer."""
+        return self._buffer_size
+
+    def hash_file(self, path: Path) -> list[Checksum]:
+        """Calculate the checksums of a file, reading it once.
+
+        Args:
+            path (Path): A path to a file to checksum.
+
+        Raises:
+            FileNotFoundError: If the path parameter is found.
+            ValueError: If the path parameter resolves to a directory.
+
+        Returns:
+            list[Checksum]: A Checksum for each algorithm, in algorithm order.
+        """
+        with _open_regular(path) as file:
+            stat = os.fstat(file.fileno())
+            cached: dict[ChecksumAlg, Checksum] = {}
+            if self._cache is not None:
+                for algorithm in self._algorithms:
+                    checksum = self._cache.get(stat, algorithm)
+                    if checksum:
+                        cached[algorithm] = checksum
+            algorithms = [ algorithm for algorithm in self._algorithms if algorithm not in cached ]
+            if not algorithms:
+                return [ cached[algorithm] for algorithm in self._algorithms ]
+            if self._links is not None:
+                calculated = self._links.hash_file(stat, algorithms,
+                                                   partial(self._hash_open, file, stat.st_size))
+            else:
+                calculated = self._hash_open(file, stat.st_size, algorithms)
+        for checksum in calculated:
+            if self._cache is not None:
+                self._cache.put(stat, checksum)
+            cached[checksum.algorithm] = checksum
+        return [ cached[algorithm] for algorithm in self._algorithms ]
+
+    def _hash_open(self, file: BinaryIO, size: int,
+                   algorithms: list[ChecksumAlg]) -> list[Checksum]:
+        implementations = _implementations(algorithms)
+        if self._mmap_threshold is not None and 0 < size and self._mmap_threshold <= size:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    for offset in range(0, size, self._buffer_size):
+                        if self._throttle is not None:
+                            self._throttle.consume(min(self._buffer_size, size - offset))
+                        for implementation in implementations:
+                            implementation.update(view[offset:offset + self._buffer_size])
+                finally:
+                    view.release()
         else:
-            self._algorithm: ChecksumAlg = ChecksumAlg.from_string(algorithm)
+            self._update(implementations, file)
+        return _checksums(algorithms, implementations)
+
+    def hash_stream(self, stream: BinaryIO) -> list[Checksum]:
+        """Calculate the checksums of the bytes read from a binary stream,
+        e.g. an archive member opened for reading.
+
+        Args:
+            stream (BinaryIO): A readable binary stream, read to exhaustion.
+
+        Returns:
+            list[Checksum]: A Checksum for each algorithm, in algorithm order.
+        """
+        implementations = _implementations(self._algorithms)
+        self._update(implementations, stream)
+        return _checksums(self._algorithms, implementations)
+
+    def _update(self, implementations: list, stream: BinaryIO) -> None:
+        if not hasattr(stream, 'readinto'):
+            for chunk in iter(lambda: stream.read(self._buffer_size), b''):
+                if self._throttle is not None:
+                    self._throttle.consume(len(chunk))
+                for implementation in implementations:
+                    implementation.update(chunk)
+            return
+        view = memoryview(_read_buffer(self._buffer_size))
+        try:
+            while True:
+                count = stream.readinto(view)
+                if not count:
+                    break
+                if self._throttle is not None:
+                    self._throttle.consume(count)
+                for implementation in implementations:
+                    implementation.update(view[:count])
+        finally:
+            view.release()
+
+
+class Checksummer:
+    """Calculates file and stream checksums with a single algorithm, see
+    MultiChecksummer for the buffering and caching options."""
+    def __init__(self, algorithm: ChecksumAlg | str, buffer_size: int=DEFAULT_BUFFER_SIZE,
+                 mmap_threshold: Optional[int]=None, cache: Optional[ChecksumCache]=None,
+                 throttle: Optional[IOThrottle]=None):
+        self._algorithm: ChecksumAlg = _to_algorithm(algorithm)
+        self._summer: MultiChecksummer = MultiChecksummer([ self._algorithm ], buffer_size,
+                                                          mmap_threshold, cache, throttle)
 
     @property
     def algorithm(self) -> ChecksumAlg:
         """Return the checksum algorithm used by this checksummer."""
         return self._algorithm
 
+    @property
+    def buffer_size(self) -> int:
+        """Return the size in bytes of the read buffer."""
+        return self._summer.buffer_size
+
     def hash_file(self, path: Path) -> 'Checksum':
         """Calculate the checksum of a file.
 
@@ -61,19 +211,19 @@ class Checksummer:
         Returns:
             Checksum: A Checksum object containing the Hexadecimal digest of the file.
         """
-        if not path.exists():
-            raise FileNotFoundError(NO_PATH.format(path))
-        if not path.is_file():
-            raise ValueError(NOT_FILE.format(path))
-        implemenation: ChecksumAlg = ChecksumAlg.get_implementation(self._algorithm)
-        with open(path, 'rb') as file:
-            for chunk in iter(lambda: file.read(4096), b''):
-                implemenation.update(chunk)
-        return Checksum.model_validate({
-                'algorithm': self._algorithm,
-                'value': implemenation.hexdigest()
-                }, strict=True
-            )
+        return self._summer.hash_file(path)[0]
+
+    def hash_stream(self, stream: BinaryIO) -> 'Checksum':
+        """Calculate the checksum of the bytes read from a binary stream,
+        e.g. an archive member opened for reading.
+
+        Args:
+            stream (BinaryIO): A readable binary stream, read to exhaustion.
+
+        Returns:
+            Checksum: A Checksum object containing the Hexadecimal digest of the stream.
+        """
+        return self._summer.hash_stream(stream)[0]
 
     @classmethod
     def from_file(cls, path: Path, algorithm: 'ChecksumAlg') -> 'Checksum':
@@ -81,24 +231,75 @@ class Checksummer:
         # Get the child flocat element and grab the href attribute.
         return Checksummer(algorithm).hash_file(path)
 
+def _implementations(algorithms: list[ChecksumAlg]) -> list:
+    return [ ChecksumAlg.get_implementation(algorithm) for algorithm in algorithms ]
+
+def _checksums(algorithms: list[ChecksumAlg], implementations: list) -> list[Checksum]:
+    return [ Checksum.model_validate({
+                'algorithm': algorithm,
+                'value': implementation.hexdigest()
+                }, strict=True)
+             for algorithm, implementation in zip(algorithms, implementations) ]
+
+def _to_algorithm(algorithm: ChecksumAlg | str) -> ChecksumAlg:
+    if isinstance(algorithm, ChecksumAlg):
+        return algorithm
+    return ChecksumAlg.from_string(algorithm)
+
+def _read_buffer(size: int) -> bytearray:
+    """Returns this thread's reusable read buffer of size bytes."""
+    if not hasattr(_BUFFERS, 'buffers'):
+        _BUFFERS.buffers = {}
+    buffers: dict[int, bytearray] = _BUFFERS.buffers
+    if size not in buffers:
+        buffers[size] = bytearray(size)
+    return buffers[size]
+
+def _open_regular(path: Path) -> BinaryIO:
+    """Open a regular file for sequential reading, checking it with a single
+    stat of the open file rather than separate exists and is_file calls."""
+    try:
+        file = open(path, 'rb') # pylint: disable=R1732
+    except FileNotFoundError as ex:
+        raise FileNotFoundError(NO_PATH.format(path)) from ex
+    except IsADirectoryError as ex:
+        raise ValueError(NOT_FILE.format(path)) from ex
+    if not S_ISREG(os.fstat(file.fileno()).st_mode):
+        file.close()
+        raise ValueError(NOT_FILE.format(path))
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    return file
+
 class ManifestEntries:
     @staticmethod
     def from_file_path(root: Path, entry_path: Path,
-                       checksum_algorithm: ChecksumAlg | str=None) -> ManifestEntry:
-        """Create a FileItem from a file path."""
+                       checksum_algorithm: ChecksumAlg | str |
+                       Iterable[ChecksumAlg | str]=None,
+                       throttle: Optional[IOThrottle]=None,
+                       links: Optional[HardlinkDigests]=None) -> ManifestEntry:
+        """Create a FileItem from a file path. If several checksum algorithms
+        are requested the file is read once to calculate them all."""
         abs_path: Path = root.joinpath(entry_path).absolute()
-        if not os.path.exists(abs_path):
-            raise FileNotFoundError(NO_PATH.format(abs_path))
-        if not os.path.isfile(abs_path):
+        if throttle is not None:
+            throttle.consume(0)
+        try:
+            stat = os.stat(abs_path)
+        except FileNotFoundError as ex:
+            raise FileNotFoundError(NO_PATH.format(abs_path)) from ex
+        if not S_ISREG(stat.st_mode):
             raise ValueError(f'Path {abs_path} is not a file.')
-        if isinstance(checksum_algorithm, ChecksumAlg):
-            algorithm: ChecksumAlg = checksum_algorithm
+        if not checksum_algorithm:
+            algorithms = []
+        elif isinstance(checksum_algorithm, (ChecksumAlg, str)):
+            algorithms = [ checksum_algorithm ]
         else:
-            algorithm: ChecksumAlg = ChecksumAlg.from_string(checksum_algorithm)
-        checksums = [ Checksummer.from_file(abs_path, algorithm) ] if checksum_algorithm else []
+            algorithms = list(checksum_algorithm)
+        checksums = MultiChecksummer(algorithms, throttle=throttle,
+                                     links=links).hash_file(abs_path) if algorithms else []
         return ManifestEntry.model_validate({
             'path': entry_path,
-            'size': os.path.getsize(abs_path),
+            'size': stat.st_size,
             'checksums': checksums
             })
 
@@ -111,28 +312,237 @@ class ManifestEntries:
             'checksums': [ entry.checksum ]
             })
 
+class DigestMap:
+    """Digests recorded for a package's files while they were written, for
+    example by hashing archive members as they're extracted, so that the
+    files needn't be read back to verify them."""
+    def __init__(self, manifest: Optional[Manifest]=None):
+        self._entries: dict[str, ManifestEntry] = {}
+        if manifest is not None:
+            for entry in manifest.entries:
+                self.add(entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, entry: ManifestEntry) -> None:
+        """Record the size and checksums of a file, relative to the package root."""
+        self._entries[str(PurePosixPath(entry.path))] = entry
+
+    def get(self, path: Path | str) -> Optional[ManifestEntry]:
+        """Return the entry recorded for the file at path, None if there isn't one."""
+        return self._entries.get(str(PurePosixPath(path)))
+
+    def lookup(self, path: Path | str, size: int,
+               algorithms: Iterable[ChecksumAlg]) -> Optional[list[Checksum]]:
+        """Return the recorded checksums of the file at path, in the order of
+        algorithms, or None unless a file of the given size was recorded with
+        every one of the algorithms."""
+        entry = self._entries.get(str(PurePosixPath(path)))
+        if entry is None or entry.size != size:
+            return None
+        recorded = { checksum.algorithm: checksum for checksum in entry.checksums }
+        checksums: list[Checksum] = []
+        for algorithm in algorithms:
+            if algorithm not in recorded:
+                return None
+            checksums.append(recorded[algorithm])
+        return checksums
+
+class ChecksumVerifier:
+    """Verifies manifest entries against the files beneath a root folder on a
+    bounded pool of threads, hashlib releases the GIL while hashing.
+
+    Verification runs in two phases. Every entry is first checked with a
+    single stat for existence and size, then only the files that pass are
+    hashed. By default hashing is scheduled largest first, so the biggest
+    files don't hold up the end of a run, inode or physical order reduces
+    seeking on spinning disks. Issues are yielded as they're found.
+    Digests are looked up in, and added to, the optional checksum cache, and
+    stats and reads are rate limited by the optional IOThrottle. If an
+    AdaptiveConcurrency controller is given it sets the number of files
+    verified at once, within its bounds, instead of workers. Files with
+    several hard links are hashed once, see HardlinkDigests. Files with
+    digests in the optional DigestMap are checked against them unread."""
+    def __init__(self, workers: Optional[int]=None, cache: Optional[ChecksumCache]=None,
+                 throttle: Optional[IOThrottle]=None,
+                 controller: Optional[AdaptiveConcurrency]=None,
+                 order: FileOrder=FileOrder.SIZE, links: Optional[HardlinkDigests]=None,
+                 digests: Optional[DigestMap]=None):
+        self._workers: int = max(1, workers or DEFAULT_WORKERS)
+        self._links: HardlinkDigests = links if links is not None else HardlinkDigests()
+        self._order: FileOrder = order
+        self._controller: Optional[AdaptiveConcurrency] = controller
+        self._cache: Optional[ChecksumCache] = cache
+        self._throttle: Optional[IOThrottle] = throttle
+        self._digests: Optional[DigestMap] = digests
+
+    @property
+    def workers(self) -> int:
+        """Return the maximum number of verification threads."""
+        return self._workers
+
+    @property
+    def cache(self) -> Optional[ChecksumCache]:
+        """Return the checksum cache consulted before hashing, if any."""
+        return self._cache
+
+    @property
+    def throttle(self) -> Optional[IOThrottle]:
+        """Return the I/O rate limiter applied to verification, if any."""
+        return self._throttle
+
+    @property
+    def controller(self) -> Optional[AdaptiveConcurrency]:
+        """Return the adaptive concurrency controller, if any."""
+        return self._controller
+
+    @property
+    def order(self) -> FileOrder:
+        """Return the order files are hashed in."""
+        return self._order
+
+    @property
+    def links(self) -> HardlinkDigests:
+        """Return the digests shared between hard links, whose statistics
+        report the hashing avoided."""
+        return self._links
+
+    @property
+    def digests(self) -> Optional[DigestMap]:
+        """Return the recorded digests checked before hashing, if any."""
+        return self._digests
+
+    def verify(self, root: Path, entries: Iterable[ManifestEntry],
+               max_issues: Optional[int]=None) -> Iterator[ManifestIssue]:
+        """Verify the size and checksums of each entry's file, yielding an
+        issue record for each problem found. If max_issues is given
+        verification stops, and pending work is cancelled, once that many
+        issues have been yielded."""
+        found: int = 0
+        survivors: list[ManifestEntry] = []
+        for entry, issue in self.run(partial(_stat_entry, root, throttle=self._throttle), entries, largest_first=False):
+            if issue is None:
+                survivors.append(entry)
+                continue
+            yield issue
+            found += 1
+            if max_issues is not None and found >= max_issues:
+                return
+        for _, issues in self.run(partial(_hash_entry, root, cache=self._cache,
+                                             throttle=self._throttle, links=self._links,
+                                             digests=self._digests),
+                                  order_entries(root, survivors, self._order),
+                                  largest_first=False):
+            for issue in issues:
+                yield issue
+                found += 1
+                if max_issues is not None and found >= max_issues:
+                    return
+
+    def run(self, check: Callable[[ManifestEntry], T], entries: Iterable[ManifestEntry],
+            largest_first: bool=True) -> Iterator[tuple[ManifestEntry, T]]:
+        """Apply check to each entry on the thread pool, yielding each entry
+        with its check result in completion order.
+
+        If largest_first is False entries are consumed lazily, in order, so
+        that very large entry streams are never held in memory."""
+        ordered: Iterable[ManifestEntry] = sorted(entries, key=lambda entry: entry.size,
+                                                  reverse=True) if largest_first else entries
+        # Only keep a small window of files queued so results stream steadily
+        return run_bounded(check, ordered, self._workers, self._controller,
+                           lambda entry: entry.size)
+
 class Manifests:
     @classmethod
-    def validate_manifest(cls, manifest: Manifest,
-                          alt_root: Optional[Path] = None) -> tuple[bool, list[str]]:
-        """Check the integrity of the manifest."""
-        issues: list[str] = []
+    def validate_manifest(cls, manifest: Manifest, alt_root: Optional[Path] = None,
+                          workers: Optional[int] = None,
+                          cache: Optional[ChecksumCache] = None,
+                          max_issues: Optional[int] = None,
+                          throttle: Optional[IOThrottle] = None,
+                          controller: Optional[AdaptiveConcurrency] = None,
+                          order: FileOrder = FileOrder.SIZE,
+                          links: Optional[HardlinkDigests] = None,
+                          digests: Optional[DigestMap] = None
+                          ) -> tuple[bool, list[ManifestIssue]]:
+        """Check the integrity of the manifest. Files are verified in parallel
+        by up to workers threads, issues are returned in manifest order. If a
+        checksum cache is supplied unchanged files aren't re-hashed. If
+        max_issues is given verification stops after that many issues, and
+        file I/O is rate limited by throttle if given. If a controller is given
+        it adapts the number of files verified at once instead of workers.
+        Files are hashed in the given order, and files with several hard
+        links are hashed once, pass links to see the bytes saved. Files with
+        digests recorded in digests, e.g. while extracting, aren't read."""
         root = alt_root if alt_root else _resolve_manifest_root(manifest)
+        positions: dict[str, int] = {}
+        for position, entry in enumerate(manifest.entries):
+            positions.setdefault(str(entry.path), position)
+        issues: list[ManifestIssue] = sorted(
+            ChecksumVerifier(workers, cache, throttle, controller, order, links,
+                             digests).verify(root, manifest.entries, max_issues),
+            key=lambda issue: positions[str(issue.path)])
+        return (not bool(issues)), issues
+
+    @classmethod
+    def validate_archive(cls, manifest: Manifest, archive: Path,
+                         member_root: Optional[str] = None, workers: Optional[int] = None,
+                         max_issues: Optional[int] = None,
+                         throttle: Optional[IOThrottle] = None
+                         ) -> tuple[bool, list[ManifestIssue]]:
+        """Check the integrity of the manifest against the members of a ZIP or
+        TAR archive, streaming each member through the hashers without
+        writing anything to disk.
+
+        Entry paths are resolved against member_root, by default the
+        archive's single root folder. Members of the wrong size aren't read.
+        Issues are returned in manifest order, if max_issues is given
+        verification stops after that many issues."""
+        root = member_root if member_root is not None else archive_root(archive)
+        entries: dict[str, ManifestEntry] = {}
         for entry in manifest.entries:
-            abs_path = Path(os.path.join(root, entry.path))
-            if not abs_path.is_file():
-                issues.append(f'File {abs_path} is missing.')
-                continue
-            if entry.size != os.path.getsize(abs_path):
-                size = os.path.getsize(abs_path)
-                issues.append(f'File {entry.path} manifest size {entry.size}, file size {size}.')
-            check_issues: list[str] = _test_checksums(abs_path, entry.checksums)
-            if not bool(check_issues):
-                issues.extend(check_issues)
+            entries.setdefault(f'{root}/{PurePosixPath(entry.path)}', entry)
+        wanted = { name: (entry.size, [ checksum.algorithm for checksum in entry.checksums ])
+                   for name, entry in entries.items() }
+        issues: list[ManifestIssue] = []
+        found: set[str] = set()
+        hashed = hash_members(archive, wanted, workers, throttle)
+        try:
+            for name, size, checksums in hashed:
+                found.add(name)
+                issues.extend(_member_issues(entries[name], size, checksums))
+                if max_issues is not None and len(issues) >= max_issues:
+                    break
+        finally:
+            hashed.close()
+        if max_issues is None or len(issues) < max_issues:
+            issues.extend(ManifestIssue(type=IssueType.MISSING, path=entry.path)
+                          for name, entry in entries.items() if name not in found)
+        if max_issues is not None:
+            issues = issues[:max_issues]
+        positions: dict[str, int] = {}
+        for position, entry in enumerate(manifest.entries):
+            positions.setdefault(str(entry.path), position)
+        issues.sort(key=lambda issue: positions[str(issue.path)])
         return (not bool(issues)), issues
 
+    @classmethod
+    def validate_sample(cls, manifest: Manifest, sampler: ManifestSampler,
+                        alt_root: Optional[Path] = None, workers: Optional[int] = None,
+                        cache: Optional[ChecksumCache] = None,
+                        max_issues: Optional[int] = None,
+                        throttle: Optional[IOThrottle] = None
+                        ) -> tuple[bool, list[ManifestIssue], SampleSummary]:
+        """Check the integrity of a random sample of the manifest's files,
+        chosen by sampler, returning the sample summary with the result."""
+        sample, summary = sampler.sample(manifest)
+        is_valid, issues = cls.validate_manifest(sample, alt_root, workers, cache, max_issues,
+                                                 throttle)
+        return is_valid, issues, summary
+
     @staticmethod
-    def from_source(source: Path | str, checksum_algorithm: ChecksumAlg=None) -> Manifest:
+    def from_source(source: Path | str,
+                    checksum_algorithm: ChecksumAlg | Iterable[ChecksumAlg]=None) -> Manifest:
         path = get_path(source, True)
         if path.is_file():
             return Manifests.from_mets_file(path)
@@ -141,31 +551,54 @@ class Manifests:
         raise ValueError(f'Path {source} is neither a file nor a directory.')
 
     @staticmethod
-    def to_file(manifest: Manifest, path: Path | str) -> None:
+    def to_file(manifest: Manifest, path: Path | str, compress: Optional[bool] = None,
+                index: bool = True) -> None:
+        """Write the manifest to a manifest file, see ManifestWriter. The file
+        is gzip compressed if compress is True, by default if the path ends in
+        .gz, and indexed for lookup by path unless index is False."""
         path = get_path(path, False)
-        with open(path, 'wb') as file:
-            pickle.dump(manifest, file)
+        with ManifestWriter(path, manifest.source, manifest.root, manifest.summary,
+                            compress, index) as writer:
+            writer.write_all(manifest.entries)
 
     @staticmethod
     def from_file(path: Path | str) -> Manifest:
+        """Read a manifest file written by to_file or a ManifestWriter, use a
+        ManifestReader to stream the entries of large manifests instead."""
         path = get_path(path, False)
-        with open(path, 'rb') as file:
-            return pickle.load(file)
+        with ManifestReader(path) as reader:
+            return reader.read()
 
     @staticmethod
-    def from_directory(source: Path | str, checksum_algorithm: ChecksumAlg=None) -> Manifest:
+    def from_directory(source: Path | str,
+                       checksum_algorithm: ChecksumAlg | Iterable[ChecksumAlg]=None,
+                       throttle: Optional[IOThrottle]=None,
+                       order: FileOrder=FileOrder.MANIFEST,
+                       links: Optional[HardlinkDigests]=None) -> Manifest:
+        """Create a manifest of the files beneath source. Entries are listed
+        in directory walk order, files are read in walk order unless inode or
+        physical order is requested to reduce seeking on spinning disks.
+        Files with several hard links are read once, pass links to see the
+        bytes saved."""
         path = get_path(source, True)
         if not path.is_dir():
             raise ValueError(NOT_DIR.format(source))
-        entries = []
+        entry_paths: list[Path] = []
         for subdir, _, files in os.walk(source):
             for file in files:
-                root = Path(os.path.join(subdir, file))
-                entry_path = root.relative_to(path)
-                entries.append(
-                    ManifestEntries.from_file_path(path,
-                                                   entry_path,
-                                                   checksum_algorithm=checksum_algorithm))
+                entry_paths.append(Path(os.path.join(subdir, file)).relative_to(path))
+        links = links if links is not None else HardlinkDigests()
+        read_order = entry_paths
+        if order in (FileOrder.INODE, FileOrder.PHYSICAL):
+            read_order = sorted(entry_paths,
+                                key=lambda entry_path: locality_key(path.joinpath(entry_path),
+                                                                    order))
+        created: dict[Path, ManifestEntry] = {
+            entry_path: ManifestEntries.from_file_path(path, entry_path,
+                                                       checksum_algorithm=checksum_algorithm,
+                                                       throttle=throttle, links=links)
+            for entry_path in read_order }
+        entries: list[ManifestEntry] = [ created[entry_path] for entry_path in entry_paths ]
         return Manifest.model_validate({
             'root': path,
             'source': SourceType.PACKAGE,
@@ -188,15 +621,69 @@ class Manifests:
             'entries': entries
             })
 
-def _test_checksums(path: Path, checksums: list[Checksum]) -> list[str]:
-    issues: list[str] = []
+def _stat_entry(root: Path, entry: ManifestEntry,
+                throttle: Optional[IOThrottle]=None) -> Optional[ManifestIssue]:
+    """Check an entry's file exists and has the manifest size with a single
+    stat, returning the issue found or None."""
+    if throttle is not None:
+        throttle.consume(0)
+    try:
+        stat_result = os.stat(os.path.join(root, entry.path))
+    except OSError:
+        return ManifestIssue(type=IssueType.MISSING, path=entry.path)
+    if not S_ISREG(stat_result.st_mode):
+        return ManifestIssue(type=IssueType.MISSING, path=entry.path)
+    if entry.size != stat_result.st_size:
+        return ManifestIssue(type=IssueType.SIZE, path=entry.path,
+                             expected=str(entry.size), actual=str(stat_result.st_size))
+    return None
+
+def _hash_entry(root: Path, entry: ManifestEntry, cache: Optional[ChecksumCache]=None,
+                throttle: Optional[IOThrottle]=None,
+                links: Optional[HardlinkDigests]=None,
+                digests: Optional[DigestMap]=None) -> list[ManifestIssue]:
+    if digests is not None:
+        recorded = digests.lookup(entry.path, entry.size,
+                                  [ checksum.algorithm for checksum in entry.checksums ])
+        if recorded is not None:
+            return _member_issues(entry, entry.size, recorded)
+    try:
+        return _test_checksums(Path(os.path.join(root, entry.path)), entry.checksums,
+                               cache, entry.path, throttle, links)
+    except (OSError, ValueError):
+        # The file was removed or replaced after it was stat'ed
+        return [ ManifestIssue(type=IssueType.MISSING, path=entry.path) ]
+
+def _test_checksums(path: Path, checksums: list[Checksum],
+                    cache: Optional[ChecksumCache]=None,
+                    entry_path: Optional[Path | str]=None,
+                    throttle: Optional[IOThrottle]=None,
+                    links: Optional[HardlinkDigests]=None) -> list[ManifestIssue]:
+    issues: list[ManifestIssue] = []
+    if not checksums:
+        return issues
+    calced_checksums = MultiChecksummer([ checksum.algorithm for checksum in checksums ],
+                                        cache=cache, throttle=throttle,
+                                        links=links).hash_file(path)
+    calced = { calced_checksum.algorithm: calced_checksum for calced_checksum in calced_checksums }
     for checksum in checksums:
-        calced_checksum = Checksummer(checksum.algorithm).hash_file(path)
+        calced_checksum = calced[checksum.algorithm]
         if not checksum == calced_checksum:
-            issues.append(f'File {path} manifest checksum {checksum.value},' +
-                          f'calculated checksum {calced_checksum}.')
+            issues.append(ManifestIssue(type=IssueType.CHECKSUM,
+                                        path=entry_path if entry_path is not None else path,
+                                        expected=checksum.value, actual=calced_checksum.value,
+                                        algorithm=checksum.algorithm))
     return issues
 
+def _member_issues(entry: ManifestEntry, size: int,
+                   checksums: list[Checksum]) -> list[ManifestIssue]:
+    if size != entry.size:
+        return [ ManifestIssue(type=IssueType.SIZE, path=entry.path,
+                               expected=str(entry.size), actual=str(size)) ]
+    return [ ManifestIssue(type=IssueType.CHECKSUM, path=entry.path, expected=expected.value,
+                           actual=actual.value, algorithm=expected.algorithm)
+             for expected, actual in zip(entry.checksums, checksums) if expected != actual ]
+
 def _resolve_manifest_root(manifest: Manifest) -> Path:
     if manifest.source == SourceType.PACKAGE:
         return manifest.root
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Streaming, parallel creation of manifests for folders.
+"""
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Optional
+
+from eark_validator.const import NOT_DIR
+from eark_validator.infopacks.concurrency import AdaptiveConcurrency, run_bounded
+from eark_validator.infopacks.hardlinks import HardlinkDigests
+from eark_validator.infopacks.manifest import DEFAULT_WORKERS, MultiChecksummer
+from eark_validator.infopacks.manifest_file import ManifestWriter
+from eark_validator.infopacks.throttle import IOThrottle
+from eark_validator.model import (
+    ChecksumAlg,
+    Manifest,
+    ManifestEntry,
+    ManifestSummary,
+    SourceType,
+    ThroughputStatistics
+)
+from eark_validator.utils import get_path
+
+DEFAULT_PROGRESS_INTERVAL = 1.0
+
+class ManifestBuilder:
+    """Creates manifest entries for the files beneath a folder, yielding each
+    entry as soon as it's ready.
+
+    Sub-folders are listed by up to workers threads with os.scandir, whose
+    results supply the size of each file from a single stat. Files are then
+    hashed with all of the algorithms in one read each, on a bounded pool of
+    workers threads, or as many as the optional AdaptiveConcurrency
+    controller allows. Only the folders being listed and the files queued for
+    hashing are held in memory, so entries can be streamed to a manifest
+    file for folders of any size.
+
+    Symbolic links to files are followed, linked folders aren't descended and
+    other special files are skipped. Stats and reads are rate limited by the
+    optional throttle, and files with several hard links are read once.
+
+    If a progress callback is given it's called with the files and bytes
+    completed at most every progress_interval seconds, and when a build
+    finishes."""
+    def __init__(self, algorithms: Iterable[ChecksumAlg | str]=(),
+                 workers: Optional[int]=None, throttle: Optional[IOThrottle]=None,
+                 controller: Optional[AdaptiveConcurrency]=None,
+                 links: Optional[HardlinkDigests]=None,
+                 progress: Optional[Callable[[ThroughputStatistics], None]]=None,
+                 progress_interval: float=DEFAULT_PROGRESS_INTERVAL):
+        self._workers: int = max(1, workers or DEFAULT_WORKERS)
+        self._links: HardlinkDigests = links if links is not None else HardlinkDigests()
+        self._summer: MultiChecksummer = MultiChecksummer(algorithms, throttle=throttle,
+                                                          links=self._links)
+        self._throttle: Optional[IOThrottle] = throttle
+        self._controller: Optional[AdaptiveConcurrency] = controller
+        self._progress = progress
+        self._progress_interval: float = progress_interval
+        self._lock = threading.Lock()
+        self._statistics: ThroughputStatistics = ThroughputStatistics(workers=self._workers)
+
+    @property
+    def algorithms(self) -> list[ChecksumAlg]:
+        """Return the checksum algorithms calculated for each file."""
+        return self._summer.algorithms
+
+    @property
+    def workers(self) -> int:
+        """Return the maximum number of listing and hashing threads."""
+        return self._workers
+
+    @property
+    def links(self) -> HardlinkDigests:
+        """Return the digests shared between hard links."""
+        return self._links
+
+    @property
+    def statistics(self) -> ThroughputStatistics:
+        """Return the files and bytes completed by the current or last build."""
+        with self._lock:
+            return self._statistics.model_copy()
+
+    def entries(self, source: Path | str) -> Iterator[ManifestEntry]:
+        """Yield an entry, with a path relative to source, for every file
+        beneath source in completion order."""
+        root = get_path(source, True)
+        if not root.is_dir():
+            raise ValueError(NOT_DIR.format(source))
+        start = time.perf_counter()
+        reported = start
+        with self._lock:
+            self._statistics = ThroughputStatistics(workers=self._workers)
+        files = self._scan(root)
+        hashed = run_bounded(lambda item: self._hash(root, item), files, self._workers,
+                             self._controller, lambda item: item[1])
+        try:
+            for (entry_path, size), checksums in hashed:
+                now = time.perf_counter()
+                with self._lock:
+                    self._statistics.files += 1
+                    self._statistics.bytes += size
+                    self._statistics.seconds = now - start
+                if self._progress is not None and now - reported >= self._progress_interval:
+                    reported = now
+                    self._progress(self.statistics)
+                yield ManifestEntry.model_validate({
+                    'path': entry_path,
+                    'size': size,
+                    'checksums': checksums
+                    })
+        finally:
+            hashed.close()
+            files.close()
+        with self._lock:
+            self._statistics.seconds = time.perf_counter() - start
+        if self._progress is not None:
+            self._progress(self.statistics)
+
+    def build(self, source: Path | str) -> Manifest:
+        """Return a manifest of the files beneath source, entries are sorted
+        by path so that the result doesn't depend on completion order."""
+        entries = sorted(self.entries(source), key=lambda entry: str(entry.path))
+        return Manifest.model_validate({
+            'root': get_path(source),
+            'source': SourceType.PACKAGE,
+            'summary': ManifestSummary(file_count=len(entries),
+                                       total_size=sum(entry.size for entry in entries)),
+            'entries': entries
+            })
+
+    def write(self, source: Path | str, path: Path | str, compress: Optional[bool]=None,
+              index: bool=True) -> ManifestSummary:
+        """Write a manifest file of the files beneath source to path as the
+        entries are produced, see ManifestWriter. Returns the summary of the
+        entries written."""
+        with ManifestWriter(path, SourceType.PACKAGE, get_path(source), compress=compress,
+                            index=index) as writer:
+            writer.write_all(self.entries(source))
+        return writer.summary
+
+    def _scan(self, root: Path) -> Iterator[tuple[Path, int]]:
+        """Yield the relative path and size of every file beneath root,
+        listing up to workers folders at once."""
+        executor = ThreadPoolExecutor(max_workers=self._workers)
+        folders: deque[Path] = deque([ root ])
+        pending: set[Future] = set()
+        try:
+            while folders or pending:
+                while folders and len(pending) < self._workers:
+                    pending.add(executor.submit(self._scan_folder, root, folders.popleft()))
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, sub_folders = future.result()
+                    folders.extend(sub_folders)
+                    yield from files
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def _scan_folder(self, root: Path,
+                     folder: Path) -> tuple[list[tuple[Path, int]], list[Path]]:
+        files: list[tuple[Path, int]] = []
+        sub_folders: list[Path] = []
+        if self._throttle is not None:
+            self._throttle.consume(0)
+        with os.scandir(folder) as scanner:
+            for entry in scanner:
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        sub_folders.append(Path(entry.path))
+                elif entry.is_file():
+                    if self._throttle is not None:
+                        self._throttle.consume(0)
+                    files.append((Path(entry.path).relative_to(root), entry.stat().st_size))
+        return files, sub_folders
+
+    def _hash(self, root: Path, item: tuple[Path, int]) -> list:
+        if not self._summer.algorithms:
+            return []
+        return self._summer.hash_file(root.joinpath(item[0]))
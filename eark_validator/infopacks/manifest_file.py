@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Compact, streamable manifest files.
+
+A manifest file is newline delimited JSON, optionally gzip compressed. The
+first line is a header object carrying the format, version, source, root and,
+if known, the summary. Each following line is an entry array of path, size
+and an object mapping algorithms to digests. The last line is a trailer object
+with the summary of the entries written.
+
+Compressed files are written as a series of independent gzip members, each
+holding a block of entries, so that an entry can be read by decompressing a
+single block. Writers also record a sidecar SQLite index of the offset of each
+entry by path for random access.
+"""
+import gzip
+import json
+import os
+from pathlib import Path, PurePosixPath
+import sqlite3
+from typing import BinaryIO, Iterable, Iterator, Optional
+import zlib
+
+from eark_validator.const import NO_PATH
+from eark_validator.model import (
+    Manifest,
+    ManifestEntry,
+    ManifestHeader,
+    ManifestSummary,
+    SourceType
+)
+
+FORMAT = 'eark-manifest'
+VERSION = 1
+INDEX_SUFFIX = '.idx'
+DEFAULT_BLOCK_ENTRIES = 4096
+GZIP_MAGIC = b'\x1f\x8b'
+COMPRESS_LEVEL = 6
+NOT_MANIFEST = 'File {} is not a manifest file.'
+INDEX_SCHEMA = (
+    """CREATE TABLE entries (
+    path TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    skip INTEGER NOT NULL
+) WITHOUT ROWID""",
+    """CREATE TABLE manifest (
+    size INTEGER NOT NULL,
+    file_count INTEGER NOT NULL,
+    total_size INTEGER NOT NULL
+)""")
+
+def index_path(path: Path | str) -> Path:
+    """Return the path of the sidecar index of the manifest file at path."""
+    return Path(f'{path}{INDEX_SUFFIX}')
+
+class ManifestWriter:
+    """Writes a manifest file one entry at a time in bounded memory.
+
+    Entries are compressed in blocks of block_entries if compress is True, by
+    default if the path ends in .gz. Unless index is False the offset of
+    every entry is recorded in the sidecar index, the first entry for a path
+    is the one indexed. The file is complete once the writer is closed."""
+    def __init__(self, path: Path | str, source: SourceType, root: Path,
+                 summary: Optional[ManifestSummary]=None, compress: Optional[bool]=None,
+                 index: bool=True, block_entries: int=DEFAULT_BLOCK_ENTRIES):
+        if block_entries < 1:
+            raise ValueError(f'Block entries {block_entries} must be at least one.')
+        self._path: Path = Path(path)
+        self._compress: bool = self._path.suffix == '.gz' if compress is None else compress
+        self._block_entries: int = block_entries
+        self._block: list[bytes] = []
+        self._positions: list[tuple[str, int]] = []
+        self._block_size: int = 0
+        self._file_count = self._total_size = 0
+        self._closed: bool = False
+        self._file: BinaryIO = open(self._path, 'wb') # pylint: disable=R1732
+        self._index: Optional[sqlite3.Connection] = None
+        if index:
+            index_file = index_path(self._path)
+            index_file.unlink(missing_ok=True)
+            self._index = sqlite3.connect(index_file)
+            for statement in INDEX_SCHEMA:
+                self._index.execute(statement)
+        header = ManifestHeader(source=source, root=root, summary=summary)
+        self._write_record({ 'format': FORMAT, 'version': VERSION,
+                             **header.model_dump(mode='json') })
+
+    @property
+    def path(self) -> Path:
+        """Return the path of the manifest file."""
+        return self._path
+
+    @property
+    def summary(self) -> ManifestSummary:
+        """Return the summary of the entries written so far."""
+        return ManifestSummary(file_count=self._file_count, total_size=self._total_size)
+
+    def write(self, entry: ManifestEntry) -> None:
+        """Append an entry to the manifest file."""
+        path = str(PurePosixPath(entry.path))
+        line = _line([ path, entry.size, { checksum.algorithm.value: checksum.value
+                                           for checksum in entry.checksums } ])
+        self._file_count += 1
+        self._total_size += entry.size
+        if not self._compress:
+            self._positions.append((path, self._file.tell()))
+            self._file.write(line)
+        else:
+            self._positions.append((path, self._block_size))
+            self._block.append(line)
+            self._block_size += len(line)
+        if len(self._positions) >= self._block_entries:
+            self._flush()
+
+    def write_all(self, entries: Iterable[ManifestEntry]) -> None:
+        """Append each of the entries to the manifest file."""
+        for entry in entries:
+            self.write(entry)
+
+    def close(self) -> None:
+        """Write the trailer and finish the file and its index."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._flush()
+            self._write_record({ 'summary': self.summary.model_dump() })
+        finally:
+            self._file.close()
+        if self._index is not None:
+            self._index.execute('INSERT INTO manifest VALUES (?, ?, ?)',
+                                (os.path.getsize(self._path), self._file_count, self._total_size))
+            self._index.commit()
+            self._index.close()
+
+    def __enter__(self) -> 'ManifestWriter':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _write_record(self, record: dict) -> None:
+        line = _line(record)
+        self._file.write(gzip.compress(line, COMPRESS_LEVEL, mtime=0) if self._compress else line)
+
+    def _flush(self) -> None:
+        """Write the pending block of entries and index their offsets."""
+        if self._compress and self._block:
+            offset = self._file.tell()
+            self._file.write(gzip.compress(b''.join(self._block), COMPRESS_LEVEL, mtime=0))
+            positions = [ (path, offset, skip) for path, skip in self._positions ]
+        else:
+            positions = [ (path, offset, 0) for path, offset in self._positions ]
+        if self._index is not None and positions:
+            self._index.executemany('INSERT OR IGNORE INTO entries VALUES (?, ?, ?)', positions)
+        self._block = []
+        self._positions = []
+        self._block_size = 0
+
+class ManifestReader:
+    """Reads a manifest file, compressed or not, one entry at a time.
+
+    The header is read when the reader is created. Entries are read in file
+    order by iterating the reader, and single entries are read by path with
+    lookup, which needs the sidecar index written with the file."""
+    def __init__(self, path: Path | str):
+        self._path: Path = Path(path)
+        if not self._path.is_file():
+            raise FileNotFoundError(NO_PATH.format(self._path))
+        with open(self._path, 'rb') as file:
+            self._compressed: bool = file.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+        self._trailer: Optional[ManifestSummary] = None
+        self._index: Optional[sqlite3.Connection] = None
+        self._indexed: Optional[ManifestSummary] = None
+        with self._open() as file:
+            self._header: ManifestHeader = _header(self._path, file.readline())
+        index_file = index_path(self._path)
+        if index_file.is_file():
+            self._index = sqlite3.connect(index_file, check_same_thread=False)
+            row = self._index.execute(
+                'SELECT size, file_count, total_size FROM manifest').fetchone()
+            if row is None or row[0] != os.path.getsize(self._path):
+                # The index is incomplete or belongs to an earlier version of the file
+                self._index.close()
+                self._index = None
+            else:
+                self._indexed = ManifestSummary(file_count=row[1], total_size=row[2])
+
+    @property
+    def path(self) -> Path:
+        """Return the path of the manifest file."""
+        return self._path
+
+    @property
+    def header(self) -> ManifestHeader:
+        """Return the manifest header."""
+        return self._header
+
+    @property
+    def summary(self) -> Optional[ManifestSummary]:
+        """Return the summary from the header or index, or from the trailer
+        once the entries have been read, None if it isn't known yet."""
+        return self._header.summary or self._indexed or self._trailer
+
+    @property
+    def is_indexed(self) -> bool:
+        """Return True if entries can be looked up by path."""
+        return self._index is not None
+
+    def __iter__(self) -> Iterator[ManifestEntry]:
+        with self._open() as file:
+            file.readline()
+            for line in file:
+                record = _record(self._path, line)
+                if isinstance(record, dict):
+                    if not isinstance(record.get('summary'), dict):
+                        raise ValueError(NOT_MANIFEST.format(self._path))
+                    self._trailer = ManifestSummary.model_validate(record['summary'])
+                    return
+                yield _entry(self._path, record)
+
+    def lookup(self, path: Path | str) -> Optional[ManifestEntry]:
+        """Return the first entry for path, None if there isn't one. Raises a
+        ValueError if the manifest file has no up to date index."""
+        if self._index is None:
+            raise ValueError(f'Manifest file {self._path} has no index.')
+        row = self._index.execute('SELECT offset, skip FROM entries WHERE path = ?',
+                                  (str(PurePosixPath(path)),)).fetchone()
+        if row is None:
+            return None
+        offset, skip = row
+        with open(self._path, 'rb') as file:
+            file.seek(offset)
+            line = _read_block_line(file, skip) if self._compressed else file.readline()
+        return _entry(self._path, _record(self._path, line))
+
+    def read(self) -> Manifest:
+        """Read the whole manifest into memory."""
+        entries = list(self)
+        return Manifest.model_validate({
+            'source': self._header.source,
+            'root': self._header.root,
+            'summary': self._header.summary,
+            'entries': entries
+            })
+
+    def close(self) -> None:
+        """Close the index connection."""
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+    def __enter__(self) -> 'ManifestReader':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _open(self) -> BinaryIO:
+        return gzip.open(self._path, 'rb') if self._compressed else open(self._path, 'rb')
+
+def _line(record: list | dict) -> bytes:
+    return json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n'
+
+def _record(path: Path, line: bytes) -> list | dict:
+    try:
+        return json.loads(line)
+    except ValueError as ex:
+        raise ValueError(NOT_MANIFEST.format(path)) from ex
+
+def _header(path: Path, line: bytes) -> ManifestHeader:
+    try:
+        record = json.loads(line)
+    except (ValueError, UnicodeDecodeError) as ex:
+        raise ValueError(NOT_MANIFEST.format(path)) from ex
+    if not isinstance(record, dict) or record.get('format') != FORMAT:
+        raise ValueError(NOT_MANIFEST.format(path))
+    if record.get('version') != VERSION:
+        raise ValueError(f'Manifest file {path} version {record.get("version")} is not supported.')
+    return ManifestHeader.model_validate(record)
+
+def _entry(path: Path, record: list | dict) -> ManifestEntry:
+    if not isinstance(record, list) or len(record) != 3 or not isinstance(record[2], dict):
+        raise ValueError(NOT_MANIFEST.format(path))
+    entry_path, size, checksums = record
+    return ManifestEntry.model_validate({
+        'path': Path(entry_path),
+        'size': size,
+        'checksums': [ { 'algorithm': algorithm, 'value': value }
+                       for algorithm, value in checksums.items() ]
+        })
+
+def _read_block_line(file: BinaryIO, skip: int) -> bytes:
+    """Decompress the gzip member at the file position just far enough to
+    return the line starting skip bytes into it."""
+    decompressor = zlib.decompressobj(wbits=31)
+    data = b''
+    while not decompressor.eof:
+        chunk = file.read(64 * 1024)
+        if not chunk:
+            break
+        data += decompressor.decompress(chunk)
+        end = data.find(b'\n', skip)
+        if end >= 0:
+            return data[skip:end + 1]
+    return data[skip:]
@@ -26,28 +26,191 @@
 Factory methods for the package classes.
 """
 import os
-from pathlib import Path
-import tarfile
+from pathlib import Path, PurePosixPath
+import shutil
 import tempfile
+import time
+from typing import BinaryIO, Iterator, Optional
 import zipfile
-from eark_validator.infopacks.manifest import Checksummer
+from eark_validator.infopacks.archives import (
+    PackageError,
+    archive_root,
+    archive_type,
+    extract_members,
+    fingerprint,
+    is_payload,
+    open_member,
+    stream_tar
+)
+from eark_validator.infopacks.concurrency import AdaptiveConcurrency
+from eark_validator.infopacks.manifest_file import ManifestReader, ManifestWriter
+from eark_validator.infopacks.package_view import DirectoryView, ExtractingView, PackageView, ZipView
+from eark_validator.infopacks.throttle import IOThrottle
+from eark_validator.infopacks.unpack_cache import CacheLease, UnpackCache
+from eark_validator.mets import MetsFiles
+from eark_validator.model import (
+    ArchiveType,
+    Checksum,
+    ChecksumAlg,
+    ExtractionBudget,
+    Fingerprint,
+    FingerprintStrategy,
+    Manifest,
+    ManifestEntry,
+    SourceType,
+    ThroughputStatistics
+)
 SUB_MESS_NOT_EXIST = 'Path {} does not exist'
+METS_NAME = 'METS.xml'
+METADATA_ONLY_SUFFIX = '.metadata'
+LISTING_NAME = '.eark-listing.ndjson.gz'
 SUB_MESS_NOT_ARCH = 'Parameter "to_unpack": {} does not reference' + \
                     'a file of known archive format (zip or tar).'
 
-class PackageError(Exception):
-    """Exception used to mark validation error when unpacking archive."""
+class PackageContext():
+    """Records the resolved location of a package for a single validation run.
+
+    A context is created once per validation, unpacking archives as required,
+    and passed to all validation subsystems so that the package is only
+    resolved and unpacked once. Package content should be read through the
+    context's view, which may be backed by a folder or by an archive read in
+    place. Unpacked archives are leased from the unpack cache, so they can't be
+    evicted by other workers, until the context is closed."""
+    def __init__(self, original_path: Path, root: Path, is_archive: bool=False,
+                 view: Optional[PackageView]=None, manifest: Optional[Manifest]=None,
+                 fingerprint: Optional[Fingerprint]=None,
+                 extraction: Optional[ThroughputStatistics]=None,
+                 lease: Optional[CacheLease]=None):
+        self._original_path: Path = Path(original_path)
+        self._root: Path = Path(root)
+        self._is_archive: bool = is_archive
+        self._view: PackageView = view if view else DirectoryView(self._root)
+        self._manifest: Optional[Manifest] = manifest
+        self._fingerprint: Optional[Fingerprint] = fingerprint
+        self._extraction: Optional[ThroughputStatistics] = extraction
+        self._lease: Optional[CacheLease] = lease
+
+    @property
+    def original_path(self) -> Path:
+        """Returns the path originally supplied for validation."""
+        return self._original_path
+
+    @property
+    def root(self) -> Path:
+        """Returns the resolved package root folder."""
+        return self._root
+
+    @property
+    def is_archive(self) -> bool:
+        """Returns True if the original path was an archived package."""
+        return self._is_archive
+
+    @property
+    def name(self) -> str:
+        """Returns the name of the package, from the original path."""
+        return os.path.basename(self._original_path)
+
+    @property
+    def view(self) -> PackageView:
+        """Returns the read only view of the package content."""
+        return self._view
+
+    @property
+    def manifest(self) -> Optional[Manifest]:
+        """Returns the archive member listing recorded while unpacking, with
+        paths relative to the package root, None if no listing was recorded."""
+        return self._manifest
+
+    @property
+    def fingerprint(self) -> Optional[Fingerprint]:
+        """Returns the fingerprint identifying an archived package, None for folders."""
+        return self._fingerprint
+
+    @property
+    def extraction(self) -> Optional[ThroughputStatistics]:
+        """Returns the throughput of the archive extraction performed for this
+        context, None if the package wasn't extracted, e.g. was already cached."""
+        return self._extraction
+
+    @property
+    def is_extracted(self) -> bool:
+        """Returns True if the package content is available on disk at root,
+        False if it's read from the archive or payload is extracted on demand."""
+        return isinstance(self._view, DirectoryView) and \
+            not isinstance(self._view, ExtractingView)
+
+    def close(self) -> None:
+        """Release any resources held by the package view and the lease on
+        the unpacked package."""
+        self._view.close()
+        if self._lease is not None:
+            self._lease.close()
+            self._lease = None
 
 class PackageHandler():
-    """Class to handle archive / compressed information packages."""
-    def __init__(self, unpack_root: Path=Path(tempfile.gettempdir())):
+    """Class to handle archive / compressed information packages.
+
+    Unpacked archives are cached by fingerprint, STRUCTURE by default, which
+    covers the ZIP member CRCs or TAR member headers and the archive file's
+    modification time and inode. Use FULL to identify archives by content."""
+    def __init__(self, unpack_root: Path=Path(tempfile.gettempdir()),
+                 max_cache_bytes: Optional[int]=None,
+                 fingerprint_strategy: FingerprintStrategy=FingerprintStrategy.STRUCTURE,
+                 extraction_workers: Optional[int]=None,
+                 budget: Optional[ExtractionBudget]=None,
+                 throttle: Optional[IOThrottle]=None,
+                 controller: Optional[AdaptiveConcurrency]=None):
         self._unpack_root : Path = unpack_root
+        self._cache: UnpackCache = UnpackCache(unpack_root, max_cache_bytes)
+        self._fingerprint_strategy: FingerprintStrategy = fingerprint_strategy
+        self._extraction_workers: Optional[int] = extraction_workers
+        self._budget: Optional[ExtractionBudget] = budget
+        self._throttle: Optional[IOThrottle] = throttle
+        self._controller: Optional[AdaptiveConcurrency] = controller
 
     @property
     def unpack_root(self) -> Path:
         """Returns the root directory for archive unpacking."""
         return self._unpack_root
 
+    @property
+    def cache(self) -> UnpackCache:
+        """Returns the managed cache of unpacked archives."""
+        return self._cache
+
+    @property
+    def fingerprint_strategy(self) -> FingerprintStrategy:
+        """Returns the strategy used to fingerprint archives for the unpack cache."""
+        return self._fingerprint_strategy
+
+    @property
+    def extraction_workers(self) -> Optional[int]:
+        """Returns the maximum number of threads used to extract ZIP members,
+        None for the default."""
+        return self._extraction_workers
+
+    @property
+    def budget(self) -> Optional[ExtractionBudget]:
+        """Returns the resource limits applied to each archive extraction,
+        None if extraction is unlimited."""
+        return self._budget
+
+    @property
+    def throttle(self) -> Optional[IOThrottle]:
+        """Returns the I/O rate limiter applied to archive extraction, None
+        if extraction is unthrottled."""
+        return self._throttle
+
+    @throttle.setter
+    def throttle(self, value: Optional[IOThrottle]) -> None:
+        self._throttle = value
+
+    @property
+    def controller(self) -> Optional[AdaptiveConcurrency]:
+        """Returns the adaptive controller setting the number of ZIP members
+        extracted at once, None if extraction_workers is used."""
+        return self._controller
+
     def prepare_package(self, to_prepare: Path, dest: Path=None) -> Path:
         if not os.path.exists(to_prepare):
             raise ValueError(SUB_MESS_NOT_EXIST.format(to_prepare))
@@ -55,42 +218,225 @@ class PackageHandler():
             return to_prepare
         return self.unpack_package(to_prepare, dest)
 
-    def unpack_package(self, to_unpack: Path, dest: Path=None) -> Path:
+    def prepare_context(self, to_prepare: Path, dest: Path=None,
+                        in_place: Optional[bool]=None, payload: bool=True,
+                        digests: bool=False) -> PackageContext:
+        """Prepare a package for validation, unpacking it if it's an archive,
+        and return a PackageContext recording the resolved package root.
+
+        ZIP packages are read in place, without extraction, if in_place is True.
+        If in_place is None they are read in place only when the uncompressed
+        package won't fit in the unpack disk budget.
+
+        If payload is False, i.e. no checksum or size checks are requested,
+        representation data files are not unpacked up front but are extracted
+        on first access through the context's view.
+
+        If digests is True unpacked members are hashed, as they're written,
+        with the checksum algorithms declared in the root METS file. The
+        digests are recorded in the context manifest so that checksum
+        verification needn't read the files back. TAR members streamed before
+        the METS file aren't hashed. A reused TAR unpacking keeps the listing,
+        and digests, recorded when it was streamed, none are recorded if a
+        previous ZIP unpacking is reused."""
+        if not os.path.exists(to_prepare):
+            raise ValueError(SUB_MESS_NOT_EXIST.format(to_prepare))
+        if os.path.isdir(to_prepare):
+            return PackageContext(to_prepare, Path(to_prepare).absolute())
+        if in_place is not False and archive_type(to_prepare) == ArchiveType.ZIP:
+            view = ZipView(to_prepare, archive_root(to_prepare))
+            if in_place or view.uncompressed_size > self.disk_budget(dest):
+                return PackageContext(to_prepare, Path(to_prepare).joinpath(view.name),
+                                      is_archive=True, view=view,
+                                      fingerprint=fingerprint(to_prepare,
+                                                              self._fingerprint_strategy))
+            view.close()
+        return self._unpack_package(to_prepare, dest, payload, digests)
+
+    def disk_budget(self, dest: Path=None) -> int:
+        """Returns the number of bytes available for unpacking, the smaller of
+        the free space at the unpack root and the cache budget."""
+        unpack_root = Path(dest if dest else self._unpack_root)
+        while not unpack_root.exists() and unpack_root != unpack_root.parent:
+            unpack_root = unpack_root.parent
+        free = shutil.disk_usage(unpack_root).free
+        if dest or self._cache.max_bytes is None:
+            return free
+        return min(free, self._cache.max_bytes)
+
+    def unpack_package(self, to_unpack: Path, dest: Path=None, payload: bool=True) -> Path:
         """Unpack an archived package to a destination (defaults to tempdir).
-        returns the destination folder."""
-        if not os.path.isfile(to_unpack) or not self.is_archive(to_unpack):
+        returns the destination folder. If payload is False representation data
+        files are not unpacked, a complete unpacking is reused if available.
+        Raises an ExtractionLimitError, a PackageError, if the extraction
+        exceeds the handler's budget, partial output is removed."""
+        context = self._unpack_package(to_unpack, dest, payload)
+        context.close()
+        return context.root
+
+    def _unpack_package(self, to_unpack: Path, dest: Path=None, payload: bool=True,
+                        digests: bool=False) -> PackageContext:
+        detected = archive_type(to_unpack)
+        if not detected.is_archive:
             raise ValueError(SUB_MESS_NOT_ARCH.format(to_unpack))
-        sha1 = Checksummer('SHA-1').hash_file(to_unpack)
-        dest_root = dest if dest else self.unpack_root
-        destination = os.path.join(dest_root, sha1.value)
-        self._unpack(to_unpack, destination)
+        cache = UnpackCache(dest) if dest else self._cache
+        entries: list[list[ManifestEntry]] = []
+        extraction: list[ThroughputStatistics] = []
+        declared = _DeclaredAlgorithms() if digests else None
+        is_zip = detected == ArchiveType.ZIP
+        if detected in (ArchiveType.ZIP, ArchiveType.TAR):
+            # The member directory can be read cheaply, reject non-conformant
+            # layouts before anything is written. Compressed TAR members are
+            # checked as they're streamed.
+            archive_root(to_unpack)
+        if not is_zip and self._fingerprint_strategy == FingerprintStrategy.FULL:
+            # The full digest is only known once the archive has been read, so
+            # identify, unpack and list it in a single pass into a staging
+            # folder before adding it to the cache. Other strategies give the
+            # cache key up front, so a cache hit is found without extraction.
+            staging = cache.staging_path()
+            try:
+                sha1 = self._stream(to_unpack, staging, payload, entries, extraction, declared)
+            except BaseException:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+            package_fingerprint = Fingerprint(strategy=FingerprintStrategy.FULL, value=sha1.value)
+            lease = cache.acquire_staged(_cache_key(cache, package_fingerprint.key, payload),
+                                         staging)
+        else:
+            package_fingerprint = fingerprint(to_unpack, self._fingerprint_strategy)
+            key = _cache_key(cache, package_fingerprint.key, payload)
+            if is_zip:
+                lease = cache.acquire(
+                    key, lambda entry: extraction.append(self._unpack(to_unpack, entry, payload,
+                                                                      declared, entries)))
+            else:
+                lease = cache.acquire(
+                    key, lambda entry: self._stream(to_unpack, entry, payload, entries,
+                                                    extraction, declared))
 
         children = []
-        for path in Path(destination).iterdir():
-            children.append(path)
+        for path in Path(lease.path).iterdir():
+            if path.name != LISTING_NAME:
+                children.append(path)
         if len(children) != 1:
+            lease.close()
             # Dir unpacks to more than a single folder
             raise PackageError('Unpacking archive yields'
                                f'{len(children)} children.')
         if not os.path.isdir(children[0]):
+            lease.close()
             raise PackageError('Unpacking archive yields'
                                f'a single file child {children[0]}.')
-        return children[0].absolute()
+        root = children[0].absolute()
+        if not entries and Path(lease.path).joinpath(LISTING_NAME).is_file():
+            # A cached TAR unpacking, reuse the listing recorded when it was streamed
+            with ManifestReader(Path(lease.path).joinpath(LISTING_NAME)) as reader:
+                entries.append(list(reader))
+        manifest = _package_manifest(root, entries[0] if entries else None)
+        return PackageContext(to_unpack, root, is_archive=True,
+                              view=None if payload else ExtractingView(root, to_unpack, manifest),
+                              manifest=manifest,
+                              fingerprint=package_fingerprint,
+                              extraction=extraction[0] if extraction else None,
+                              lease=lease)
 
-    @staticmethod
-    def _unpack(to_unpack: Path, destination: Path) -> None:
-        if zipfile.is_zipfile(to_unpack):
-            with zipfile.ZipFile(to_unpack) as zip_ip:
-                zip_ip.extractall(path=destination)
-        elif tarfile.is_tarfile(to_unpack):
-            with tarfile.open(to_unpack) as tar_ip:
-                tar_ip.extractall(path=destination)
+    def _unpack(self, to_unpack: Path, destination: Path, payload: bool=True,
+                declared: Optional['_DeclaredAlgorithms']=None,
+                entries: Optional[list[list[ManifestEntry]]]=None) -> ThroughputStatistics:
+        listing: list[ManifestEntry] = []
+        if declared is not None:
+            # ZIP members are read at random, the METS file is read up front
+            declared.read_member(to_unpack)
+        extraction = extract_members(to_unpack, destination, payload, self._extraction_workers,
+                                     self._budget, self._throttle, self._controller,
+                                     declared if declared is not None else (), listing)
+        if entries is not None and declared is not None:
+            entries.append(listing)
+        return extraction
+
+    def _stream(self, to_unpack: Path, destination: Path, payload: bool,
+                entries: list[list[ManifestEntry]],
+                extraction: list[ThroughputStatistics],
+                declared: Optional['_DeclaredAlgorithms']=None) -> Checksum:
+        """Unpack a TAR archive with stream_tar, recording the member listing,
+        with member digests, and extraction throughput, returns the archive
+        SHA-1. The declared algorithms are learnt from the root METS file as
+        it's streamed, so the archive is only read once. The listing is kept
+        in the destination, beside the package, for reuse on cache hits."""
+        start = time.perf_counter()
+        sha1, listing = stream_tar(to_unpack, destination, payload,
+                                   declared if declared is not None else (),
+                                   budget=self._budget, throttle=self._throttle,
+                                   on_written=declared.written if declared is not None else None)
+        written = [ entry for entry in listing if payload or not is_payload(entry.path) ]
+        with ManifestWriter(destination.joinpath(LISTING_NAME), SourceType.PACKAGE, destination,
+                            index=False) as writer:
+            writer.write_all(listing)
+        entries.append(listing)
+        extraction.append(ThroughputStatistics(files=len(written),
+                                               bytes=sum(entry.size for entry in written),
+                                               seconds=time.perf_counter() - start))
+        return sha1
 
     @staticmethod
     def is_archive(to_test: Path) -> bool:
         """Return True if the file is a recognised archive type, False otherwise."""
-        if os.path.isfile(to_test):
-            if zipfile.is_zipfile(to_test):
-                return True
-            return tarfile.is_tarfile(to_test)
-        return False
+        return archive_type(to_test).is_archive
+
+class _DeclaredAlgorithms():
+    """The distinct checksum algorithms declared for files in the root METS
+    file of a package, in order of first use. Yields no algorithms until the
+    METS file has been read, a missing or unparseable METS file declares
+    none."""
+    def __init__(self) -> None:
+        self._algorithms: list[ChecksumAlg] = []
+
+    def __iter__(self) -> Iterator[ChecksumAlg]:
+        return iter(list(self._algorithms))
+
+    def read(self, mets_stream: BinaryIO) -> None:
+        """Read the algorithms declared in a root METS file stream."""
+        try:
+            for entry in MetsFiles.iter_file_entries(mets_stream, METS_NAME):
+                if entry.checksum.algorithm not in self._algorithms:
+                    self._algorithms.append(entry.checksum.algorithm)
+        except ValueError:
+            # Invalid METS is reported by validation, members just aren't hashed
+            pass
+
+    def read_member(self, archive: Path) -> None:
+        """Read the root METS file member of a ZIP archive."""
+        try:
+            with open_member(archive, f'{archive_root(archive)}/{METS_NAME}') as mets_stream:
+                self.read(mets_stream)
+        except (KeyError, OSError, PackageError, zipfile.BadZipFile):
+            pass
+
+    def written(self, name: str, target: Path) -> None:
+        """stream_tar callback, reads the root METS file once it's unpacked."""
+        parts = PurePosixPath(name).parts
+        if len(parts) == 2 and parts[1] == METS_NAME:
+            with open(target, 'rb') as mets_stream:
+                self.read(mets_stream)
+
+def _cache_key(cache: UnpackCache, identity: str, payload: bool) -> str:
+    if not payload and not cache.is_complete(identity):
+        return identity + METADATA_ONLY_SUFFIX
+    return identity
+
+def _package_manifest(root: Path, entries: Optional[list[ManifestEntry]]) -> Optional[Manifest]:
+    """Convert an archive member listing to a manifest relative to the package root."""
+    if entries is None:
+        return None
+    package_entries: list[ManifestEntry] = []
+    for entry in entries:
+        parts = PurePosixPath(entry.path).parts
+        if len(parts) > 1 and parts[0] == root.name:
+            package_entries.append(entry.model_copy(update={ 'path': '/'.join(parts[1:]) }))
+    return Manifest.model_validate({
+        'root': root,
+        'source': SourceType.PACKAGE,
+        'summary': None,
+        'entries': package_entries
+        })
@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Read only views of information package content, allowing packages to be
+validated from a folder or in place from a ZIP archive without extraction.
+"""
+from abc import ABC, abstractmethod
+import os
+from pathlib import Path, PurePosixPath
+import tempfile
+import threading
+from typing import BinaryIO, Iterator, Optional
+import zipfile
+
+from eark_validator.const import NO_PATH
+from eark_validator.infopacks.archives import (
+    archive_type,
+    extract_member,
+    extract_payload,
+    is_payload,
+    member_parts,
+    member_sizes
+)
+from eark_validator.model import ArchiveType, Manifest
+
+class PackageView(ABC):
+    """Read only view of the files and folders of a package.
+
+    Paths passed to a view are relative to the package root folder and use
+    forward slashes as separators, as used by METS hrefs."""
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """Returns the name of the package root folder."""
+
+    @abstractmethod
+    def is_file(self, rel_path: str) -> bool:
+        """Returns True if rel_path is a file in the package."""
+
+    @abstractmethod
+    def is_dir(self, rel_path: str) -> bool:
+        """Returns True if rel_path is a folder in the package."""
+
+    @abstractmethod
+    def list_dir(self, rel_path: str='') -> tuple[set[str], set[str]]:
+        """Returns the names of the folders and files in the folder rel_path,
+        two empty sets if rel_path is not a folder."""
+
+    @abstractmethod
+    def size(self, rel_path: str) -> int:
+        """Returns the size of the file rel_path in bytes."""
+
+    @abstractmethod
+    def open(self, rel_path: str) -> BinaryIO:
+        """Returns a binary stream for reading the file rel_path."""
+
+    @abstractmethod
+    def iter_files(self) -> Iterator[str]:
+        """Generator yielding the relative paths of every file in the package."""
+
+    def close(self) -> None:
+        """Release any resources held by the view."""
+
+class DirectoryView(PackageView):
+    """Package view backed by a package folder on disk."""
+    def __init__(self, root: Path):
+        self._root: Path = Path(root)
+
+    @property
+    def root(self) -> Path:
+        """Returns the package root folder."""
+        return self._root
+
+    @property
+    def name(self) -> str:
+        return self._root.name
+
+    def is_file(self, rel_path: str) -> bool:
+        return self._resolve(rel_path).is_file()
+
+    def is_dir(self, rel_path: str) -> bool:
+        return self._resolve(rel_path).is_dir()
+
+    def list_dir(self, rel_path: str='') -> tuple[set[str], set[str]]:
+        folders: set[str] = set()
+        files: set[str] = set()
+        to_scan = self._resolve(rel_path)
+        if to_scan.is_dir():
+            with os.scandir(to_scan) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        files.add(entry.name)
+                    elif entry.is_dir():
+                        folders.add(entry.name)
+        return folders, files
+
+    def size(self, rel_path: str) -> int:
+        return os.path.getsize(self._resolve(rel_path))
+
+    def open(self, rel_path: str) -> BinaryIO:
+        return open(self._resolve(rel_path), 'rb') # pylint: disable=R1732
+
+    def iter_files(self) -> Iterator[str]:
+        for subdir, _, files in os.walk(self._root):
+            rel_dir = Path(subdir).relative_to(self._root)
+            for file in files:
+                yield rel_dir.joinpath(file).as_posix()
+
+    def _resolve(self, rel_path: str) -> Path:
+        return self._root.joinpath(_normalise(rel_path))
+
+class ExtractingView(DirectoryView):
+    """Package view of an archive that was unpacked without its representation
+    payload. Payload files are listed from the member listing recorded while
+    unpacking, or from the archive if there's none, and are extracted on first
+    access to a temporary folder owned by the view, not to the unpacked
+    package, so the unpack cache's size accounting stays exact. The folder is
+    removed when the view is closed.
+
+    Paths that aren't payload are answered from the unpacked package without
+    reading the archive. ZIP payload members are extracted one at a time, the
+    payload of a TAR archive is extracted in a single pass when the first
+    payload file is read."""
+    def __init__(self, root: Path, archive: Path, listing: Optional[Manifest]=None):
+        super().__init__(root)
+        self._archive: Path = Path(archive)
+        self._is_zip: bool = archive_type(self._archive) == ArchiveType.ZIP
+        self._listing: Optional[Manifest] = listing
+        self._payload: Optional[dict[str, tuple[str, int]]] = None
+        self._scratch: Optional[tempfile.TemporaryDirectory] = None
+        self._lock = threading.Lock()
+
+    @property
+    def archive(self) -> Path:
+        """Returns the path to the archive the package was unpacked from."""
+        return self._archive
+
+    def is_file(self, rel_path: str) -> bool:
+        if super().is_file(rel_path):
+            return True
+        return self._is_payload(rel_path) and _normalise(rel_path) in self._payload_members()
+
+    def list_dir(self, rel_path: str='') -> tuple[set[str], set[str]]:
+        folders, files = super().list_dir(rel_path)
+        prefix = _normalise(rel_path)
+        if is_payload(f'{self.name}/{prefix}/_'):
+            files.update(name[len(prefix) + 1:] for name in self._payload_members()
+                         if name.rpartition('/')[0] == prefix)
+        return folders, files
+
+    def size(self, rel_path: str) -> int:
+        if not super().is_file(rel_path) and self._is_payload(rel_path):
+            member = self._payload_members().get(_normalise(rel_path))
+            if member:
+                return member[1]
+        return super().size(rel_path)
+
+    def open(self, rel_path: str) -> BinaryIO:
+        extracted = self.materialise(rel_path)
+        if extracted is None:
+            return super().open(rel_path)
+        return open(extracted, 'rb') # pylint: disable=R1732
+
+    def iter_files(self) -> Iterator[str]:
+        extracted = set(super().iter_files())
+        yield from extracted
+        yield from (name for name in self._payload_members() if name not in extracted)
+
+    def materialise(self, rel_path: str) -> Optional[Path]:
+        """Extract the payload file rel_path from the archive if it isn't
+        already on disk, returning the path of the extracted file. Returns
+        None if rel_path isn't payload missing from the unpacked package."""
+        if super().is_file(rel_path) or not self._is_payload(rel_path):
+            return None
+        member = self._payload_members().get(_normalise(rel_path))
+        if member is None:
+            return None
+        with self._lock:
+            if self._scratch is None:
+                self._scratch = tempfile.TemporaryDirectory(prefix='eark-payload-') # pylint: disable=R1732
+                if not self._is_zip:
+                    extract_payload(self._archive, Path(self._scratch.name))
+            target = Path(self._scratch.name).joinpath(*member_parts(member[0]))
+            if self._is_zip and not target.is_file():
+                extract_member(self._archive, member[0], target)
+            return target
+
+    def close(self) -> None:
+        """Remove the payload files extracted on demand."""
+        with self._lock:
+            if self._scratch is not None:
+                self._scratch.cleanup()
+                self._scratch = None
+
+    def _is_payload(self, rel_path: str) -> bool:
+        return is_payload(f'{self.name}/{_normalise(rel_path)}')
+
+    def _payload_members(self) -> dict[str, tuple[str, int]]:
+        """Lazily index the payload members by package relative path, from the
+        listing if there is one, otherwise from the archive."""
+        with self._lock:
+            if self._payload is None:
+                if self._listing is not None and not self._is_zip:
+                    sizes = { f'{self.name}/{entry.path}': entry.size
+                              for entry in self._listing.entries }
+                else:
+                    sizes = member_sizes(self._archive)
+                self._payload = {}
+                for name, size in sizes.items():
+                    parts = member_parts(name)
+                    if is_payload(name) and parts[0] == self.name:
+                        self._payload['/'.join(parts[1:])] = (name, size)
+            return self._payload
+
+class ZipView(PackageView):
+    """Package view backed by the members of a ZIP archive, nothing is
+    written to disk. Member content is decompressed on demand."""
+    def __init__(self, archive: Path, root_name: str):
+        if not os.path.isfile(archive):
+            raise FileNotFoundError(NO_PATH.format(archive))
+        self._archive: Path = Path(archive)
+        self._root_name: str = root_name
+        self._zip_file: zipfile.ZipFile = zipfile.ZipFile(archive) # pylint: disable=R1732
+        self._members: dict[str, zipfile.ZipInfo] = {}
+        self._folders: dict[str, tuple[set[str], set[str]]] = { '': (set(), set()) }
+        for info in self._zip_file.infolist():
+            parts = PurePosixPath(info.filename).parts
+            if not parts or parts[0] != root_name:
+                continue
+            rel_path = '/'.join(parts[1:])
+            if info.is_dir():
+                self._add_folder(rel_path)
+            elif rel_path:
+                self._members[rel_path] = info
+                parent, _, name = rel_path.rpartition('/')
+                self._add_folder(parent)
+                self._folders[parent][1].add(name)
+
+    @property
+    def archive(self) -> Path:
+        """Returns the path to the ZIP archive."""
+        return self._archive
+
+    @property
+    def name(self) -> str:
+        return self._root_name
+
+    @property
+    def uncompressed_size(self) -> int:
+        """Returns the total uncompressed size of the package files in bytes."""
+        return sum(info.file_size for info in self._members.values())
+
+    def is_file(self, rel_path: str) -> bool:
+        return _normalise(rel_path) in self._members
+
+    def is_dir(self, rel_path: str) -> bool:
+        return _normalise(rel_path) in self._folders
+
+    def list_dir(self, rel_path: str='') -> tuple[set[str], set[str]]:
+        folders, files = self._folders.get(_normalise(rel_path), (set(), set()))
+        return set(folders), set(files)
+
+    def size(self, rel_path: str) -> int:
+        return self._member(rel_path).file_size
+
+    def open(self, rel_path: str) -> BinaryIO:
+        return self._zip_file.open(self._member(rel_path))
+
+    def iter_files(self) -> Iterator[str]:
+        yield from self._members
+
+    def close(self) -> None:
+        self._zip_file.close()
+
+    def _member(self, rel_path: str) -> zipfile.ZipInfo:
+        info = self._members.get(_normalise(rel_path))
+        if info is None:
+            raise FileNotFoundError(NO_PATH.format(f'{self._archive}/{self._root_name}/{rel_path}'))
+        return info
+
+    def _add_folder(self, rel_path: str) -> None:
+        rel_path = rel_path.rstrip('/')
+        while rel_path:
+            self._folders.setdefault(rel_path, (set(), set()))
+            parent, _, name = rel_path.rpartition('/')
+            siblings = self._folders.setdefault(parent, (set(), set()))[0]
+            if name in siblings:
+                return
+            siblings.add(name)
+            rel_path = parent
+
+def _normalise(rel_path: str | Path) -> str:
+    """Normalise a relative package path to forward slash form without
+    leading ./ or trailing separators."""
+    to_normalise = str(rel_path).replace(os.sep, '/')
+    if to_normalise.startswith('file://./'):
+        to_normalise = to_normalise[9:]
+    normalised = PurePosixPath(to_normalise)
+    if normalised.is_absolute() or '..' in normalised.parts:
+        raise ValueError(f'Path {rel_path} is not within the package.')
+    return '' if normalised.as_posix() == '.' else normalised.as_posix()
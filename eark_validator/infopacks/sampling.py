@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Seedable random sampling of manifest entries for fixity spot checks.
+"""
+import math
+from pathlib import PurePosixPath
+import random
+from typing import Optional
+
+from eark_validator.model import Manifest, ManifestEntry, SampleSummary
+
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_DEFECT_RATE = 0.01
+METS_NAME = 'METS.xml'
+METADATA = 'metadata'
+
+class ManifestSampler:
+    """Selects a random, reproducible subset of a manifest's entries.
+
+    METS files and files in metadata folders are always included. The other
+    entries are shuffled with a seeded generator and taken until the count
+    or byte budget, which don't include the required files, is reached. If
+    confidence is given the sample is sized so that, if every sampled file
+    verifies, at most defect_rate of the package's files are corrupt at that
+    confidence level. With no limits every entry is sampled.
+
+    Files larger than the remaining byte budget are skipped, so a sample
+    limited by max_bytes favours small files. Skipped files and bytes are
+    reported in the summary, whose max_defect_rate is then None, as the
+    sample is no longer uniform and supports no bound."""
+    def __init__(self, count: Optional[int]=None, max_bytes: Optional[int]=None,
+                 confidence: Optional[float]=None, defect_rate: float=DEFAULT_DEFECT_RATE,
+                 seed: Optional[int]=None):
+        if confidence is not None and not 0 < confidence < 1:
+            raise ValueError(f'Confidence {confidence} must be between 0 and 1.')
+        if not 0 < defect_rate < 1:
+            raise ValueError(f'Defect rate {defect_rate} must be between 0 and 1.')
+        self._count: Optional[int] = count
+        self._max_bytes: Optional[int] = max_bytes
+        self._confidence: Optional[float] = confidence
+        self._defect_rate: float = defect_rate
+        self._seed: int = seed if seed is not None else random.SystemRandom().getrandbits(32)
+
+    @property
+    def seed(self) -> int:
+        """Return the seed used to select entries, reusing it repeats a sample."""
+        return self._seed
+
+    def sample(self, manifest: Manifest) -> tuple[Manifest, SampleSummary]:
+        """Return a manifest holding the sampled entries, in manifest order,
+        and a summary of the sample's coverage."""
+        required: list[int] = []
+        optional: list[int] = []
+        for position, entry in enumerate(manifest.entries):
+            (required if is_required(entry) else optional).append(position)
+        random.Random(self._seed).shuffle(optional)
+        limit = self._limit(len(optional))
+        chosen: list[int] = []
+        budget = self._max_bytes
+        excluded_files = excluded_bytes = 0
+        for position in optional:
+            if len(chosen) >= limit:
+                break
+            size = manifest.entries[position].size
+            if budget is not None:
+                if size > budget:
+                    excluded_files += 1
+                    excluded_bytes += size
+                    continue
+                budget -= size
+            chosen.append(position)
+        entries = [ manifest.entries[position] for position in sorted(required + chosen) ]
+        confidence = self._confidence if self._confidence is not None else DEFAULT_CONFIDENCE
+        summary = SampleSummary(seed=self._seed, file_count=len(entries),
+                                total_files=manifest.file_count,
+                                byte_count=sum(entry.size for entry in entries),
+                                total_bytes=manifest.total_size, confidence=confidence,
+                                max_defect_rate=None if excluded_files else
+                                defect_bound(len(chosen), len(optional), confidence),
+                                excluded_files=excluded_files, excluded_bytes=excluded_bytes)
+        return manifest.model_copy(update={ 'entries': entries }), summary
+
+    def _limit(self, population: int) -> int:
+        limits = [ population ]
+        if self._count is not None:
+            limits.append(max(0, self._count))
+        if self._confidence is not None:
+            limits.append(sample_size(self._confidence, self._defect_rate))
+        return min(limits)
+
+def is_required(entry: ManifestEntry) -> bool:
+    """Return True if the entry is a METS file or package metadata, which
+    are always verified."""
+    path = PurePosixPath(str(entry.path).replace('\\', '/'))
+    return path.name == METS_NAME or METADATA in path.parts[:-1]
+
+def sample_size(confidence: float, defect_rate: float) -> int:
+    """Return the number of files that must verify to be confident that at
+    most defect_rate of the population is corrupt."""
+    return math.ceil(math.log(1 - confidence) / math.log(1 - defect_rate))
+
+def defect_bound(sampled: int, population: int, confidence: float) -> float:
+    """Return the upper bound on the fraction of corrupt files in the
+    population, at the confidence level, if all sampled files verify."""
+    if sampled >= population:
+        return 0.0
+    if sampled == 0:
+        return 1.0
+    return 1 - (1 - confidence) ** (1 / sampled)
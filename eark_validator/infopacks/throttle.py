@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Token bucket rate limiting of the I/O done by hashing and extraction.
+"""
+import threading
+import time
+from typing import Optional
+
+from eark_validator.model import ThrottleStatistics
+
+DEFAULT_BURST = 0.25
+
+class IOThrottle:
+    """Thread safe token bucket limiting bytes and operations per second.
+
+    Each bucket holds up to burst seconds worth of tokens. Callers reserve the
+    tokens for an I/O before sleeping off any deficit, so concurrent workers
+    share the rate fairly and a single large read is spread over time rather
+    than refused. A rate of None is unlimited. Rates can be changed while the
+    throttle is in use, e.g. to slow validation during working hours."""
+    def __init__(self, bytes_per_second: Optional[float]=None, iops: Optional[float]=None,
+                 burst: float=DEFAULT_BURST):
+        if burst <= 0:
+            raise ValueError(f'Burst {burst} must be greater than zero.')
+        self._lock = threading.Lock()
+        self._burst: float = burst
+        self._bytes_per_second: Optional[float] = _rate(bytes_per_second)
+        self._iops: Optional[float] = _rate(iops)
+        self._byte_tokens: float = self._capacity(self._bytes_per_second)
+        self._op_tokens: float = self._capacity(self._iops)
+        self._last: float = time.monotonic()
+        self._bytes = self._operations = 0
+        self._waited: float = 0.0
+
+    @property
+    def bytes_per_second(self) -> Optional[float]:
+        """Return the byte rate limit, None if unlimited."""
+        return self._bytes_per_second
+
+    @bytes_per_second.setter
+    def bytes_per_second(self, value: Optional[float]) -> None:
+        with self._lock:
+            self._refill()
+            self._bytes_per_second = _rate(value)
+            self._byte_tokens = min(self._byte_tokens, self._capacity(self._bytes_per_second))
+
+    @property
+    def iops(self) -> Optional[float]:
+        """Return the I/O operations per second limit, None if unlimited."""
+        return self._iops
+
+    @iops.setter
+    def iops(self, value: Optional[float]) -> None:
+        with self._lock:
+            self._refill()
+            self._iops = _rate(value)
+            self._op_tokens = min(self._op_tokens, self._capacity(self._iops))
+
+    @property
+    def statistics(self) -> ThrottleStatistics:
+        """Returns the bytes, operations and delay seen by this throttle."""
+        with self._lock:
+            return ThrottleStatistics(bytes=self._bytes, operations=self._operations,
+                                      waited=self._waited)
+
+    def consume(self, count: int, operations: int=1) -> float:
+        """Account for an I/O of count bytes, blocking until it's within the
+        rate limits. Returns the time in seconds the caller was delayed."""
+        with self._lock:
+            self._refill()
+            self._bytes += count
+            self._operations += operations
+            delay = 0.0
+            if self._bytes_per_second is not None:
+                self._byte_tokens -= count
+                delay = max(delay, -self._byte_tokens / self._bytes_per_second)
+            if self._iops is not None:
+                self._op_tokens -= operations
+                delay = max(delay, -self._op_tokens / self._iops)
+            self._waited += delay
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last
+        self._last = now
+        if self._bytes_per_second is not None:
+            self._byte_tokens = min(self._capacity(self._bytes_per_second),
+                                    self._byte_tokens + elapsed * self._bytes_per_second)
+        if self._iops is not None:
+            self._op_tokens = min(self._capacity(self._iops),
+                                  self._op_tokens + elapsed * self._iops)
+
+    def _capacity(self, rate: Optional[float]) -> float:
+        return rate * self._burst if rate is not None else 0.0
+
+def _rate(value: Optional[float]) -> Optional[float]:
+    if value is not None and value <= 0:
+        raise ValueError(f'Rate {value} must be greater than zero.')
+    return value
@@ -0,0 +1,366 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Managed, content addressed cache of unpacked archives.
+"""
+from contextlib import contextmanager
+import json
+import os
+from pathlib import Path
+import shutil
+import tempfile
+import threading
+import time
+from typing import Callable, Generator, Iterable, Optional
+
+from eark_validator.model.cache import CacheStatistics
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+COMPLETE_SUFFIX = '.complete'
+STAGING_PREFIX = '.staging-'
+LOCK_SUFFIX = '.lock'
+LEASE_SUFFIX = '.lease'
+# Byte ranges locked by leases where shared file locks aren't available
+LEASE_SLOTS = 1024
+SIZE = 'size'
+
+class UnpackCache():
+    """Cache of unpacked archives, keyed by archive identity.
+
+    Each entry is a folder named by key beneath the cache root. A sibling
+    completion marker records that the entry was fully populated, and its
+    modification time is used for least recently used eviction. Entries are
+    created under a per-key file lock so concurrent workers unpacking the same
+    archive wait for, and then reuse, a single extraction.
+
+    Workers reading from an entry hold a CacheLease, a shared lock on a second
+    per-key file, and entries are only evicted or cleared while no lease is
+    held. The lease is taken before the creation lock is released, so an
+    entry can't be removed between being created and being read."""
+    def __init__(self, root: Path, max_bytes: Optional[int]=None):
+        self._root: Path = Path(root)
+        self._max_bytes: Optional[int] = max_bytes
+        self._stats_lock = threading.Lock()
+        self._hits = self._misses = self._evictions = 0
+
+    @property
+    def root(self) -> Path:
+        """Returns the root directory of the cache."""
+        return self._root
+
+    @property
+    def max_bytes(self) -> Optional[int]:
+        """Returns the disk budget for the cache in bytes, None if unbounded."""
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: Optional[int]) -> None:
+        self._max_bytes = value
+
+    @property
+    def statistics(self) -> CacheStatistics:
+        """Returns the hit, miss and eviction counts for this cache instance."""
+        with self._stats_lock:
+            return CacheStatistics(hits=self._hits, misses=self._misses, evictions=self._evictions)
+
+    def entry_path(self, key: str) -> Path:
+        """Returns the folder used for the cache entry key."""
+        return self._root.joinpath(key)
+
+    def is_complete(self, key: str) -> bool:
+        """Returns True if the entry for key has been fully populated."""
+        return _marker_path(self._root, key).is_file() and self.entry_path(key).is_dir()
+
+    def size(self) -> int:
+        """Returns the total recorded size of all complete entries in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    @contextmanager
+    def lock(self, key: str, blocking: bool=True) -> Generator[bool, None, None]:
+        """Context manager holding the exclusive lock for a cache key,
+        yields False if the lock was not acquired when non-blocking."""
+        self._root.mkdir(parents=True, exist_ok=True)
+        with _KeyLock(self._root.joinpath(key + LOCK_SUFFIX)) as key_lock:
+            acquired = key_lock.acquire(blocking)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    key_lock.release()
+
+    def get_or_create(self, key: str, populate: Callable[[Path], None]) -> Path:
+        """Return the entry folder for key, calling populate with the folder to
+        fill if there is no complete entry. Partial entries left by failed
+        extractions are discarded before populating. The entry isn't leased,
+        use acquire to protect it from eviction while it's read."""
+        with self.acquire(key, populate) as lease:
+            return lease.path
+
+    def acquire(self, key: str, populate: Callable[[Path], None]) -> 'CacheLease':
+        """As get_or_create, returning a lease on the entry that must be
+        closed once the entry is no longer read."""
+        destination = self.entry_path(key)
+        with self.lock(key):
+            if self.is_complete(key):
+                os.utime(_marker_path(self._root, key))
+                self._count(hits=1)
+                return self._lease(key)
+            self._count(misses=1)
+            if destination.exists():
+                shutil.rmtree(destination)
+            try:
+                populate(destination)
+            except BaseException:
+                shutil.rmtree(destination, ignore_errors=True)
+                raise
+            _write_marker(self._root, key, _folder_size(destination))
+            lease = self._lease(key)
+        self.evict(exclude=[ key ])
+        return lease
+
+    def lease(self, key: str) -> Optional['CacheLease']:
+        """Lease the complete entry for key, None if there isn't one."""
+        with self.lock(key):
+            if not self.is_complete(key):
+                return None
+            return self._lease(key)
+
+    def staging_path(self) -> Path:
+        """Returns a new, empty folder beneath the cache root used to populate
+        an entry whose key isn't known until it has been populated."""
+        self._root.mkdir(parents=True, exist_ok=True)
+        return Path(tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=self._root))
+
+    def adopt(self, key: str, staged: Path) -> Path:
+        """Move a populated staging folder into the cache as the entry for key.
+        If a complete entry for key already exists the staged folder is
+        discarded and the existing entry is returned. The entry isn't leased."""
+        with self.acquire_staged(key, staged) as lease:
+            return lease.path
+
+    def acquire_staged(self, key: str, staged: Path) -> 'CacheLease':
+        """As adopt, returning a lease on the entry that must be closed once
+        the entry is no longer read."""
+        destination = self.entry_path(key)
+        with self.lock(key):
+            if self.is_complete(key):
+                shutil.rmtree(staged, ignore_errors=True)
+                os.utime(_marker_path(self._root, key))
+                self._count(hits=1)
+                return self._lease(key)
+            self._count(misses=1)
+            if destination.exists():
+                shutil.rmtree(destination)
+            os.replace(staged, destination)
+            _write_marker(self._root, key, _folder_size(destination))
+            lease = self._lease(key)
+        self.evict(exclude=[ key ])
+        return lease
+
+    def evict(self, exclude: Iterable[str]=()) -> int:
+        """Remove least recently used entries until the cache is within budget,
+        skipping excluded keys and entries locked or leased by other workers.
+        Returns the number of entries evicted."""
+        if self._max_bytes is None:
+            return 0
+        excluded = set(exclude)
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for key, size, _ in entries:
+            if total <= self._max_bytes:
+                break
+            if key in excluded:
+                continue
+            with self.lock(key, blocking=False) as acquired:
+                if not acquired or not self._remove(key):
+                    continue
+            total -= size
+            evicted += 1
+        self._count(evictions=evicted)
+        return evicted
+
+    def clear(self) -> None:
+        """Remove all entries from the cache that aren't locked or leased."""
+        for key, _, _ in self._entries():
+            with self.lock(key, blocking=False) as acquired:
+                if acquired:
+                    self._remove(key)
+
+    def _lease(self, key: str) -> 'CacheLease':
+        """Lease the entry for key, the caller must hold the key's lock."""
+        lease_lock = _KeyLock(self._root.joinpath(key + LEASE_SUFFIX))
+        lease_lock.acquire(shared=True)
+        return CacheLease(self.entry_path(key), lease_lock)
+
+    def _remove(self, key: str) -> bool:
+        """Remove the entry for key and its lock files unless it's leased,
+        the caller must hold the key's lock. Returns True if removed."""
+        lease_path = self._root.joinpath(key + LEASE_SUFFIX)
+        with _KeyLock(lease_path) as lease_lock:
+            if not lease_lock.acquire(blocking=False):
+                return False
+            _marker_path(self._root, key).unlink(missing_ok=True)
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
+            for lock_path in (lease_path, self._root.joinpath(key + LOCK_SUFFIX)):
+                try:
+                    lock_path.unlink(missing_ok=True)
+                except OSError:
+                    # Open lock files can't be removed on some platforms
+                    pass
+        return True
+
+    def _entries(self) -> list[tuple[str, int, float]]:
+        """Return a list of key, size and last used time for complete entries."""
+        entries = []
+        if not self._root.is_dir():
+            return entries
+        for marker in self._root.glob('*' + COMPLETE_SUFFIX):
+            try:
+                with open(marker, 'r', encoding='utf-8') as marker_file:
+                    size = int(json.load(marker_file).get(SIZE, 0))
+                entries.append((marker.name[:-len(COMPLETE_SUFFIX)], size, marker.stat().st_mtime))
+            except (OSError, ValueError, AttributeError):
+                # Markers removed or written concurrently are ignored
+                continue
+        return entries
+
+    def _count(self, hits: int=0, misses: int=0, evictions: int=0) -> None:
+        with self._stats_lock:
+            self._hits += hits
+            self._misses += misses
+            self._evictions += evictions
+
+class CacheLease():
+    """Shared hold on a complete cache entry, the entry isn't evicted or
+    cleared until the lease is closed."""
+    def __init__(self, path: Path, lock: '_KeyLock'):
+        self._path: Path = path
+        self._lock: Optional[_KeyLock] = lock
+
+    @property
+    def path(self) -> Path:
+        """Returns the leased entry folder."""
+        return self._path
+
+    def close(self) -> None:
+        """Release the lease."""
+        if self._lock is not None:
+            self._lock.release()
+            self._lock.close()
+            self._lock = None
+
+    def __enter__(self) -> 'CacheLease':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+class _KeyLock():
+    """Inter-process lock backed by a lock file, held exclusively or shared.
+
+    Lock files are removed with their entries, so a lock acquired on a file
+    that has since been unlinked is dropped and taken again on the new file."""
+    def __init__(self, path: Path):
+        self._path: Path = path
+        self._file = open(path, 'a+b') # pylint: disable=R1732
+        self._range: tuple[int, int] = (0, 1)
+
+    def __enter__(self) -> '_KeyLock':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def acquire(self, blocking: bool=True, shared: bool=False) -> bool:
+        if fcntl:
+            mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+            while True:
+                try:
+                    fcntl.flock(self._file.fileno(), mode if blocking else mode | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False
+                if self._is_current():
+                    return True
+                self._file.close()
+                self._file = open(self._path, 'a+b') # pylint: disable=R1732
+        # Without shared locks each lease locks one byte of a range, an
+        # exclusive lock takes the whole range
+        ranges = [ (slot, 1) for slot in range(LEASE_SLOTS) ] if shared else [ (0, LEASE_SLOTS) ]
+        while True:
+            for offset, count in ranges:
+                try:
+                    self._file.seek(offset)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, count)
+                    self._range = (offset, count)
+                    return True
+                except OSError:
+                    continue
+            if not blocking:
+                return False
+            time.sleep(0.1)
+
+    def release(self) -> None:
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            return
+        offset, count = self._range
+        self._file.seek(offset)
+        msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, count)
+
+    def _is_current(self) -> bool:
+        """Returns True if the open lock file is still the one at the path."""
+        try:
+            current = os.stat(self._path)
+        except FileNotFoundError:
+            return False
+        opened = os.fstat(self._file.fileno())
+        return (opened.st_dev, opened.st_ino) == (current.st_dev, current.st_ino)
+
+def _marker_path(root: Path, key: str) -> Path:
+    return root.joinpath(key + COMPLETE_SUFFIX)
+
+def _write_marker(root: Path, key: str, size: int) -> None:
+    marker = _marker_path(root, key)
+    partial = marker.with_name(marker.name + '.tmp')
+    with open(partial, 'w', encoding='utf-8') as marker_file:
+        json.dump({ SIZE: size }, marker_file)
+    os.replace(partial, marker)
+
+def _folder_size(folder: Path) -> int:
+    size = 0
+    for subdir, _, files in os.walk(folder):
+        for file in files:
+            size += os.lstat(os.path.join(subdir, file)).st_size
+    return size
@@ -132,9 +132,10 @@ class SchematronRuleset():
             if ele.tag == SCHEMATRON_NS + 'report':
                 yield ele
 
-    def validate(self, to_validate: str) -> ET.Element:
-        """Validate a file against the loaded Schematron ruleset."""
-        xml_file = ET.parse(to_validate)
+    def validate(self, to_validate: str | ET._ElementTree) -> ET.Element: # pylint: disable=W0212
+        """Validate a file, or an already parsed XML document, against the
+        loaded Schematron ruleset."""
+        xml_file = to_validate if hasattr(to_validate, 'getroot') else ET.parse(to_validate)
         self.schematron.validate(xml_file)
         return self.schematron.validation_report
 
@@ -25,10 +25,11 @@
 """METS Schema validation."""
 import os
 from pathlib import Path
-from typing import Dict, List
+from typing import BinaryIO, Dict, Iterator, List, Optional
 
 from lxml import etree
 
+from eark_validator.infopacks.package_view import PackageView
 from eark_validator.ipxml.schema import IP_SCHEMA
 from eark_validator.ipxml.namespaces import Namespaces
 from eark_validator.model.checksum import Checksum, ChecksumAlg
@@ -63,11 +64,16 @@ class MetsFiles():
         path: Path = get_path(mets_file, True)
         if not path.is_file():
             raise ValueError(NOT_FILE.format(mets_file))
+        return MetsFiles.from_stream(mets_file, mets_file)
+
+    @staticmethod
+    def from_stream(mets_stream: BinaryIO | Path | str, name: str='') -> MetsFile:
+        """Parse a METS file from a binary stream, e.g. a package archive member."""
         ns: dict[str, str] = {}
         entries: list[FileEntry] = []
         othertype = contentinformationtype = oaispackagetype = mets_root = ''
         try:
-            parsed_mets = etree.iterparse(mets_file, events=[START_ELE, START_NS])
+            parsed_mets = etree.iterparse(mets_stream, events=[START_ELE, START_NS])
             for event, element in parsed_mets:
                 if event == START_NS:
                     prefix = element[0]
@@ -91,7 +97,7 @@ class MetsFiles():
                         ]:
                         entries.append(_parse_file_entry(element))
         except etree.XMLSyntaxError as ex:
-            raise ValueError(NOT_VALID_FILE.format(mets_file, 'XML')) from ex
+            raise ValueError(NOT_VALID_FILE.format(name, 'XML')) from ex
         return MetsFile.model_validate({
             'root': mets_root,
             'oaispackagetype': oaispackagetype,
@@ -100,11 +106,35 @@ class MetsFiles():
             'file_entries': entries
             })
 
+    @staticmethod
+    def iter_file_entries(mets_stream: BinaryIO | Path | str, name: str='') -> Iterator[FileEntry]:
+        """Yield the file and metadata references of a METS file one at a time.
+
+        Parsed elements are discarded as soon as they've been read, so the
+        memory used doesn't grow with the number of files referenced. Entries
+        missing required attributes are skipped, they're reported by schema
+        validation."""
+        try:
+            for _, element in etree.iterparse(mets_stream, events=['end'],
+                                              tag=[ Namespaces.METS.qualify('file'),
+                                                    Namespaces.METS.qualify('mdRef') ]):
+                try:
+                    yield _parse_file_entry(element)
+                except (KeyError, ValueError):
+                    pass
+                element.clear(keep_tail=True)
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+        except etree.XMLSyntaxError as ex:
+            raise ValueError(NOT_VALID_FILE.format(name, 'XML')) from ex
+
 class MetsValidator():
-    """Encapsulates METS schema validation."""
-    def __init__(self, root: str):
+    """Encapsulates METS schema validation. If a package view is supplied
+    relative METS paths are read through the view rather than from disk."""
+    def __init__(self, root: str, view: Optional[PackageView]=None):
         self._validation_errors: List[Result] = []
         self._package_root: str = root
+        self._view: Optional[PackageView] = view
         self._reps_mets: Dict[str , str] = {}
         self._file_refs: List[FileEntry] = []
 
@@ -145,17 +175,23 @@ class MetsValidator():
         @param mets:    Path leading to a Mets file that will be evaluated.
         @return:        Boolean validation result.
         '''
+        if self._view and not _is_absolute(mets):
+            with self._view.open(mets) as mets_stream:
+                return self._validate_source(mets_stream, mets)
         # Handle relative package paths for representation METS files.
         self._package_root, mets = _handle_rel_paths(self._package_root, mets)
+        return self._validate_source(mets, mets)
+
+    def _validate_source(self, source: BinaryIO | str, mets: str) -> bool:
         try:
-            parsed_mets = etree.iterparse(mets, schema=IP_SCHEMA.get('csip'))
+            parsed_mets = etree.iterparse(source, schema=IP_SCHEMA.get('csip'))
             for _, element in parsed_mets:
                 self._process_element(element)
         except etree.XMLSyntaxError as synt_err:
             self._validation_errors.append(
                 Result.model_validate({
                     'rule_id': 'XML-1',
-                    'location': synt_err.filename + str(synt_err.lineno) + str(synt_err.offset),
+                    'location': str(synt_err.filename or mets) + str(synt_err.lineno) + str(synt_err.offset),
                     'message': f'File {mets} is not valid XML. {synt_err.msg}',
                     'severity': 'Error'
                     })
@@ -214,8 +250,11 @@ def _checksum_from_mets_element(element: etree.Element) -> Checksum:
         'value': element.attrib['CHECKSUM']},
             strict=True)
 
+def _is_absolute(metspath: str) -> bool:
+    return metspath.startswith('file:///') or os.path.isabs(metspath)
+
 def _handle_rel_paths(rootpath: str, metspath: str) -> tuple[str, str]:
-    if metspath.startswith('file:///') or os.path.isabs(metspath):
+    if _is_absolute(metspath):
         return metspath.rsplit('/', 1)[0], metspath
     if metspath.startswith('file://./'):
         relpath = os.path.join(rootpath, metspath[9:])
@@ -28,8 +28,28 @@ E-ARK : Information Package Validation
         Information Package model types and constants.
 """
 # import models into model package
+from .archive_type import ArchiveType
+from .cache import CacheStatistics, CacheTrust
 from .checksum import Checksum, ChecksumAlg
-from .manifest import Manifest, ManifestEntry, SourceType
+from .extraction_budget import ExtractionBudget
+from .file_order import FileOrder
+from .fingerprint import Fingerprint, FingerprintStrategy
+from .manifest import (
+        IssueType,
+        Manifest,
+        ManifestEntry,
+        ManifestHeader,
+        ManifestIssue,
+        ManifestSummary,
+        SampleSummary,
+        SourceType
+)
+from .throughput import (
+        ConcurrencyStatistics,
+        HardlinkStatistics,
+        ThrottleStatistics,
+        ThroughputStatistics
+)
 from .validation_report import ValidationReport
 from .package_details import PackageDetails
 from .package_details import Representation
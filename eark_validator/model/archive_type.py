@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# flake8: noqa
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""
+    E-ARK : Information Package Validation Model types
+    Types for the archive formats used to package information packages
+"""
+from enum import Enum, unique
+
+@unique
+class ArchiveType(str, Enum):
+    """
+    Enumerated type for the archive formats recognised by magic byte detection.
+    """
+    ZIP = 'zip'
+    TAR = 'tar'
+    TAR_GZ = 'tar.gz'
+    TAR_BZ2 = 'tar.bz2'
+    TAR_XZ = 'tar.xz'
+    NONE = 'none'
+    """Not a file, or not a recognised archive format."""
+
+    @property
+    def is_archive(self) -> bool:
+        """Returns True if the type is a recognised archive format."""
+        return self != ArchiveType.NONE
+
+    @property
+    def is_tar(self) -> bool:
+        """Returns True if the type is a, possibly compressed, TAR archive."""
+        return self.is_archive and self != ArchiveType.ZIP
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# flake8: noqa
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""
+    E-ARK : Information Package Validation Model types
+    Types for cache usage statistics
+"""
+from enum import Enum, unique
+
+from pydantic import BaseModel
+
+@unique
+class CacheTrust(str, Enum):
+    """
+    Enumerated type for the checksum cache trust policies.
+    """
+    TRUST_UNCHANGED = 'trust-unchanged'
+    """Reuse a cached digest if the file's device, inode, size and mtime are unchanged."""
+    ALWAYS_REHASH = 'always-rehash'
+    """Always hash files, the cache is refreshed but never trusted."""
+
+class CacheStatistics(BaseModel):
+    """
+    Model type for cache hit, miss and eviction counts
+    """
+    hits: int = 0
+    """The number of lookups satisfied from the cache."""
+    misses: int = 0
+    """The number of lookups that had to populate the cache."""
+    evictions: int = 0
+    """The number of entries removed from the cache to stay within budget."""
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups > 0 else 0.0
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# flake8: noqa
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""
+    E-ARK : Information Package Validation Model types
+    Types for the resource limits applied when unpacking archives
+"""
+from typing import Optional
+
+from pydantic import BaseModel
+
+class ExtractionBudget(BaseModel):
+    """
+    Model type for the resource limits of a single archive extraction,
+    None means unlimited
+    """
+    max_bytes: Optional[int] = None
+    """The maximum number of uncompressed bytes written."""
+    max_members: Optional[int] = None
+    """The maximum number of archive members, including folders."""
+    max_ratio: Optional[float] = None
+    """The maximum ratio of uncompressed bytes written to archive file size."""
+    max_seconds: Optional[float] = None
+    """The maximum wall clock time for the extraction in seconds."""
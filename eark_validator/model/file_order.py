@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# flake8: noqa
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""
+    E-ARK : Information Package Validation Model types
+    Types for the order files are read in during verification
+"""
+from enum import Enum, unique
+
+@unique
+class FileOrder(str, Enum):
+    """
+    Enumerated type for the orders files can be verified in.
+    """
+    MANIFEST = 'manifest'
+    """The order of the manifest, i.e. directory walk or METS document order."""
+    SIZE = 'size'
+    """Largest file first, so big files don't hold up the end of a parallel run."""
+    INODE = 'inode'
+    """Ascending device and inode number, a cheap proxy for on-disk layout."""
+    PHYSICAL = 'physical'
+    """Ascending physical offset of each file's first extent, where the file
+    system reports it, otherwise inode order."""
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# flake8: noqa
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""
+    E-ARK : Information Package Validation Model types
+    Types for archive fingerprints used to identify packages
+"""
+from enum import Enum, unique
+
+from pydantic import BaseModel
+
+@unique
+class FingerprintStrategy(str, Enum):
+    """
+    Enumerated type for the supported archive fingerprint strategies,
+    from cheapest to most expensive.
+    """
+    STAT = 'stat'
+    """Size, modification time and inode of the archive file."""
+    STRUCTURE = 'structure'
+    """Hash of the file stat and the ZIP central directory or TAR member headers."""
+    SAMPLED = 'sampled'
+    """Hash of the file stat and the head, middle and tail blocks of the archive."""
+    FULL = 'full'
+    """SHA-1 hash of the entire archive file."""
+
+class Fingerprint(BaseModel):
+    """
+    Model type for an archive fingerprint
+    """
+    strategy: FingerprintStrategy = FingerprintStrategy.FULL
+    """The strategy used to calculate the fingerprint."""
+    value: str = ''
+    """The fingerprint value as an uppercase hexadecimal string."""
+
+    @property
+    def key(self) -> str:
+        """Returns a file name safe key for the fingerprint, full fingerprints
+        are the bare archive SHA-1 value."""
+        if self.strategy == FingerprintStrategy.FULL:
+            return self.value
+        return f'{self.strategy.value}-{self.value}'
@@ -29,7 +29,7 @@ from typing import List, Optional
 
 from pydantic import BaseModel
 
-from .checksum import Checksum
+from .checksum import Checksum, ChecksumAlg
 from .constants import METS, UNKNOWN, PACKAGE # pylint: disable=W0611
 
 class ManifestEntry(BaseModel):
@@ -37,6 +37,50 @@ class ManifestEntry(BaseModel):
     size : int = 0
     checksums : List[Checksum] = []
 
+@unique
+class IssueType(str, Enum):
+    """Enum covering the ways a file can fail manifest verification."""
+    MISSING = 'MISSING'
+    SIZE = 'SIZE'
+    CHECKSUM = 'CHECKSUM'
+
+class ManifestIssue(BaseModel):
+    type: IssueType
+    path : Path | str
+    expected: Optional[str] = None
+    actual: Optional[str] = None
+    algorithm: Optional[ChecksumAlg] = None
+
+    @property
+    def message(self) -> str:
+        if self.type == IssueType.MISSING:
+            return f'File {self.path} is missing.'
+        if self.type == IssueType.SIZE:
+            return f'File {self.path} manifest size {self.expected}, file size {self.actual}.'
+        return f'File {self.path} manifest {self.algorithm.value} checksum {self.expected}, ' + \
+            f'calculated checksum {self.actual}.'
+
+class SampleSummary(BaseModel):
+    seed: int
+    file_count: int = 0
+    total_files: int = 0
+    byte_count: int = 0
+    total_bytes: int = 0
+    confidence: float = 0.95
+    max_defect_rate: Optional[float] = 1.0
+    excluded_files: int = 0
+    excluded_bytes: int = 0
+
+    @property
+    def fraction(self) -> float:
+        """Return the fraction of the manifest's files that were sampled."""
+        return self.file_count / self.total_files if self.total_files else 1.0
+
+    @property
+    def byte_fraction(self) -> float:
+        """Return the fraction of the manifest's bytes that were sampled."""
+        return self.byte_count / self.total_bytes if self.total_bytes else 1.0
+
 class ManifestSummary(BaseModel):
     file_count: int = 0
     total_size: int = 0
@@ -63,3 +107,10 @@ class Manifest(BaseModel):
     @property
     def total_size(self) -> int:
         return sum(entry.size for entry in self.entries)
+
+class ManifestHeader(BaseModel):
+    """The leading record of a manifest file, the summary is None if it
+    wasn't known when the file was started."""
+    source: SourceType = SourceType.UNKNOWN
+    root: Path
+    summary: Optional[ManifestSummary] = None
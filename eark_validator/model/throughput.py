@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# flake8: noqa
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""
+    E-ARK : Information Package Validation Model types
+    Types for file processing throughput statistics
+"""
+from pydantic import BaseModel
+
+class ThroughputStatistics(BaseModel):
+    """
+    Model type for the number of files and bytes processed over a period
+    """
+    files: int = 0
+    """The number of files processed."""
+    bytes: int = 0
+    """The total size in bytes of the files processed."""
+    seconds: float = 0.0
+    """The elapsed wall clock time in seconds."""
+    workers: int = 1
+    """The number of concurrent workers used."""
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+class ThrottleStatistics(BaseModel):
+    """
+    Model type for the I/O passed through a rate limiter
+    """
+    bytes: int = 0
+    """The total number of bytes read or written."""
+    operations: int = 0
+    """The number of I/O operations."""
+    waited: float = 0.0
+    """The total time in seconds callers were delayed by the limiter."""
+
+class ConcurrencyStatistics(BaseModel):
+    """
+    Model type for the state of an adaptive concurrency controller
+    """
+    workers: int = 1
+    """The current concurrency level."""
+    bytes_per_second: float = 0.0
+    """The throughput achieved over the last measurement window."""
+    latency: float = 0.0
+    """The mean task latency in seconds over the last measurement window."""
+    increases: int = 0
+    """The number of times the concurrency level was increased."""
+    decreases: int = 0
+    """The number of times the concurrency level was decreased."""
+
+class HardlinkStatistics(BaseModel):
+    """
+    Model type for the hashing avoided by sharing the digests of hard links
+    """
+    files: int = 0
+    """The number of files whose digests were taken from another link."""
+    bytes: int = 0
+    """The total size in bytes of the files that weren't re-read."""
@@ -35,6 +35,7 @@ import uuid
 
 from pydantic import BaseModel, ConfigDict, Field, model_validator
 
+from .fingerprint import Fingerprint
 from .package_details import InformationPackage
 from .specifications import Level
 from .constants import (
@@ -138,12 +139,19 @@ class MetatdataResultSet(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
     schematron_results: MetadataResults = Field(validation_alias='schematronResults')
 
+class ChecksumResults(BaseModel):
+    status: MetadataStatus = MetadataStatus.UNKNOWN
+    file_count: int = 0
+    messages: List[Result] = []
+
 class ValidationReport(BaseModel):
     uid: uuid.UUID = uuid.uuid4()
     structure: Optional[StructResults] = None
     metadata: Optional[MetatdataResultSet] = None
     package: Optional[InformationPackage] = None
+    fingerprint: Optional[Fingerprint] = None
+    checksums: Optional[ChecksumResults] = None
 
     @property
     def is_valid(self) -> bool:
-        return self.structure.status == StructureStatus.WELLFORMED and self.metadata.schema_results.status == MetadataStatus.VALID and self.metadata.schematron_results.status == MetadataStatus.VALID
+        return self.structure.status == StructureStatus.WELLFORMED and self.metadata.schema_results.status == MetadataStatus.VALID and self.metadata.schematron_results.status == MetadataStatus.VALID and (self.checksums is None or self.checksums.status == MetadataStatus.VALID)
@@ -27,11 +27,15 @@ Factory methods for the package classes.
 """
 import os
 from pathlib import Path
+from typing import Optional
 
+from eark_validator import checksums as CHECKSUMS
 from eark_validator import rules as SC
 from eark_validator import structure
+from eark_validator.infopacks.checksum_cache import ChecksumCache
 from eark_validator.infopacks.information_package import InformationPackages
-from eark_validator.infopacks.package_handler import PackageHandler
+from eark_validator.infopacks.package_handler import PackageContext, PackageError, PackageHandler
+from eark_validator.infopacks.throttle import IOThrottle
 from eark_validator.mets import MetsValidator
 from eark_validator.model import ValidationReport
 from eark_validator.model.package_details import InformationPackage
@@ -41,29 +45,45 @@ from eark_validator.specifications.specification import SpecificationType, Speci
 METS: str = 'METS.xml'
 
 class PackageValidator():
-    """Class for performing full package validation."""
+    """Class for performing full package validation. ZIP packages are validated
+    in place, without extraction, if in_place is True or if they're too large for
+    the unpacking disk budget when in_place is None. Archived payload files are
+    never unpacked for checksum checks. TAR payload is hashed while the archive
+    is streamed to unpack its metadata, other members are streamed through the
+    hashers. Packages validated by path with validate are resolved the same
+    way."""
     _package_handler = PackageHandler()
-    def __init__(self, package_path: Path, version: SpecificationVersion = SpecificationVersion.V2_1_0):
+    def __init__(self, package_path: Path, version: SpecificationVersion = SpecificationVersion.V2_1_0,
+                 in_place: Optional[bool] = None, checksums: bool = False,
+                 workers: Optional[int] = None, checksum_cache: Optional[ChecksumCache] = None,
+                 throttle: Optional[IOThrottle] = None):
         self._path : Path = package_path
         self._name: str = os.path.basename(package_path)
         self._report: ValidationReport = None
         self._version: SpecificationVersion = version
+        self._context: PackageContext = None
 
-        if os.path.isdir(package_path):
-            # If a directory or archive get the path to process
-            self._to_proc = self._path.absolute()
-        elif PackageHandler.is_archive(package_path):
-            self._to_proc = self._package_handler.prepare_package(package_path)
+        if os.path.isdir(package_path) or PackageHandler.is_archive(package_path):
+            # If a directory or archive resolve the package once for this run
+            try:
+                self._context = self._prepare_context(package_path, in_place, checksums)
+            except PackageError:
+                self._report = _report_from_bad_path(package_path)
+                return
         elif self._name == METS:
             mets_path = Path(package_path)
-            self._to_proc = mets_path.parent.absolute()
-            self._name = os.path.basename(self._to_proc)
+            self._context = PackageContext(mets_path.parent, mets_path.parent.absolute())
+            self._name = self._context.name
         else:
             # If not an archive we can't process
             self._report = _report_from_bad_path(package_path)
             return
 
-        self._report = self.validate(self._version, self._to_proc)
+        self._to_proc = self._context.root
+        self._report = self.validate(self._version, self._context, checksums, workers,
+                                     checksum_cache, throttle)
+        # Release the unpacked package so the cache may evict it
+        self._context.close()
 
     @property
     def original_path(self) -> Path:
@@ -75,6 +95,13 @@ class PackageValidator():
         """Returns the package name."""
         return self._name
 
+    @property
+    def context(self) -> PackageContext:
+        """Returns the package context used for validation, None if the path
+        could not be resolved to a package. The context is closed once the
+        package has been validated."""
+        return self._context
+
     @property
     def validation_report(self) -> ValidationReport:
         """Returns the valdiation report for the package."""
@@ -86,33 +113,68 @@ class PackageValidator():
         return self._version
 
     @classmethod
-    def validate(cls, version: SpecificationVersion, to_validate: Path) -> ValidationReport:
+    def _prepare_context(cls, package_path: Path, in_place: Optional[bool] = None,
+                         checksums: bool = False) -> PackageContext:
+        # Data files are only unpacked on demand, archived payload is hashed
+        # as it's streamed, or streamed again only if it wasn't
+        return cls._package_handler.prepare_context(package_path, in_place=in_place,
+                                                    payload=False, digests=checksums)
+
+    @classmethod
+    def validate(cls, version: SpecificationVersion, to_validate: Path | PackageContext,
+                 checksums: bool = False, workers: Optional[int] = None,
+                 checksum_cache: Optional[ChecksumCache] = None,
+                 throttle: Optional[IOThrottle] = None) -> ValidationReport:
         """Returns the validation report that results from validating the path
-        to_validate as a folder. The method does not validate archive files."""
-        is_struct_valid, struct_results = structure.validate(to_validate)
+        or package context to_validate. Paths are resolved once and the resulting
+        context is shared by all validation steps.
+
+        If checksums is True the sizes and checksums declared in the METS files
+        are verified against the package content by up to workers threads,
+        reusing the digests of unchanged files from checksum_cache if given and
+        rate limiting reads with throttle if given. Paths are resolved as they
+        are by the constructor."""
+        if not isinstance(to_validate, PackageContext):
+            context = cls._prepare_context(to_validate, checksums=checksums)
+            try:
+                return cls.validate(version, context, checksums, workers, checksum_cache,
+                                    throttle)
+            finally:
+                context.close()
+        context: PackageContext = to_validate
+        is_struct_valid, struct_results = structure.validate(context)
         if not is_struct_valid:
-            return ValidationReport.model_validate({'structure': struct_results})
-        validator = MetsValidator(str(to_validate))
+            return ValidationReport.model_validate({
+                'structure': struct_results,
+                'fingerprint': context.fingerprint
+                })
+        validator = MetsValidator(str(context.root), context.view)
         validator.validate_mets(METS)
 
         csip_profile = SC.ValidationProfile(SpecificationType.CSIP, version)
-        csip_profile.validate(to_validate.joinpath(METS))
+        with context.view.open(METS) as mets_stream:
+            csip_profile.validate(mets_stream)
         results = csip_profile.get_all_results()
 
-        package: InformationPackage = InformationPackages.from_path(to_validate)
+        package: InformationPackage = InformationPackages.from_path(context)
         if package.details.oaispackagetype in ['SIP', 'DIP']:
             profile = SC.ValidationProfile(SpecificationType.from_string(package.details.oaispackagetype), version)
-            profile.validate(to_validate.joinpath(METS))
+            with context.view.open(METS) as mets_stream:
+                profile.validate(mets_stream)
             results.extend(profile.get_all_results())
 
         metadata: MetatdataResultSet = MetatdataResultSet.model_validate({
             'schema_results': MetadataResults.model_validate({ 'status': _validity_from_messages(validator.validation_errors), 'messages': validator.validation_errors }),
             'schematron_results': MetadataResults.model_validate({ 'status': _validity_from_messages(results), 'messages': results })
             })
+        checksum_results = CHECKSUMS.validate(context, workers, checksum_cache, throttle)[1] \
+            if checksums else None
         return ValidationReport.model_validate({
             'structure': struct_results,
             'package': package,
-            'metadata': metadata
+            'metadata': metadata,
+            'fingerprint': context.fingerprint,
+            'checksums': checksum_results
             })
 
 def _validity_from_messages(messages: list[Result]) -> MetadataStatus:
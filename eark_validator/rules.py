@@ -24,7 +24,8 @@
 #
 """Module to capture everything schematron validation related."""
 import os
-from typing import Dict, List
+from pathlib import Path
+from typing import BinaryIO, Dict, List
 
 from lxml import etree as ET
 
@@ -58,28 +59,32 @@ class ValidationProfile():
         """ Get the Schematron rulesets."""
         return self._rulesets
 
-    def validate(self, to_validate: str) -> None:
-        """Validates a file against each loaded ruleset."""
-        if not os.path.exists(to_validate):
-            raise FileNotFoundError(NO_PATH.format(to_validate))
-        if not os.path.isfile(to_validate):
-            raise ValueError(NOT_FILE.format(to_validate))
+    def validate(self, to_validate: str | Path | BinaryIO) -> None:
+        """Validates a file, or a binary stream such as an archive member,
+        against each loaded ruleset. The XML is parsed once for all rulesets."""
+        if isinstance(to_validate, (str, Path)):
+            if not os.path.exists(to_validate):
+                raise FileNotFoundError(NO_PATH.format(to_validate))
+            if not os.path.isfile(to_validate):
+                raise ValueError(NOT_FILE.format(to_validate))
         self.is_wellformed = True
         self.is_valid = True
         self.results = {}
         self.messages = []
+        try:
+            parsed = ET.parse(to_validate)
+        except ET.XMLSyntaxError as parse_err:
+            self.is_wellformed = False
+            self.is_valid = False
+            name = getattr(to_validate, 'name', to_validate)
+            self.messages.append(f'File {name} is not valid XML. {parse_err.msg}')
+            return
         for section, validator in self.rulesets.items():
-            try:
-                self.results[section] = TestResults.from_validation_report(
-                    validator.validate(to_validate)
-                    )
-                if self._contains_errors(section):
-                    self.is_valid = False
-            except ET.XMLSyntaxError as parse_err:
-                self.is_wellformed = False
+            self.results[section] = TestResults.from_validation_report(
+                validator.validate(parsed)
+                )
+            if self._contains_errors(section):
                 self.is_valid = False
-                self.messages.append(f'File {to_validate} is not valid XML. {parse_err.msg}')
-                return
 
     def _contains_errors(self, section: str) -> bool:
         return len(list(filter(lambda a: a.severity == Severity.ERROR, self.results[section]))) > 0
@@ -28,7 +28,8 @@ from pathlib import Path
 from typing import Dict, List, Optional, Set, Tuple
 
 from eark_validator.specifications.struct_reqs import REQUIREMENTS
-from eark_validator.infopacks.package_handler import PackageHandler, PackageError
+from eark_validator.infopacks.package_handler import PackageContext, PackageHandler, PackageError
+from eark_validator.infopacks.package_view import PackageView
 from eark_validator.model import (
     StructResults,
     StructureStatus,
@@ -54,12 +55,22 @@ DIR_NAMES = {
 class StructureParser():
     _package_handler = PackageHandler()
     """Encapsulates the set of tests carried out on folder structure."""
-    def __init__(self, package_path: Path):
-        self._is_archive = PackageHandler.is_archive(package_path)
+    def __init__(self, package_path: Path | PackageContext, rel_path: str=''):
         self.md_folders: set[str]= set()
         self.folders: set[str] = set()
         self.files : set[str] = set()
         self.is_parsable = False
+        if isinstance(package_path, PackageContext):
+            # The package has already been resolved, scan it through its view
+            view: PackageView = package_path.view
+            self._is_archive = package_path.is_archive if not rel_path else False
+            self.is_parsable = view.is_dir(rel_path)
+            self.resolved_path = package_path.root.joinpath(rel_path)
+            self.folders, self.files = view.list_dir(rel_path)
+            if DIR_NAMES['META'] in self.folders:
+                self.md_folders, _ = view.list_dir(f'{rel_path}/{DIR_NAMES["META"]}'.lstrip('/'))
+            return
+        self._is_archive = PackageHandler.is_archive(package_path)
         if self._is_archive or package_path.is_dir():
             self.is_parsable = True
             self.resolved_path = self._package_handler.prepare_package(package_path)
@@ -117,11 +128,17 @@ class StructureParser():
         return self._is_archive
 
 class StructureChecker():
-    def __init__(self, dir_to_scan: Path):
-        self.name: str = os.path.basename(dir_to_scan)
+    def __init__(self, dir_to_scan: Path | PackageContext):
+        self.name: str = dir_to_scan.name if isinstance(dir_to_scan, PackageContext) \
+            else os.path.basename(dir_to_scan)
         self.parser: StructureParser = StructureParser(dir_to_scan)
         self.representations: Dict[Representation, StructureParser] = {}
-        if self.parser.is_parsable:
+        if isinstance(dir_to_scan, PackageContext):
+            folders, files = dir_to_scan.view.list_dir(DIR_NAMES['REPS'])
+            for entry in folders | files:
+                self.representations[entry] = StructureParser(dir_to_scan,
+                                                              f'{DIR_NAMES["REPS"]}/{entry}')
+        elif self.parser.is_parsable:
             _reps = os.path.join(self.parser.resolved_path, DIR_NAMES['REPS'])
             if os.path.isdir(_reps):
                 for entry in  os.listdir(_reps):
@@ -245,9 +262,10 @@ def _get_str1_result_list(name: str) -> List[Result]:
 def _root_loc(name: str) -> str:
     return f'{ROOT} {name}'
 
-def validate(to_validate) -> Tuple[bool, StructResults]:
+def validate(to_validate: Path | PackageContext) -> Tuple[bool, StructResults]:
     try:
         struct_tests = StructureChecker(to_validate).get_test_results()
         return struct_tests.status == StructureStatus.WELLFORMED, struct_tests
     except PackageError:
-        return False, get_bad_path_results(to_validate)
+        name = to_validate.name if isinstance(to_validate, PackageContext) else to_validate
+        return False, get_bad_path_results(name)
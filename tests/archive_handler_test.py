@@ -29,9 +29,9 @@ import os
 import unittest
 
 from eark_validator.infopacks.manifest import Checksummer
-from eark_validator.infopacks.package_handler import PackageError, PackageHandler
+from eark_validator.infopacks.package_handler import PackageContext, PackageError, PackageHandler
 
-from eark_validator.model import StructureStatus, StructResults
+from eark_validator.model import FingerprintStrategy, StructureStatus, StructResults
 
 MIN_TAR_SHA1 = '47CA3A9D7F5F23BF35B852A99785878C5E543076'
 
@@ -93,7 +93,7 @@ class PackageHandlerTest(unittest.TestCase):
         self.assertRaises(ValueError, handler.prepare_package, self.not_exists_path)
 
     def test_unpack_archives(self):
-        handler = PackageHandler()
+        handler = PackageHandler(fingerprint_strategy=FingerprintStrategy.FULL)
         dest = Path(handler.unpack_package(self.min_tar_path))
         self.assertEqual(os.path.basename(dest.parent), MIN_TAR_SHA1)
         dest = Path(handler.unpack_package(self.min_zip_path))
@@ -101,6 +101,25 @@ class PackageHandlerTest(unittest.TestCase):
         dest = Path(handler.unpack_package(self.min_targz_path))
         self.assertEqual(os.path.basename(dest.parent), 'DB2703FF464E613E9D1DC5C495E23A2E2D49B89D')
 
+    def test_prepare_context_archive(self):
+        handler = PackageHandler()
+        context: PackageContext = handler.prepare_context(self.min_zip_path)
+        self.assertTrue(context.is_archive)
+        self.assertEqual(context.name, 'minimal_IP_with_schemas.zip')
+        self.assertEqual(context.original_path, self.min_zip_path)
+        self.assertTrue(context.root.is_dir())
+        self.assertEqual(context.root, handler.unpack_package(self.min_zip_path))
+
+    def test_prepare_context_dir(self):
+        handler = PackageHandler()
+        context: PackageContext = handler.prepare_context(self.dir_path)
+        self.assertFalse(context.is_archive)
+        self.assertEqual(context.root, self.dir_path.absolute())
+
+    def test_prepare_context_not_exists(self):
+        handler = PackageHandler()
+        self.assertRaises(ValueError, handler.prepare_context, self.not_exists_path)
+
     def test_is_dir_archive(self):
         self.assertFalse(PackageHandler.is_archive(self.dir_path))
 
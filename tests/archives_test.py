@@ -0,0 +1,490 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Module containing tests covering member level archive access."""
+import gzip
+import io
+import os
+import shutil
+import struct
+from pathlib import Path
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+from eark_validator.infopacks.archives import (
+    BudgetTracker,
+    ExtractionLimitError,
+    PackageError,
+    RootCheck,
+    _sniff,
+    archive_root,
+    archive_type,
+    extract_members,
+    extract_zip,
+    fingerprint,
+    hash_zip_entries,
+    is_payload,
+    safe_target,
+    stream_tar
+)
+from eark_validator.infopacks.manifest import Checksummer
+from eark_validator.infopacks.package_handler import PackageHandler
+from eark_validator.model import (
+    ArchiveType,
+    ChecksumAlg,
+    ExtractionBudget,
+    FingerprintStrategy,
+    ManifestEntry
+)
+
+MIN_ROOT = os.path.join(os.path.dirname(__file__), 'resources', 'ips', 'minimal')
+MIN_TAR_PATH = Path(os.path.join(MIN_ROOT, 'minimal_IP_with_schemas.tar'))
+MIN_TARGZ_PATH = Path(os.path.join(MIN_ROOT, 'minimal_IP_with_schemas.tar.gz'))
+BAD_ROOT = os.path.join(os.path.dirname(__file__), 'resources', 'ips', 'bad')
+MIN_ZIP_PATH = Path(os.path.join(MIN_ROOT, 'minimal_IP_with_schemas.zip'))
+MIN_TAR_SHA1 = '47CA3A9D7F5F23BF35B852A99785878C5E543076'
+MIN_TARGZ_SHA1 = 'DB2703FF464E613E9D1DC5C495E23A2E2D49B89D'
+METS_MEMBER = 'minimal_IP_with_schemas/METS.xml'
+
+class PayloadTest(unittest.TestCase):
+    def test_is_payload(self):
+        self.assertTrue(is_payload('root/representations/rep1/data/file.txt'))
+        self.assertTrue(is_payload('./root/representations/rep1/data/sub/file.txt'))
+        self.assertFalse(is_payload('root/representations/rep1/METS.xml'))
+        self.assertFalse(is_payload('root/representations/rep1/data'))
+        self.assertFalse(is_payload('root/metadata/data/file.txt'))
+
+    def test_safe_target(self):
+        self.assertEqual(safe_target(Path('/dest'), './root/METS.xml'), Path('/dest/root/METS.xml'))
+        with self.assertRaises(PackageError):
+            safe_target(Path('/dest'), '../root/METS.xml')
+        with self.assertRaises(PackageError):
+            safe_target(Path('/dest'), '/root/METS.xml')
+
+class StreamTarTest(unittest.TestCase):
+    def setUp(self):
+        self._test_dir = tempfile.TemporaryDirectory()
+        self._dest = Path(self._test_dir.name)
+
+    def tearDown(self):
+        self._test_dir.cleanup()
+
+    def test_identity(self):
+        sha1, _ = stream_tar(MIN_TAR_PATH, self._dest.joinpath('tar'))
+        self.assertEqual(sha1.value, MIN_TAR_SHA1)
+        sha1, _ = stream_tar(MIN_TARGZ_PATH, self._dest.joinpath('targz'))
+        self.assertEqual(sha1.value, MIN_TARGZ_SHA1)
+
+    def test_listing_and_digests(self):
+        _, entries = stream_tar(MIN_TARGZ_PATH, self._dest, algorithms=[ ChecksumAlg.MD5, ChecksumAlg.SHA256 ])
+        with tarfile.open(MIN_TARGZ_PATH) as tar_ip:
+            expected = { member.name: member.size for member in tar_ip.getmembers() if member.isfile() }
+        self.assertEqual({ str(entry.path): entry.size for entry in entries }, expected)
+        for entry in entries:
+            target = self._dest.joinpath(entry.path)
+            self.assertEqual(len(entry.checksums), 2)
+            for checksum in entry.checksums:
+                self.assertEqual(checksum, Checksummer(checksum.algorithm).hash_file(target))
+
+    def test_metadata_only(self):
+        _, entries = stream_tar(MIN_TARGZ_PATH, self._dest, payload=False)
+        payload = [ entry for entry in entries if is_payload(entry.path) ]
+        self.assertEqual(len(payload), 1)
+        self.assertFalse(self._dest.joinpath(payload[0].path).exists())
+        self.assertTrue(self._dest.joinpath(payload[0].path).parent.is_dir())
+        self.assertTrue(self._dest.joinpath(METS_MEMBER).is_file())
+
+    def test_unsafe_member(self):
+        archive = self._dest.joinpath('unsafe.tar')
+        with tarfile.open(archive, 'w') as tar_ip:
+            info = tarfile.TarInfo('../escaped.txt')
+            info.size = 4
+            tar_ip.addfile(info, io.BytesIO(b'data'))
+        with self.assertRaises(PackageError):
+            stream_tar(archive, self._dest.joinpath('out'))
+        self.assertFalse(self._dest.joinpath('escaped.txt').exists())
+
+    def test_context_manifest(self):
+        handler = PackageHandler(self._dest, fingerprint_strategy=FingerprintStrategy.FULL)
+        context = handler.prepare_context(MIN_TARGZ_PATH)
+        self.assertEqual(context.root.parent.name, MIN_TARGZ_SHA1)
+        self.assertEqual(context.fingerprint.value, MIN_TARGZ_SHA1)
+        self.assertIn('METS.xml', [ entry.path for entry in context.manifest.entries ])
+        self.assertEqual(context.manifest.root, context.root)
+
+    def test_tar_sampled_manifest(self):
+        context = PackageHandler(self._dest).prepare_context(MIN_TARGZ_PATH)
+        self.assertEqual(context.fingerprint.strategy, FingerprintStrategy.SAMPLED)
+        self.assertEqual(context.root.parent.name, context.fingerprint.key)
+        self.assertIn('METS.xml', [ entry.path for entry in context.manifest.entries ])
+
+    def test_tar_cache_reuse(self):
+        handler = PackageHandler(self._dest)
+        first = handler.unpack_package(MIN_TARGZ_PATH)
+        second = handler.unpack_package(MIN_TARGZ_PATH)
+        self.assertEqual(first, second)
+        self.assertEqual(handler.cache.statistics.hits, 1)
+        self.assertEqual([ path.name for path in self._dest.iterdir() if path.name.startswith('.staging') ], [])
+
+class ArchiveTypeTest(unittest.TestCase):
+    def setUp(self):
+        self._test_dir = tempfile.TemporaryDirectory()
+        self._dest = Path(self._test_dir.name)
+
+    def tearDown(self):
+        self._test_dir.cleanup()
+
+    def test_resources(self):
+        self.assertEqual(archive_type(MIN_ZIP_PATH), ArchiveType.ZIP)
+        self.assertEqual(archive_type(MIN_TAR_PATH), ArchiveType.TAR)
+        self.assertEqual(archive_type(MIN_TARGZ_PATH), ArchiveType.TAR_GZ)
+        self.assertEqual(archive_type(Path(MIN_ROOT)), ArchiveType.NONE)
+        self.assertEqual(archive_type(Path(MIN_ROOT).joinpath('missing.zip')), ArchiveType.NONE)
+
+    def test_compressed_tars(self):
+        for mode, expected in [ ('w:bz2', ArchiveType.TAR_BZ2), ('w:xz', ArchiveType.TAR_XZ) ]:
+            archive = self._dest.joinpath(f'package.{expected.value}')
+            with tarfile.open(archive, mode) as tar_ip:
+                tar_ip.add(MIN_TAR_PATH, arcname='root/package.tar')
+            self.assertEqual(archive_type(archive), expected)
+            self.assertTrue(expected.is_tar)
+
+    def test_not_archives(self):
+        compressed = self._dest.joinpath('text.gz')
+        with gzip.open(compressed, 'wb') as text:
+            text.write(b'not a tar file' * 100)
+        self.assertEqual(archive_type(compressed), ArchiveType.NONE)
+        plain = self._dest.joinpath('METS.xml')
+        plain.write_bytes(b'<mets/>')
+        self.assertEqual(archive_type(plain), ArchiveType.NONE)
+        self.assertFalse(ArchiveType.NONE.is_archive)
+
+    def test_prepended_zip(self):
+        archive = self._dest.joinpath('package.exe')
+        archive.write_bytes(b'MZ stub' * 100 + MIN_ZIP_PATH.read_bytes())
+        self.assertEqual(archive_type(archive), ArchiveType.ZIP)
+
+    def test_signed_tar_checksum(self):
+        archive = self._dest.joinpath('signed.tar')
+        with tarfile.open(archive, 'w', format=tarfile.GNU_FORMAT) as tar_ip:
+            info = tarfile.TarInfo('r\u00e9sum\u00e9/file.txt')
+            info.size = 4
+            tar_ip.addfile(info, io.BytesIO(b'text'))
+        data = bytearray(archive.read_bytes())
+        # Rewrite the header checksum as a writer summing signed bytes would
+        signed = sum(struct.unpack('148b8x356b', bytes(data[:512]))) + 8 * ord(' ')
+        data[148:156] = b'%06o\0 ' % signed
+        archive.write_bytes(bytes(data))
+        self.assertEqual(archive_type(archive), ArchiveType.TAR)
+
+    @unittest.skipIf(hasattr(os, 'geteuid') and os.geteuid() == 0, 'root reads any file')
+    def test_unreadable(self):
+        archive = self._dest.joinpath('package.zip')
+        shutil.copyfile(MIN_ZIP_PATH, archive)
+        os.chmod(archive, 0)
+        self.assertEqual(archive_type(archive), ArchiveType.NONE)
+        self.assertFalse(PackageHandler.is_archive(archive))
+
+    def test_memoized(self):
+        archive = self._dest.joinpath('package')
+        shutil.copyfile(MIN_ZIP_PATH, archive)
+        self.assertEqual(archive_type(archive), ArchiveType.ZIP)
+        hits = _sniff.cache_info().hits
+        self.assertEqual(archive_type(archive), ArchiveType.ZIP)
+        self.assertEqual(_sniff.cache_info().hits, hits + 1)
+        shutil.copyfile(MIN_TAR_PATH, archive)
+        os.utime(archive, ns=(0, 0))
+        self.assertEqual(archive_type(archive), ArchiveType.TAR)
+
+class ArchiveRootTest(unittest.TestCase):
+    def setUp(self):
+        self._test_dir = tempfile.TemporaryDirectory()
+        self._dest = Path(self._test_dir.name)
+
+    def tearDown(self):
+        self._test_dir.cleanup()
+
+    def test_archive_root(self):
+        for archive in [ MIN_ZIP_PATH, MIN_TAR_PATH, MIN_TARGZ_PATH ]:
+            self.assertEqual(archive_root(archive), 'minimal_IP_with_schemas')
+
+    def test_bad_layouts(self):
+        for name in [ 'multi_dir.zip', 'single_file.zip' ]:
+            with self.assertRaises(PackageError):
+                archive_root(Path(os.path.join(BAD_ROOT, name)))
+
+    def test_rejected_before_writing(self):
+        handler = PackageHandler(self._dest)
+        with self.assertRaises(PackageError):
+            handler.unpack_package(Path(os.path.join(BAD_ROOT, 'multi_dir.zip')))
+        self.assertEqual(list(self._dest.iterdir()), [])
+
+    def test_stream_rejects_second_root(self):
+        archive = self._dest.joinpath('multi.tar.gz')
+        with tarfile.open(archive, 'w:gz') as tar_ip:
+            for name in [ 'first/METS.xml', 'second/METS.xml' ]:
+                info = tarfile.TarInfo(name)
+                info.size = 4
+                tar_ip.addfile(info, io.BytesIO(b'data'))
+        with self.assertRaises(PackageError):
+            stream_tar(archive, self._dest.joinpath('out'))
+        self.assertFalse(self._dest.joinpath('out', 'second').exists())
+
+    def test_root_check(self):
+        check = RootCheck()
+        with self.assertRaises(PackageError):
+            check.finish()
+        check.add('./root/', is_dir=True)
+        check.add('root/METS.xml')
+        self.assertEqual(check.finish(), 'root')
+        with self.assertRaises(PackageError):
+            check.add('other/METS.xml')
+        with self.assertRaises(PackageError):
+            RootCheck().add('METS.xml')
+
+    def test_tar_cache_hit_not_extracted(self):
+        for strategy in (FingerprintStrategy.SAMPLED, FingerprintStrategy.STRUCTURE,
+                         FingerprintStrategy.STAT):
+            for archive in (MIN_TAR_PATH, MIN_TARGZ_PATH):
+                handler = PackageHandler(self._dest.joinpath(strategy.value),
+                                         fingerprint_strategy=strategy)
+                first = handler.prepare_context(archive)
+                mets = first.root.joinpath('METS.xml').stat()
+                first.close()
+                second = handler.prepare_context(archive)
+                # A hit is found from the fingerprint, nothing is streamed or rewritten
+                self.assertIsNone(second.extraction)
+                self.assertEqual(second.root.joinpath('METS.xml').stat().st_ino, mets.st_ino)
+                self.assertEqual(handler.cache.statistics.hits, 1)
+                second.close()
+                handler.cache.clear()
+
+class ExtractZipTest(unittest.TestCase):
+    def setUp(self):
+        self._test_dir = tempfile.TemporaryDirectory()
+        self._dest = Path(self._test_dir.name)
+
+    def tearDown(self):
+        self._test_dir.cleanup()
+
+    def test_parallel_matches_sequential(self):
+        parallel = extract_zip(MIN_ZIP_PATH, self._dest.joinpath('parallel'), workers=4)
+        sequential = extract_zip(MIN_ZIP_PATH, self._dest.joinpath('sequential'), workers=1)
+        self.assertEqual(parallel.files, sequential.files)
+        self.assertEqual(parallel.bytes, sequential.bytes)
+        self.assertEqual(sequential.workers, 1)
+        with zipfile.ZipFile(MIN_ZIP_PATH) as zip_ip:
+            for info in zip_ip.infolist():
+                target = self._dest.joinpath('parallel', info.filename)
+                if info.is_dir():
+                    self.assertTrue(target.is_dir())
+                    continue
+                self.assertEqual(target.read_bytes(), zip_ip.read(info))
+                self.assertEqual(target.read_bytes(),
+                                 self._dest.joinpath('sequential', info.filename).read_bytes())
+
+    def test_digests(self):
+        entries = []
+        statistics = extract_zip(MIN_ZIP_PATH, self._dest, workers=4,
+                                 algorithms=[ ChecksumAlg.MD5, ChecksumAlg.SHA256 ], entries=entries)
+        self.assertEqual(len(entries), statistics.files)
+        for entry in entries:
+            target = self._dest.joinpath(entry.path)
+            self.assertEqual(entry.size, target.stat().st_size)
+            self.assertEqual(len(entry.checksums), 2)
+            for checksum in entry.checksums:
+                self.assertEqual(checksum, Checksummer(checksum.algorithm).hash_file(target))
+
+    def test_hash_zip_entries(self):
+        archive = self._dest.joinpath('dotted.zip')
+        with zipfile.ZipFile(archive, 'w') as zip_ip:
+            zip_ip.writestr('./package/a.txt', b'a')
+            zip_ip.writestr('package/b.txt', b'bb')
+        expected = Checksummer(ChecksumAlg.MD5).hash_stream(io.BytesIO(b'a'))
+        def _entry(path: str, size: int) -> ManifestEntry:
+            return ManifestEntry(path=path, size=size, checksums=[ expected ])
+        requested = []
+        def _entries():
+            for name, size in [ ('package/a.txt', 1), ('package/b.txt', 1), ('package/c.txt', 1) ]:
+                requested.append(name)
+                yield name, _entry(name, size)
+        hashed = { str(entry.path): (size, checksums)
+                   for entry, size, checksums in hash_zip_entries(archive, _entries(), workers=2) }
+        self.assertEqual(len(requested), 3)
+        self.assertEqual(hashed, {
+            'package/a.txt': (1, [ expected ]),
+            'package/b.txt': (2, []),
+            'package/c.txt': (None, [])
+            })
+
+    def test_metadata_only(self):
+        statistics = extract_zip(MIN_ZIP_PATH, self._dest, payload=False, workers=4)
+        with zipfile.ZipFile(MIN_ZIP_PATH) as zip_ip:
+            payload = [ info.filename for info in zip_ip.infolist()
+                        if not info.is_dir() and is_payload(info.filename) ]
+            expected = [ info for info in zip_ip.infolist() if not info.is_dir() ]
+        self.assertEqual(statistics.files, len(expected) - len(payload))
+        for name in payload:
+            self.assertFalse(self._dest.joinpath(name).exists())
+            self.assertTrue(self._dest.joinpath(name).parent.is_dir())
+
+    def test_unsafe_member(self):
+        archive = self._dest.joinpath('unsafe.zip')
+        with zipfile.ZipFile(archive, 'w') as zip_ip:
+            zip_ip.writestr('root/METS.xml', b'data')
+            zip_ip.writestr('../escaped.txt', b'data')
+        with self.assertRaises(PackageError):
+            extract_zip(archive, self._dest.joinpath('out'), workers=4)
+        self.assertFalse(self._dest.joinpath('escaped.txt').exists())
+        self.assertFalse(self._dest.joinpath('out', 'root', 'METS.xml').exists())
+
+    def test_context_throughput(self):
+        handler = PackageHandler(self._dest, extraction_workers=2)
+        context = handler.prepare_context(MIN_ZIP_PATH, in_place=False)
+        self.assertGreater(context.extraction.files, 0)
+        self.assertGreater(context.extraction.bytes, 0)
+        self.assertIsNone(handler.prepare_context(MIN_ZIP_PATH, in_place=False).extraction)
+
+class BudgetTest(unittest.TestCase):
+    def setUp(self):
+        self._test_dir = tempfile.TemporaryDirectory()
+        self._dest = Path(self._test_dir.name)
+
+    def tearDown(self):
+        self._test_dir.cleanup()
+
+    def test_tracker(self):
+        tracker = BudgetTracker(ExtractionBudget(max_bytes=10, max_members=2), 100)
+        tracker.add_member()
+        tracker.add_bytes(10)
+        self.assertEqual(tracker.bytes, 10)
+        with self.assertRaises(ExtractionLimitError) as context:
+            tracker.add_bytes(1)
+        self.assertEqual(context.exception.limit, 'max_bytes')
+        self.assertEqual(context.exception.maximum, 10)
+        self.assertEqual(context.exception.value, 11)
+        # Once exceeded every charge fails
+        with self.assertRaises(ExtractionLimitError):
+            tracker.add_member()
+
+    def test_zip_limits(self):
+        for budget, limit in [ (ExtractionBudget(max_members=3), 'max_members'),
+                               (ExtractionBudget(max_bytes=1024), 'max_bytes'),
+                               (ExtractionBudget(max_ratio=1.0), 'max_ratio') ]:
+            with self.assertRaises(ExtractionLimitError) as context:
+                extract_zip(MIN_ZIP_PATH, self._dest.joinpath(limit), budget=budget, workers=4)
+            self.assertEqual(context.exception.limit, limit)
+
+    def test_stream_tar_limits(self):
+        with self.assertRaises(ExtractionLimitError) as context:
+            stream_tar(MIN_TARGZ_PATH, self._dest, budget=ExtractionBudget(max_bytes=1024))
+        self.assertEqual(context.exception.limit, 'max_bytes')
+        with self.assertRaises(ExtractionLimitError) as context:
+            stream_tar(MIN_TARGZ_PATH, self._dest, budget=ExtractionBudget(max_seconds=-1))
+        self.assertEqual(context.exception.limit, 'max_seconds')
+
+    def test_extract_tar_members(self):
+        archive = self._dest.joinpath('unsafe.tar')
+        with tarfile.open(archive, 'w') as tar_ip:
+            info = tarfile.TarInfo('pkg/../../escaped.txt')
+            info.size = 4
+            tar_ip.addfile(info, io.BytesIO(b'data'))
+        with self.assertRaises(PackageError):
+            extract_members(archive, self._dest.joinpath('out', 'unsafe'))
+        self.assertFalse(self._dest.joinpath('escaped.txt').exists())
+        self.assertFalse(self._dest.joinpath('out', 'escaped.txt').exists())
+        with self.assertRaises(ExtractionLimitError) as context:
+            extract_members(MIN_TAR_PATH, self._dest.joinpath('limited'),
+                            budget=ExtractionBudget(max_bytes=1024))
+        self.assertEqual(context.exception.limit, 'max_bytes')
+        entries = []
+        statistics = extract_members(MIN_TAR_PATH, self._dest.joinpath('tar'),
+                                     algorithms=[ ChecksumAlg.MD5 ], entries=entries)
+        self.assertEqual(len(entries), statistics.files)
+        for entry in entries:
+            target = self._dest.joinpath('tar', entry.path)
+            self.assertEqual(entry.checksums, [ Checksummer(ChecksumAlg.MD5).hash_file(target) ])
+
+    def test_handler_cleans_up(self):
+        handler = PackageHandler(self._dest, budget=ExtractionBudget(max_bytes=1024))
+        for archive in [ MIN_ZIP_PATH, MIN_TARGZ_PATH ]:
+            with self.assertRaises(PackageError):
+                handler.unpack_package(archive)
+        self.assertEqual([ path for path in self._dest.iterdir() if path.is_dir() ], [])
+        unlimited = PackageHandler(self._dest, budget=ExtractionBudget(max_bytes=10**9))
+        self.assertTrue(unlimited.unpack_package(MIN_ZIP_PATH).is_dir())
+
+class FingerprintTest(unittest.TestCase):
+    def test_full(self):
+        result = fingerprint(MIN_TARGZ_PATH, FingerprintStrategy.FULL)
+        self.assertEqual(result.value, MIN_TARGZ_SHA1)
+        self.assertEqual(result.key, MIN_TARGZ_SHA1)
+
+    def test_strategies(self):
+        for strategy in FingerprintStrategy:
+            first = fingerprint(MIN_TAR_PATH, strategy)
+            self.assertEqual(first.strategy, strategy)
+            self.assertEqual(first, fingerprint(MIN_TAR_PATH, strategy))
+            self.assertNotEqual(first.value, fingerprint(MIN_ZIP_PATH, strategy).value)
+        self.assertTrue(fingerprint(MIN_TAR_PATH, FingerprintStrategy.STAT).key.startswith('stat-'))
+
+    def test_structure_fallback(self):
+        result = fingerprint(MIN_TARGZ_PATH, FingerprintStrategy.STRUCTURE)
+        self.assertEqual(result.strategy, FingerprintStrategy.SAMPLED)
+
+    def test_in_place_edit_misses_cache(self):
+        with tempfile.TemporaryDirectory() as test_dir:
+            copy = Path(test_dir).joinpath('copy.tar')
+            shutil.copyfile(MIN_TAR_PATH, copy)
+            handler = PackageHandler(Path(test_dir).joinpath('cache'))
+            self.assertEqual(handler.fingerprint_strategy, FingerprintStrategy.STRUCTURE)
+            before = { strategy: fingerprint(copy, strategy)
+                       for strategy in (FingerprintStrategy.STRUCTURE, FingerprintStrategy.SAMPLED) }
+            handler.unpack_package(copy)
+            # Change one byte of member content without changing the archive size
+            mtime_ns = copy.stat().st_mtime_ns
+            with open(copy, 'r+b') as archive:
+                archive.seek(copy.stat().st_size // 2)
+                data = archive.read(1)
+                archive.seek(-1, os.SEEK_CUR)
+                archive.write(bytes([ data[0] ^ 0xFF ]))
+            os.utime(copy, ns=(mtime_ns + 1_000_000, mtime_ns + 1_000_000))
+            for strategy, value in before.items():
+                self.assertNotEqual(value, fingerprint(copy, strategy))
+            handler.unpack_package(copy)
+            self.assertEqual(handler.cache.statistics.hits, 0)
+
+    def test_sampled_detects_change(self):
+        with tempfile.TemporaryDirectory() as test_dir:
+            copy = Path(test_dir).joinpath('copy.tar')
+            shutil.copyfile(MIN_TAR_PATH, copy)
+            before = fingerprint(copy)
+            with open(copy, 'r+b') as archive:
+                archive.write(b'x')
+            self.assertNotEqual(before, fingerprint(copy))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Module containing tests covering the persistent checksum cache."""
+import os
+from pathlib import Path
+import sqlite3
+import tempfile
+import unittest
+
+from eark_validator import checksums as CHECKSUMS
+from eark_validator.infopacks.checksum_cache import ChecksumCache
+from eark_validator.infopacks.manifest import Checksummer, MultiChecksummer
+from eark_validator.infopacks.package_handler import PackageHandler
+from eark_validator.model import CacheTrust, Checksum, ChecksumAlg
+
+GOOD_PATH = Path(os.path.join(os.path.dirname(__file__), 'resources', 'ips', 'unpacked',
+                              '733dc055-34be-4260-85c7-5549a7083031'))
+
+class ChecksumCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._test_dir = tempfile.TemporaryDirectory()
+        self._root = Path(self._test_dir.name)
+        self._file = self._root.joinpath('file.txt')
+        self._file.write_bytes(b'content')
+        self._cache = ChecksumCache(self._root.joinpath('cache', 'checksums.db'))
+
+    def tearDown(self):
+        self._cache.close()
+        self._test_dir.cleanup()
+
+    def test_get_put(self):
+        stat = os.stat(self._file)
+        self.assertIsNone(self._cache.get(stat, ChecksumAlg.MD5))
+        checksum = Checksum(algorithm=ChecksumAlg.MD5, value='9A0364B9E99BB480DD25E1F0284C8555')
+        self._cache.put(stat, checksum)
+        self.assertEqual(self._cache.get(stat, ChecksumAlg.MD5), checksum)
+        self.assertIsNone(self._cache.get(stat, ChecksumAlg.SHA1))
+        self.assertEqual(self._cache.statistics.hits, 1)
+        self.assertEqual(self._cache.statistics.misses, 2)
+        self.assertEqual(len(self._cache), 1)
+
+    def test_checksummer_uses_cache(self):
+        summer = Checksummer(ChecksumAlg.SHA256, cache=self._cache)
+        expected = summer.hash_file(self._file)
+        self.assertEqual(summer.hash_file(self._file), expected)
+        self.assertEqual(self._cache.statistics.hits, 1)
+        # A changed mtime misses the cache
+        stat = os.stat(self._file)
+        os.utime(self._file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        summer.hash_file(self._file)
+        self.assertEqual(self._cache.statistics.misses, 2)
+
+    def test_multiple_algorithms(self):
+        Checksummer(ChecksumAlg.MD5, cache=self._cache).hash_file(self._file)
+        summer = MultiChecksummer([ ChecksumAlg.MD5, ChecksumAlg.SHA1 ], cache=self._cache)
+        self.assertEqual(summer.hash_file(self._file), MultiChecksummer([ ChecksumAlg.MD5, ChecksumAlg.SHA1 ]).hash_file(self._file))
+        self.assertEqual(len(self._cache), 2)
+
+    def test_always_rehash(self):
+        summer = Checksummer(ChecksumAlg.MD5, cache=self._cache)
+        summer.hash_file(self._file)
+        self._cache.trust = CacheTrust.ALWAYS_REHASH
+        summer.hash_file(self._file)
+        self.assertEqual(self._cache.statistics.hits, 0)
+        self.assertEqual(self._cache.statistics.hit_rate, 0.0)
+
+    def test_prune(self):
+        for algorithm in ChecksumAlg:
+            Checksummer(algorithm, cache=self._cache).hash_file(self._file)
+        self.assertEqual(self._cache.prune(max_entries=2), len(ChecksumAlg) - 2)
+        self.assertEqual(len(self._cache), 2)
+        self.assertEqual(self._cache.prune(max_age=-1), 2)
+        self.assertEqual(self._cache.statistics.evictions, len(ChecksumAlg))
+
+    def test_persistent(self):
+        Checksummer(ChecksumAlg.MD5, cache=self._cache).hash_file(self._file)
+        self._cache.flush()
+        with ChecksumCache(self._cache.path) as reopened:
+            self.assertIsNotNone(reopened.get(os.stat(self._file), ChecksumAlg.MD5))
+
+    def test_batched_writes(self):
+        stat = os.stat(self._file)
+        checksum = Checksum(algorithm=ChecksumAlg.MD5, value='9A0364B9E99BB480DD25E1F0284C8555')
+        self._cache.put(stat, checksum)
+        with ChecksumCache(self._cache.path) as other:
+            # Pending writes are read by their own cache, committed when flushed
+            self.assertEqual(self._cache.get(stat, ChecksumAlg.MD5), checksum)
+            self.assertIsNone(other.get(stat, ChecksumAlg.MD5))
+            self._cache.flush()
+            self.assertEqual(other.get(stat, ChecksumAlg.MD5), checksum)
+        with sqlite3.connect(self._cache.path) as connection:
+            used = connection.execute('SELECT last_used FROM checksums').fetchone()[0]
+        # A hit on a recently used digest doesn't write
+        self._cache.get(stat, ChecksumAlg.MD5)
+        self._cache.flush()
+        with sqlite3.connect(self._cache.path) as connection:
+            self.assertEqual(connection.execute('SELECT last_used FROM checksums').fetchone()[0],
+                             used)
+
+    def test_package_revalidation(self):
+        context = PackageHandler().prepare_context(GOOD_PATH)
+        self.assertTrue(CHECKSUMS.validate(context, cache=self._cache)[0])
+        misses = self._cache.statistics.misses
+        self.assertTrue(CHECKSUMS.validate(context, cache=self._cache)[0])
+        self.assertEqual(self._cache.statistics.hits, misses)
+
+if __name__ == '__main__':
+    unittest.main()
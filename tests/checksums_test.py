@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownershSTRUCT. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Module covering tests for the verification of METS declared sizes and checksums."""
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+
+from eark_validator import checksums as CHECKSUMS
+from eark_validator.infopacks.package_handler import PackageHandler
+from eark_validator.infopacks.throttle import IOThrottle
+from eark_validator.mets import MetsFiles
+from eark_validator.model.validation_report import MetadataStatus
+from tests.utils_test import contains_rule_id
+
+UNPACKED_ROOT = os.path.join(os.path.dirname(__file__), 'resources', 'ips', 'unpacked')
+GOOD_PATH = Path(os.path.join(UNPACKED_ROOT, '733dc055-34be-4260-85c7-5549a7083031'))
+BAD_PATH = Path(os.path.join(UNPACKED_ROOT, '733dc055-34be-4260-85c7-5549a7083031-bad'))
+MIN_ZIP_PATH = Path(os.path.join(os.path.dirname(__file__), 'resources', 'ips', 'minimal',
+                                 'minimal_IP_with_schemas.zip'))
+
+class ChecksumValidationTests(unittest.TestCase):
+    """Unit tests covering the comparison of METS file sizes and checksums
+    with package content."""
+    def test_valid_package(self):
+        context = PackageHandler().prepare_context(GOOD_PATH)
+        is_valid, results = CHECKSUMS.validate(context, workers=4)
+        self.assertTrue(is_valid)
+        self.assertEqual(results.status, MetadataStatus.VALID)
+        self.assertEqual(results.messages, [])
+        self.assertGreater(results.file_count, 0)
+
+    def test_invalid_package(self):
+        context = PackageHandler().prepare_context(BAD_PATH)
+        is_valid, results = CHECKSUMS.validate(context, workers=4)
+        self.assertFalse(is_valid)
+        self.assertEqual(results.status, MetadataStatus.INVALID)
+        self.assertTrue(contains_rule_id(results.messages, CHECKSUMS.SIZE_RULE))
+        self.assertTrue(contains_rule_id(results.messages, CHECKSUMS.CHECKSUM_RULE))
+        self.assertTrue(contains_rule_id(results.messages, CHECKSUMS.LOCATION_RULE))
+        # Size mismatches are reported without a checksum comparison
+        locations = [ result.location for result in results.messages ]
+        self.assertEqual(len(locations), len(set(locations)))
+        self.assertEqual(locations, sorted(locations))
+
+    def test_serial_matches_parallel(self):
+        context = PackageHandler().prepare_context(BAD_PATH)
+        self.assertEqual(CHECKSUMS.validate(context, workers=1),
+                         CHECKSUMS.validate(context, workers=4))
+
+    def test_in_place_archive(self):
+        context = PackageHandler().prepare_context(MIN_ZIP_PATH, in_place=True)
+        _, results = CHECKSUMS.validate(context)
+        self.assertGreater(results.file_count, 0)
+        context.close()
+
+    def test_streamed_archives(self):
+        expected = CHECKSUMS.validate(PackageHandler().prepare_context(BAD_PATH))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_root = Path(temp_dir)
+            tar_path = temp_root.joinpath('bad.tar.gz')
+            with tarfile.open(tar_path, 'w:gz') as tar_ip:
+                tar_ip.add(BAD_PATH, arcname='bad-package')
+            zip_path = Path(shutil.make_archive(str(temp_root.joinpath('bad')), 'zip',
+                                                root_dir=BAD_PATH.parent,
+                                                base_dir=BAD_PATH.name))
+            for archive in (tar_path, zip_path):
+                handler = PackageHandler(temp_root.joinpath('unpacked'))
+                context = handler.prepare_context(archive, in_place=False, payload=False)
+                self.assertFalse(context.is_extracted)
+                self.assertEqual(CHECKSUMS.validate(context, workers=2), expected)
+                # No payload is written to disk to verify it
+                data_files = [ file for subdir, _, files in os.walk(context.root)
+                               for file in files if os.sep + 'data' in subdir ]
+                self.assertEqual(data_files, [])
+                context.close()
+            context = PackageHandler().prepare_context(zip_path, in_place=True)
+            self.assertEqual(CHECKSUMS.validate(context), expected)
+            context.close()
+
+    def test_streamed_tar_member_names(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_root = Path(temp_dir)
+            package = temp_root.joinpath('package')
+            shutil.copytree(GOOD_PATH, package)
+            descriptive = package.joinpath('metadata', 'descriptive')
+            # A file stored twice is archived as a hard link member
+            os.replace(descriptive.joinpath('ead2002.xml'), temp_root.joinpath('ead2002.xml'))
+            os.link(temp_root.joinpath('ead2002.xml'), descriptive.joinpath('ead2002.xml'))
+            tar_path = temp_root.joinpath('package.tar')
+            with tarfile.open(tar_path, 'w') as tar_ip:
+                tar_ip.add(temp_root.joinpath('ead2002.xml'), arcname='./package/linked.xml')
+                tar_ip.add(package, arcname='./package')
+            with tarfile.open(tar_path) as tar_ip:
+                self.assertTrue(tar_ip.getmember('./package/metadata/descriptive/ead2002.xml')
+                                .islnk())
+            context = PackageHandler(temp_root.joinpath('unpacked')).prepare_context(
+                tar_path, in_place=False, payload=False)
+            is_valid, results = CHECKSUMS.validate(context)
+            context.close()
+            self.assertTrue(is_valid, results.messages)
+
+    def test_hashed_while_extracted(self):
+        expected = CHECKSUMS.validate(PackageHandler().prepare_context(BAD_PATH))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_root = Path(temp_dir)
+            tar_path = temp_root.joinpath('bad.tar.gz')
+            with tarfile.open(tar_path, 'w:gz') as tar_ip:
+                tar_ip.add(BAD_PATH, arcname='bad-package')
+            zip_path = Path(shutil.make_archive(str(temp_root.joinpath('bad')), 'zip',
+                                                root_dir=BAD_PATH.parent,
+                                                base_dir=BAD_PATH.name))
+            for archive in (tar_path, zip_path):
+                handler = PackageHandler(temp_root.joinpath('unpacked'))
+                context = handler.prepare_context(archive, in_place=False, digests=True)
+                self.assertTrue(context.is_extracted)
+                throttle = IOThrottle()
+                self.assertEqual(CHECKSUMS.validate(context, workers=2, throttle=throttle), expected)
+                # Every digest was recorded during extraction, nothing is read back
+                self.assertEqual(throttle.statistics.bytes, 0)
+                context.close()
+            # Without the declared algorithms nothing is hashed during extraction
+            context = PackageHandler(temp_root.joinpath('plain')).prepare_context(zip_path,
+                                                                                  in_place=False)
+            throttle = IOThrottle()
+            self.assertEqual(CHECKSUMS.validate(context, workers=2, throttle=throttle), expected)
+            self.assertGreater(throttle.statistics.bytes, 0)
+            context.close()
+
+    def test_hashed_while_streamed(self):
+        expected = CHECKSUMS.validate(PackageHandler().prepare_context(BAD_PATH))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_root = Path(temp_dir)
+            tar_path = temp_root.joinpath('bad.tar.gz')
+            with tarfile.open(tar_path, 'w:gz') as tar_ip:
+                tar_ip.add(BAD_PATH, arcname='bad-package')
+            handler = PackageHandler(temp_root.joinpath('unpacked'))
+            # The second context reuses the cached unpacking and its digests
+            for _ in range(2):
+                context = handler.prepare_context(tar_path, payload=False, digests=True)
+                self.assertFalse(context.is_extracted)
+                # Payload digests were recorded in the unpacking pass, the archive isn't read again
+                os.replace(tar_path, temp_root.joinpath('moved.tar.gz'))
+                self.assertEqual(CHECKSUMS.validate(context, workers=2), expected)
+                os.replace(temp_root.joinpath('moved.tar.gz'), tar_path)
+                context.close()
+
+    def test_iter_file_entries(self):
+        mets_path = GOOD_PATH.joinpath('METS.xml')
+        with open(mets_path, 'rb') as mets_stream:
+            streamed = list(MetsFiles.iter_file_entries(mets_stream))
+        self.assertEqual(streamed, MetsFiles.from_file(mets_path).file_entries)
+
+if __name__ == '__main__':
+    unittest.main()
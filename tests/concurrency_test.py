@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Module containing tests covering adaptive concurrency."""
+import os
+from pathlib import Path
+import tempfile
+import threading
+import time
+import unittest
+
+from eark_validator.infopacks.archives import extract_zip
+from eark_validator.infopacks.concurrency import MIN_WINDOW, AdaptiveConcurrency, run_bounded
+from eark_validator.infopacks.manifest import Manifests
+
+MIN_ZIP_PATH = Path(os.path.join(os.path.dirname(__file__), 'resources', 'ips', 'minimal',
+                                 'minimal_IP_with_schemas.zip'))
+GOOD_PATH = Path(os.path.join(os.path.dirname(__file__), 'resources', 'ips', 'unpacked',
+                              '733dc055-34be-4260-85c7-5549a7083031'))
+
+class AdaptiveConcurrencyTest(unittest.TestCase):
+    def test_bounds(self):
+        controller = AdaptiveConcurrency(min_workers=2, max_workers=4, initial=10)
+        self.assertEqual(controller.limit, 4)
+        self.assertEqual(AdaptiveConcurrency(min_workers=2, max_workers=4).limit, 2)
+        with self.assertRaises(ValueError):
+            AdaptiveConcurrency(min_workers=0)
+        with self.assertRaises(ValueError):
+            AdaptiveConcurrency(min_workers=3, max_workers=2)
+        with self.assertRaises(ValueError):
+            AdaptiveConcurrency(decrease=1.0)
+
+    def test_additive_increase(self):
+        controller = AdaptiveConcurrency(max_workers=3)
+        for _ in range(5):
+            controller._adjust(100.0, 0.1) # pylint: disable=W0212
+        self.assertEqual(controller.limit, 3)
+        self.assertEqual(controller.statistics.increases, 2)
+
+    def test_multiplicative_decrease(self):
+        controller = AdaptiveConcurrency(max_workers=16, initial=8)
+        controller._adjust(100.0, 0.1) # pylint: disable=W0212
+        self.assertEqual(controller.limit, 9)
+        # Throughput dropped
+        controller._adjust(50.0, 0.1) # pylint: disable=W0212
+        self.assertEqual(controller.limit, 4)
+        # Latency rose with no throughput gain
+        controller._adjust(50.0, 0.5) # pylint: disable=W0212
+        self.assertEqual(controller.limit, 2)
+        stats = controller.statistics
+        self.assertEqual(stats.workers, 2)
+        self.assertEqual(stats.decreases, 2)
+        self.assertEqual(stats.bytes_per_second, 50.0)
+        self.assertEqual(stats.latency, 0.5)
+
+    def test_record_window(self):
+        controller = AdaptiveConcurrency(max_workers=4)
+        for _ in range(MIN_WINDOW - 1):
+            controller.record(1024, 0.01)
+        self.assertEqual(controller.statistics.increases, 0)
+        controller.record(1024, 0.01)
+        self.assertEqual(controller.limit, 2)
+        self.assertGreater(controller.statistics.bytes_per_second, 0.0)
+
+    def test_run_bounded_in_flight(self):
+        controller = AdaptiveConcurrency(min_workers=2, max_workers=2)
+        lock = threading.Lock()
+        running = [ 0, 0 ]
+        def _task(item: int) -> int:
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return item * 2
+        results = dict(run_bounded(_task, range(20), 8, controller))
+        self.assertEqual(results, { item: item * 2 for item in range(20) })
+        self.assertLessEqual(running[1], 2)
+        self.assertEqual(dict(run_bounded(_task, range(5), 1)), { item: item * 2 for item in range(5) })
+
+    def test_verify(self):
+        controller = AdaptiveConcurrency(max_workers=4)
+        manifest = Manifests.from_directory(GOOD_PATH, 'MD5')
+        is_valid, _ = Manifests.validate_manifest(manifest, controller=controller)
+        self.assertTrue(is_valid)
+        self.assertGreater(controller.statistics.increases, 0)
+
+    def test_extract_zip(self):
+        controller = AdaptiveConcurrency(max_workers=4)
+        with tempfile.TemporaryDirectory() as dest:
+            stats = extract_zip(MIN_ZIP_PATH, Path(dest), controller=controller)
+            self.assertGreater(stats.files, 0)
+            self.assertLessEqual(stats.workers, 4)
+            self.assertTrue(Path(dest).joinpath('minimal_IP_with_schemas', 'METS.xml').is_file())
+
+if __name__ == '__main__':
+    unittest.main()
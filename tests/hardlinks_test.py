@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Module containing tests covering hard link aware hashing."""
+import os
+from pathlib import Path
+import tempfile
+import unittest
+
+from eark_validator.infopacks.hardlinks import HardlinkDigests
+from eark_validator.infopacks.manifest import Manifests, MultiChecksummer
+from eark_validator.model import ChecksumAlg
+
+SIZE = 64 * 1024
+LINKS = 3
+
+class HardlinkDigestsTest(unittest.TestCase):
+    def setUp(self):
+        self._test_dir = tempfile.TemporaryDirectory()
+        self._root = Path(self._test_dir.name)
+        data = os.urandom(SIZE)
+        self._original = self._root.joinpath('rep1', 'data', 'file.bin')
+        self._original.parent.mkdir(parents=True)
+        self._original.write_bytes(data)
+        for index in range(2, LINKS + 1):
+            link = self._root.joinpath(f'rep{index}', 'data', 'file.bin')
+            link.parent.mkdir(parents=True)
+            try:
+                os.link(self._original, link)
+            except OSError:
+                self.skipTest('Hard links are not supported by the file system.')
+        self._root.joinpath('single.bin').write_bytes(data)
+
+    def tearDown(self):
+        self._test_dir.cleanup()
+
+    def test_from_directory(self):
+        links = HardlinkDigests()
+        manifest = Manifests.from_directory(self._root, 'SHA-256', links=links)
+        self.assertEqual(manifest.file_count, LINKS + 1)
+        self.assertEqual(len({ entry.checksums[0].value for entry in manifest.entries }), 1)
+        self.assertEqual(links.statistics.files, LINKS - 1)
+        self.assertEqual(links.statistics.bytes, (LINKS - 1) * SIZE)
+        # Only the multiply linked inode is recorded
+        self.assertEqual(len(links), 1)
+
+    def test_validate_manifest(self):
+        manifest = Manifests.from_directory(self._root, 'MD5')
+        for workers in (1, 4):
+            links = HardlinkDigests()
+            is_valid, _ = Manifests.validate_manifest(manifest, workers=workers, links=links)
+            self.assertTrue(is_valid)
+            self.assertEqual(links.statistics.bytes, (LINKS - 1) * SIZE)
+
+    def test_calculated_once(self):
+        calls = []
+        def _calculate(algorithms):
+            calls.append(algorithms)
+            return MultiChecksummer(algorithms).hash_file(self._original)
+        links = HardlinkDigests()
+        stat = os.stat(self._original)
+        first = links.hash_file(stat, [ ChecksumAlg.MD5 ], _calculate)
+        self.assertEqual(links.hash_file(stat, [ ChecksumAlg.MD5 ], _calculate), first)
+        self.assertEqual(len(calls), 1)
+        # Only the missing algorithm is calculated for a later link
+        both = links.hash_file(stat, [ ChecksumAlg.MD5, ChecksumAlg.SHA1 ], _calculate)
+        self.assertEqual(both[0], first[0])
+        self.assertEqual(calls[-1], [ ChecksumAlg.SHA1 ])
+
+    def test_failure(self):
+        links = HardlinkDigests()
+        stat = os.stat(self._original)
+        def _fail(_):
+            raise OSError('read failed')
+        with self.assertRaises(OSError):
+            links.hash_file(stat, [ ChecksumAlg.MD5 ], _fail)
+        self.assertEqual(len(links), 0)
+        checksums = links.hash_file(stat, [ ChecksumAlg.MD5 ],
+                                    lambda algorithms: MultiChecksummer(algorithms).hash_file(self._original))
+        self.assertEqual(len(checksums), 1)
+        self.assertEqual(links.statistics.files, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Module containing tests covering physical locality ordering."""
+import os
+from pathlib import Path
+import tempfile
+import unittest
+
+from eark_validator import checksums as CHECKSUMS
+from eark_validator.infopacks.locality import locality_key, order_entries, physical_offset
+from eark_validator.infopacks.manifest import Manifests
+from eark_validator.infopacks.package_handler import PackageHandler
+from eark_validator.model import FileOrder, ManifestEntry
+
+GOOD_PATH = Path(os.path.join(os.path.dirname(__file__), 'resources', 'ips', 'unpacked',
+                              '733dc055-34be-4260-85c7-5549a7083031'))
+
+class LocalityTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._manifest = Manifests.from_directory(GOOD_PATH, 'MD5')
+
+    def test_physical_offset(self):
+        offset = physical_offset(GOOD_PATH.joinpath('METS.xml'))
+        # Not every file system or platform reports extents
+        self.assertTrue(offset is None or offset >= 0)
+        self.assertIsNone(physical_offset(GOOD_PATH.joinpath('missing.xml')))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            empty = Path(temp_dir).joinpath('empty')
+            empty.touch()
+            self.assertIsNone(physical_offset(empty))
+
+    def test_inode_order(self):
+        ordered = order_entries(GOOD_PATH, self._manifest.entries, FileOrder.INODE)
+        self.assertCountEqual(ordered, self._manifest.entries)
+        inodes = [ os.stat(GOOD_PATH.joinpath(entry.path)).st_ino for entry in ordered ]
+        self.assertEqual(inodes, sorted(inodes))
+
+    def test_orders(self):
+        entries = self._manifest.entries
+        self.assertEqual(order_entries(GOOD_PATH, entries, FileOrder.MANIFEST), entries)
+        sizes = [ entry.size for entry in order_entries(GOOD_PATH, entries, FileOrder.SIZE) ]
+        self.assertEqual(sizes, sorted(sizes, reverse=True))
+        self.assertCountEqual(order_entries(GOOD_PATH, entries, FileOrder.PHYSICAL), entries)
+
+    def test_missing_last(self):
+        missing = ManifestEntry(path='missing.xml', size=1)
+        ordered = order_entries(GOOD_PATH, [ missing ] + self._manifest.entries, FileOrder.PHYSICAL)
+        self.assertEqual(ordered[-1], missing)
+        self.assertGreater(locality_key(GOOD_PATH.joinpath('missing.xml'), FileOrder.INODE),
+                           locality_key(GOOD_PATH.joinpath('METS.xml'), FileOrder.INODE))
+
+    def test_verify_orders(self):
+        bad_root = Path(str(GOOD_PATH) + '-bad')
+        expected = Manifests.validate_manifest(self._manifest, bad_root)
+        for order in FileOrder:
+            self.assertEqual(Manifests.validate_manifest(self._manifest, bad_root, order=order),
+                             expected)
+
+    def test_from_directory_order(self):
+        manifest = Manifests.from_directory(GOOD_PATH, 'MD5', order=FileOrder.PHYSICAL)
+        self.assertEqual(manifest.entries, self._manifest.entries)
+
+    def test_checksums_order(self):
+        context = PackageHandler().prepare_context(GOOD_PATH)
+        is_valid, results = CHECKSUMS.validate(context, order=FileOrder.INODE)
+        self.assertTrue(is_valid)
+        self.assertGreater(results.file_count, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Module containing tests covering the streaming manifest builder."""
+import os
+from pathlib import Path
+import tempfile
+import unittest
+
+from eark_validator.infopacks.manifest import Manifests
+from eark_validator.infopacks.manifest_builder import ManifestBuilder
+from eark_validator.infopacks.manifest_file import ManifestReader
+from eark_validator.infopacks.throttle import IOThrottle
+from eark_validator.model import ChecksumAlg, SourceType
+
+UNPACKED_ROOT = Path(os.path.join(os.path.dirname(__file__), 'resources', 'ips', 'unpacked',
+                                  '733dc055-34be-4260-85c7-5549a7083031'))
+
+def _by_path(entries):
+    return sorted(entries, key=lambda entry: str(entry.path))
+
+class ManifestBuilderTest(unittest.TestCase):
+    def setUp(self):
+        self._test_dir = tempfile.TemporaryDirectory()
+        self._root = Path(self._test_dir.name)
+
+    def tearDown(self):
+        self._test_dir.cleanup()
+
+    def test_matches_from_directory(self):
+        expected = Manifests.from_directory(UNPACKED_ROOT, [ ChecksumAlg.MD5, ChecksumAlg.SHA256 ])
+        for workers in (1, 4):
+            builder = ManifestBuilder([ ChecksumAlg.MD5, ChecksumAlg.SHA256 ], workers=workers)
+            manifest = builder.build(UNPACKED_ROOT)
+            self.assertEqual(manifest.entries, _by_path(expected.entries))
+            self.assertEqual(manifest.summary.file_count, expected.file_count)
+            self.assertEqual(manifest.summary.total_size, expected.total_size)
+            self.assertEqual(builder.statistics.files, expected.file_count)
+
+    def test_sizes_only(self):
+        throttle = IOThrottle()
+        entries = list(ManifestBuilder(workers=2, throttle=throttle).entries(UNPACKED_ROOT))
+        self.assertEqual(len(entries), len(Manifests.from_directory(UNPACKED_ROOT).entries))
+        self.assertTrue(all(entry.checksums == [] for entry in entries))
+        self.assertEqual(throttle.statistics.bytes, 0)
+        self.assertGreater(throttle.statistics.operations, len(entries))
+
+    def test_write(self):
+        progress = []
+        builder = ManifestBuilder([ ChecksumAlg.SHA256 ], workers=4, progress=progress.append)
+        path = self._root.joinpath('manifest.ndjson.gz')
+        summary = builder.write(UNPACKED_ROOT, path)
+        with ManifestReader(path) as reader:
+            self.assertEqual(reader.header.source, SourceType.PACKAGE)
+            self.assertEqual(reader.summary, summary)
+            entries = list(reader)
+        self.assertEqual(_by_path(entries), builder.build(UNPACKED_ROOT).entries)
+        # Progress is always reported when a build finishes
+        self.assertEqual(progress[-1].files, summary.file_count)
+        self.assertEqual(progress[-1].bytes, summary.total_size)
+
+    def test_links_and_special_files(self):
+        folder = self._root.joinpath('package', 'data')
+        folder.mkdir(parents=True)
+        folder.joinpath('file.txt').write_bytes(b'data')
+        outside = self._root.joinpath('outside')
+        outside.mkdir()
+        outside.joinpath('other.txt').write_bytes(b'other')
+        try:
+            folder.joinpath('linked.txt').symlink_to(folder.joinpath('file.txt'))
+            folder.joinpath('linked').symlink_to(outside, target_is_directory=True)
+            folder.joinpath('broken.txt').symlink_to(self._root.joinpath('missing.txt'))
+        except OSError:
+            self.skipTest('Symbolic links are not supported by the file system.')
+        manifest = ManifestBuilder([ ChecksumAlg.MD5 ]).build(self._root.joinpath('package'))
+        self.assertEqual([ str(entry.path) for entry in manifest.entries ],
+                         [ 'data/file.txt', 'data/linked.txt' ])
+
+    def test_not_directory(self):
+        with self.assertRaises(ValueError):
+            list(ManifestBuilder().entries(UNPACKED_ROOT.joinpath('METS.xml')))
+        with self.assertRaises(FileNotFoundError):
+            list(ManifestBuilder().entries(self._root.joinpath('missing')))
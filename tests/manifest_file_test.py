@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Module containing tests covering the streamable manifest file format."""
+import os
+from pathlib import Path
+import pickle
+import tempfile
+import unittest
+
+from eark_validator.infopacks.manifest import Manifests
+from eark_validator.infopacks.manifest_file import ManifestReader, ManifestWriter, index_path
+from eark_validator.model import ChecksumAlg, ManifestSummary, SourceType
+
+UNPACKED_ROOT = Path(os.path.join(os.path.dirname(__file__), 'resources', 'ips', 'unpacked',
+                                  '733dc055-34be-4260-85c7-5549a7083031'))
+
+class ManifestFileTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._manifest = Manifests.from_directory(UNPACKED_ROOT, [ ChecksumAlg.MD5, ChecksumAlg.SHA256 ])
+
+    def setUp(self):
+        self._test_dir = tempfile.TemporaryDirectory()
+        self._root = Path(self._test_dir.name)
+
+    def tearDown(self):
+        self._test_dir.cleanup()
+
+    def test_round_trip(self):
+        for name in ('manifest.ndjson', 'manifest.ndjson.gz'):
+            path = self._root.joinpath(name)
+            Manifests.to_file(self._manifest, path)
+            self.assertEqual(Manifests.from_file(path), self._manifest)
+            self.assertTrue(index_path(path).is_file())
+        with open(self._root.joinpath('manifest.ndjson.gz'), 'rb') as file:
+            self.assertEqual(file.read(2), b'\x1f\x8b')
+
+    def test_lookup(self):
+        for compress in (False, True):
+            path = self._root.joinpath(f'manifest-{compress}')
+            with ManifestWriter(path, self._manifest.source, self._manifest.root,
+                                compress=compress, block_entries=3) as writer:
+                writer.write_all(self._manifest.entries)
+            with ManifestReader(path) as reader:
+                self.assertTrue(reader.is_indexed)
+                for entry in self._manifest.entries:
+                    self.assertEqual(reader.lookup(entry.path), entry)
+                self.assertEqual(reader.lookup(str(self._manifest.entries[-1].path)),
+                                 self._manifest.entries[-1])
+                self.assertIsNone(reader.lookup('missing.xml'))
+
+    def test_streamed_summary(self):
+        path = self._root.joinpath('manifest.ndjson.gz')
+        with ManifestWriter(path, SourceType.PACKAGE, UNPACKED_ROOT, index=False) as writer:
+            writer.write_all(self._manifest.entries)
+        expected = ManifestSummary(file_count=self._manifest.file_count,
+                                   total_size=self._manifest.total_size)
+        self.assertEqual(writer.summary, expected)
+        with ManifestReader(path) as reader:
+            self.assertEqual(reader.header.source, SourceType.PACKAGE)
+            self.assertEqual(reader.header.root, UNPACKED_ROOT)
+            self.assertIsNone(reader.summary)
+            self.assertFalse(reader.is_indexed)
+            with self.assertRaises(ValueError):
+                reader.lookup('METS.xml')
+            self.assertEqual(list(reader), self._manifest.entries)
+            self.assertEqual(reader.summary, expected)
+
+    def test_stale_index(self):
+        path = self._root.joinpath('manifest.ndjson')
+        Manifests.to_file(self._manifest, path)
+        index = index_path(path).read_bytes()
+        Manifests.to_file(self._manifest.model_copy(update={ 'entries': self._manifest.entries[:1] }),
+                          path, index=False)
+        index_path(path).write_bytes(index)
+        with ManifestReader(path) as reader:
+            self.assertFalse(reader.is_indexed)
+
+    def test_not_manifest(self):
+        pickled = self._root.joinpath('manifest.pickle')
+        with open(pickled, 'wb') as file:
+            pickle.dump(self._manifest, file)
+        with self.assertRaises(ValueError):
+            Manifests.from_file(pickled)
+        bad_entry = self._root.joinpath('bad.ndjson')
+        Manifests.to_file(self._manifest, bad_entry, index=False)
+        with open(bad_entry, 'rb') as file:
+            header = file.readline()
+        bad_entry.write_bytes(header + b'["METS.xml",1,"MD5"]\n')
+        with ManifestReader(bad_entry) as reader, self.assertRaises(ValueError):
+            list(reader)
+        with self.assertRaises(FileNotFoundError):
+            ManifestReader(self._root.joinpath('missing.ndjson'))
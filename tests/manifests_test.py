@@ -25,13 +25,15 @@
 """Module containing tests covering the manifest class."""
 from enum import Enum
 import os
+import shutil
+import tarfile
 from pathlib import Path
 import tempfile
 import unittest
 from importlib_resources import files
 import xml.etree.ElementTree as ET
 
-from eark_validator.model.manifest import Manifest, SourceType
+from eark_validator.model.manifest import IssueType, Manifest, SourceType
 from eark_validator.model.manifest import ManifestEntry
 
 import tests.resources as RES
@@ -39,11 +41,16 @@ import tests.resources.xml as XML
 import tests.resources.ips.unpacked as UNPACKED
 
 from eark_validator.infopacks.manifest import (
+    ChecksumVerifier,
     Checksummer,
+    DigestMap,
     ManifestEntries,
     Manifests,
-    _resolve_manifest_root
+    MultiChecksummer,
+    _resolve_manifest_root,
+    _test_checksums
 )
+from eark_validator.infopacks.throttle import IOThrottle
 from eark_validator.mets import _parse_file_entry
 from eark_validator.model import ChecksumAlg, Checksum
 
@@ -157,6 +164,56 @@ class ChecksummerTest(unittest.TestCase):
         with self.assertRaises(FileNotFoundError):
             alg.hash_file(MISSING_PATH)
 
+    def test_buffer_sizes(self):
+        expected = Checksummer(ChecksumAlg.SHA256).hash_file(PERSON_PATH)
+        for buffer_size in [ 1, 7, 4096, 8 * 1024 * 1024 ]:
+            summer = Checksummer(ChecksumAlg.SHA256, buffer_size=buffer_size)
+            self.assertEqual(summer.buffer_size, buffer_size)
+            self.assertEqual(summer.hash_file(PERSON_PATH), expected)
+
+    def test_mmap(self):
+        expected = Checksummer(ChecksumAlg.SHA256).hash_file(PERSON_PATH)
+        summer = Checksummer(ChecksumAlg.SHA256, buffer_size=1000, mmap_threshold=0)
+        self.assertEqual(summer.hash_file(PERSON_PATH), expected)
+        with tempfile.NamedTemporaryFile() as empty:
+            self.assertEqual(summer.hash_file(Path(empty.name)).value,
+                             'E3B0C44298FC1C149AFBF4C8996FB92427AE41E4649B934CA495991B7852B855')
+
+    def test_stream_without_readinto(self):
+        class _Reader():
+            def __init__(self, path):
+                self._file = open(path, 'rb')
+            def read(self, size=-1):
+                return self._file.read(size)
+        reader = _Reader(PERSON_PATH)
+        self.assertEqual(Checksummer(ChecksumAlg.MD5).hash_stream(reader).value,
+                         '9958111AF1284696D07EC9D2E70D2517')
+        reader._file.close()
+
+class MultiChecksummerTest(unittest.TestCase):
+    def test_matches_single(self):
+        summer = MultiChecksummer([ 'MD5', ChecksumAlg.SHA256, ChecksumAlg.SHA512 ])
+        checksums = summer.hash_file(PERSON_PATH)
+        self.assertEqual([ checksum.algorithm for checksum in checksums ],
+                         [ ChecksumAlg.MD5, ChecksumAlg.SHA256, ChecksumAlg.SHA512 ])
+        for checksum in checksums:
+            self.assertEqual(checksum, Checksummer(checksum.algorithm).hash_file(PERSON_PATH))
+
+    def test_distinct(self):
+        summer = MultiChecksummer([ 'SHA-1', 'SHA1', ChecksumAlg.SHA1 ])
+        self.assertEqual(summer.algorithms, [ ChecksumAlg.SHA1 ])
+
+    def test_stream(self):
+        summer = MultiChecksummer([ ChecksumAlg.MD5, ChecksumAlg.SHA1 ], buffer_size=100)
+        with open(PERSON_PATH, 'rb') as stream:
+            self.assertEqual(summer.hash_stream(stream), summer.hash_file(PERSON_PATH))
+
+    def test_test_checksums(self):
+        md5 = Checksummer(ChecksumAlg.MD5).hash_file(PERSON_PATH)
+        bad = Checksum(algorithm=ChecksumAlg.SHA256, value='00')
+        self.assertEqual(_test_checksums(PERSON_PATH, [ md5 ]), [])
+        self.assertEqual(len(_test_checksums(PERSON_PATH, [ md5, bad ])), 1)
+
 class ManifestEntryTest(unittest.TestCase):
     def test_from_missing_path(self):
         with self.assertRaises(FileNotFoundError):
@@ -171,6 +228,13 @@ class ManifestEntryTest(unittest.TestCase):
         self.assertEqual(item.checksums[0].algorithm.value, 'SHA-256', 'Expected SHA-256 digest value not {}'.format(item.checksums[0].algorithm.value))
         self.assertEqual(item.checksums[0].value, 'C944AF078A5AC0BAC02E423D663CF6AD2EFBF94F92343D547D32907D13D44683', 'SHA256 digest {} does not match'.format(item.checksums[0].value))
 
+    def test_from_file_algorithms(self):
+        item = ManifestEntries.from_file_path(PERSON_PATH, PERSON_PATH, [ 'MD5', 'SHA256' ])
+        self.assertEqual([ checksum.value for checksum in item.checksums ],
+                         [ '9958111AF1284696D07EC9D2E70D2517',
+                           'C944AF078A5AC0BAC02E423D663CF6AD2EFBF94F92343D547D32907D13D44683' ])
+        self.assertEqual(item.size, os.path.getsize(PERSON_PATH))
+
     def test_from_file_entry(self):
         entry: ManifestEntry = ManifestEntries.from_file_entry(_parse_file_entry(ET.fromstring(FILE_XML)))
         self.assertEqual(entry.checksums[0].algorithm, ChecksumAlg.SHA256)
@@ -185,7 +249,7 @@ class ManifestTest(unittest.TestCase):
 
     def setUp(self):
         self._test_dir = tempfile.TemporaryDirectory()
-        self._temp_man_pickle = os.path.join(self._test_dir.name, 'manifest.pickle')
+        self._temp_man_file = os.path.join(self._test_dir.name, 'manifest.ndjson')
 
     def tearDown(self):
         self._test_dir.cleanup()
@@ -241,17 +305,107 @@ class ManifestTest(unittest.TestCase):
             Manifests.from_mets_file(files(UNPACKED).joinpath('733dc055-34be-4260-85c7-5549a7083031'))
 
     def test_to_file(self):
-        Manifests.to_file(self._manifest, self._temp_man_pickle)
-        self.assertTrue(os.path.exists(self._temp_man_pickle))
+        Manifests.to_file(self._manifest, self._temp_man_file)
+        self.assertTrue(os.path.exists(self._temp_man_file))
 
     def test_from_file(self):
-        Manifests.to_file(self._manifest, self._temp_man_pickle)
-        manifest: Manifest = Manifests.from_file(self._temp_man_pickle)
+        Manifests.to_file(self._manifest, self._temp_man_file)
+        manifest: Manifest = Manifests.from_file(self._temp_man_file)
         is_valid, _ = Manifests.validate_manifest(manifest, files(UNPACKED).joinpath('733dc055-34be-4260-85c7-5549a7083031'))
         self.assertTrue(is_valid)
         is_valid, errors = Manifests.validate_manifest(manifest, files(UNPACKED).joinpath('733dc055-34be-4260-85c7-5549a7083031-bad'))
         self.assertFalse(is_valid)
         self.assertEqual(len(errors), 3)
+        # Files with the wrong size are reported without being hashed
+        self.assertEqual([ error.type for error in errors ],
+                         [ IssueType.SIZE, IssueType.MISSING, IssueType.SIZE ])
+        self.assertEqual(str(errors[1].path), 'metadata/descriptive/ead2002.xml')
+
+    def test_validate_checksum_mismatch(self):
+        root = os.path.join(self._test_dir.name, 'package')
+        shutil.copytree(files(UNPACKED).joinpath('733dc055-34be-4260-85c7-5549a7083031'), root)
+        manifest: Manifest = Manifests.from_directory(root, 'MD5')
+        target = os.path.join(root, 'METS.xml')
+        with open(target, 'r+b') as mets:
+            first = mets.read(1)
+            mets.seek(0)
+            mets.write(b'#' if first != b'#' else b'!')
+        is_valid, errors = Manifests.validate_manifest(manifest)
+        self.assertFalse(is_valid)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].type, IssueType.CHECKSUM)
+        self.assertEqual(errors[0].algorithm, ChecksumAlg.MD5)
+        self.assertEqual(str(errors[0].path), 'METS.xml')
+        self.assertIn('checksum', errors[0].message)
+
+    def test_validate_max_issues(self):
+        bad_root = files(UNPACKED).joinpath('733dc055-34be-4260-85c7-5549a7083031-bad')
+        is_valid, errors = Manifests.validate_manifest(self._manifest, bad_root,
+                                                       workers=1, max_issues=1)
+        self.assertFalse(is_valid)
+        self.assertEqual(len(errors), 1)
+        _, errors = Manifests.validate_manifest(self._manifest, bad_root, max_issues=10)
+        self.assertEqual(len(errors), 3)
+
+    def test_validate_digests(self):
+        bad_root = Path(str(files(UNPACKED).joinpath('733dc055-34be-4260-85c7-5549a7083031-bad')))
+        expected = Manifests.validate_manifest(self._manifest, bad_root)
+        digests = DigestMap(Manifests.from_directory(bad_root, checksum_algorithm=ChecksumAlg.MD5))
+        throttle = IOThrottle()
+        self.assertEqual(Manifests.validate_manifest(self._manifest, bad_root, throttle=throttle,
+                                                     digests=digests), expected)
+        self.assertEqual(throttle.statistics.bytes, 0)
+        entry = self._manifest.entries[0]
+        self.assertIsNone(digests.lookup(entry.path, entry.size + 1, [ ChecksumAlg.MD5 ]))
+        self.assertIsNone(digests.lookup(entry.path, entry.size, [ ChecksumAlg.SHA256 ]))
+        self.assertIsNone(digests.lookup('missing.xml', 0, []))
+
+    def test_validate_archive(self):
+        bad_root = Path(str(files(UNPACKED).joinpath('733dc055-34be-4260-85c7-5549a7083031-bad')))
+        expected = Manifests.validate_manifest(self._manifest, bad_root)
+        for archive_format in ('zip', 'gztar'):
+            archive = shutil.make_archive(os.path.join(self._test_dir.name, 'bad'), archive_format,
+                                          root_dir=bad_root.parent, base_dir=bad_root.name)
+            self.assertEqual(Manifests.validate_archive(self._manifest, Path(archive), workers=2),
+                             expected)
+            is_valid, issues = Manifests.validate_archive(self._manifest, Path(archive),
+                                                          max_issues=1)
+            self.assertFalse(is_valid)
+            self.assertEqual(len(issues), 1)
+            is_valid, issues = Manifests.validate_archive(self._manifest, Path(archive),
+                                                          member_root='missing')
+            self.assertEqual(len(issues), self._manifest.file_count)
+
+    def test_validate_archive_member_names(self):
+        # Archives made with tar -C dir -cf package.tar ./package, where a
+        # duplicated file is stored as a hard link member
+        package = os.path.join(self._test_dir.name, 'package')
+        shutil.copytree(str(files(UNPACKED).joinpath('733dc055-34be-4260-85c7-5549a7083031')),
+                        package)
+        descriptive = os.path.join(package, 'metadata', 'descriptive')
+        os.link(os.path.join(descriptive, 'ead2002.xml'),
+                os.path.join(descriptive, 'ead2002.xml.copy'))
+        manifest = Manifests.from_directory(Path(package), 'MD5')
+        archive = Path(self._test_dir.name).joinpath('package.tar')
+        with tarfile.open(archive, 'w') as tar_ip:
+            tar_ip.add(package, arcname='./package')
+        with tarfile.open(archive) as tar_ip:
+            self.assertTrue(any(info.islnk() for info in tar_ip))
+        self.assertEqual(Manifests.validate_archive(manifest, archive), (True, []))
+
+    def test_validate_workers(self):
+        manifest: Manifest = Manifests.from_directory(files(UNPACKED).joinpath('733dc055-34be-4260-85c7-5549a7083031'), 'MD5')
+        bad_root = files(UNPACKED).joinpath('733dc055-34be-4260-85c7-5549a7083031-bad')
+        serial = Manifests.validate_manifest(manifest, bad_root, workers=1)
+        self.assertEqual(Manifests.validate_manifest(manifest, bad_root, workers=4), serial)
+
+    def test_verifier_streams_largest_first(self):
+        manifest: Manifest = Manifests.from_directory(files(UNPACKED).joinpath('733dc055-34be-4260-85c7-5549a7083031'), 'MD5')
+        verifier = ChecksumVerifier(workers=1)
+        self.assertEqual(verifier.workers, 1)
+        sizes = [ entry.size for entry, _ in verifier.run(lambda entry: None, manifest.entries) ]
+        self.assertEqual(sizes, sorted(sizes, reverse=True))
+        self.assertEqual(list(ChecksumVerifier(workers=3).verify(manifest.root, manifest.entries)), [])
 
     def test_resolve_manifest_bad_source(self):
         manifest = Manifest.model_validate({
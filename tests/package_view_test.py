@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Module containing tests covering package views."""
+import os
+from pathlib import Path
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+from eark_validator import structure as STRUCT
+from eark_validator.infopacks.information_package import InformationPackages
+from eark_validator.infopacks.manifest import Checksummer
+from eark_validator.infopacks.package_handler import PackageError, PackageHandler
+from eark_validator.infopacks.package_view import DirectoryView, ExtractingView, ZipView
+
+IPS_ROOT = os.path.join(os.path.dirname(__file__), 'resources', 'ips')
+MIN_ZIP_PATH = Path(os.path.join(IPS_ROOT, 'minimal', 'minimal_IP_with_schemas.zip'))
+MIN_TARGZ_PATH = Path(os.path.join(IPS_ROOT, 'minimal', 'minimal_IP_with_schemas.tar.gz'))
+PAYLOAD = 'representations/rep1/data/.gitkeep'
+MULTI_DIR_PATH = Path(os.path.join(IPS_ROOT, 'bad', 'multi_dir.zip'))
+SINGLE_FILE_PATH = Path(os.path.join(IPS_ROOT, 'bad', 'single_file.zip'))
+METS_XML = 'METS.xml'
+UNPACKED_PATH = Path(os.path.join(IPS_ROOT, 'unpacked', '733dc055-34be-4260-85c7-5549a7083031'))
+
+class PackageViewTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._test_dir = tempfile.TemporaryDirectory()
+        cls._unpacked = PackageHandler(Path(cls._test_dir.name)).unpack_package(MIN_ZIP_PATH)
+        cls._dir_view = DirectoryView(cls._unpacked)
+        cls._zip_view = ZipView(MIN_ZIP_PATH, cls._unpacked.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._zip_view.close()
+        cls._test_dir.cleanup()
+
+    def test_name(self):
+        self.assertEqual(self._zip_view.name, self._dir_view.name)
+
+    def test_list_dir(self):
+        for rel_path in [ '', 'metadata', 'representations', 'representations/rep1' ]:
+            self.assertEqual(self._zip_view.list_dir(rel_path), self._dir_view.list_dir(rel_path))
+
+    def test_list_missing_dir(self):
+        self.assertEqual(self._zip_view.list_dir('missing'), (set(), set()))
+        self.assertEqual(self._dir_view.list_dir('missing'), (set(), set()))
+
+    def test_files(self):
+        self.assertEqual(sorted(self._zip_view.iter_files()), sorted(self._dir_view.iter_files()))
+
+    def test_is_file_dir(self):
+        for view in [ self._zip_view, self._dir_view ]:
+            self.assertTrue(view.is_file(METS_XML))
+            self.assertTrue(view.is_file('./' + METS_XML))
+            self.assertFalse(view.is_dir(METS_XML))
+            self.assertTrue(view.is_dir('metadata'))
+            self.assertTrue(view.is_dir(''))
+
+    def test_size_and_content(self):
+        for rel_path in self._dir_view.iter_files():
+            self.assertEqual(self._zip_view.size(rel_path), self._dir_view.size(rel_path))
+            with self._zip_view.open(rel_path) as zip_stream, \
+                 self._dir_view.open(rel_path) as dir_stream:
+                self.assertEqual(Checksummer('SHA-256').hash_stream(zip_stream),
+                                 Checksummer('SHA-256').hash_stream(dir_stream))
+
+    def test_missing_member(self):
+        with self.assertRaises(FileNotFoundError):
+            self._zip_view.open('missing.xml')
+
+    def test_outside_package(self):
+        with self.assertRaises(ValueError):
+            self._zip_view.is_file('../METS.xml')
+        with self.assertRaises(ValueError):
+            self._dir_view.open('/etc/passwd')
+
+class InPlaceContextTest(unittest.TestCase):
+    def setUp(self):
+        self._test_dir = tempfile.TemporaryDirectory()
+        self._root = Path(self._test_dir.name)
+
+    def tearDown(self):
+        self._test_dir.cleanup()
+
+    def test_in_place(self):
+        context = PackageHandler(self._root).prepare_context(MIN_ZIP_PATH, in_place=True)
+        self.assertIsInstance(context.view, ZipView)
+        self.assertTrue(context.is_archive)
+        self.assertFalse(context.is_extracted)
+        self.assertEqual(os.listdir(self._root), [])
+        context.close()
+
+    def test_in_place_when_over_budget(self):
+        context = PackageHandler(self._root, max_cache_bytes=1).prepare_context(MIN_ZIP_PATH)
+        self.assertIsInstance(context.view, ZipView)
+        context.close()
+
+    def test_extracted_within_budget(self):
+        context = PackageHandler(self._root).prepare_context(MIN_ZIP_PATH)
+        self.assertTrue(context.is_extracted)
+
+    def test_in_place_bad_shape(self):
+        handler = PackageHandler(self._root)
+        self.assertRaises(PackageError, handler.prepare_context, MULTI_DIR_PATH, in_place=True)
+        self.assertRaises(PackageError, handler.prepare_context, SINGLE_FILE_PATH, in_place=True)
+
+    def test_structure_in_place(self):
+        handler = PackageHandler(self._root)
+        _, in_place = STRUCT.validate(handler.prepare_context(MIN_ZIP_PATH, in_place=True))
+        _, extracted = STRUCT.validate(handler.prepare_context(MIN_ZIP_PATH, in_place=False))
+        self.assertEqual(in_place, extracted)
+
+    def test_package_in_place(self):
+        handler = PackageHandler(self._root)
+        in_place = InformationPackages.from_path(handler.prepare_context(MIN_ZIP_PATH, in_place=True))
+        extracted = InformationPackages.from_path(handler.prepare_context(MIN_ZIP_PATH, in_place=False))
+        self.assertEqual(in_place, extracted)
+
+class MetadataOnlyTest(unittest.TestCase):
+    def setUp(self):
+        self._test_dir = tempfile.TemporaryDirectory()
+        self._root = Path(self._test_dir.name)
+
+    def tearDown(self):
+        self._test_dir.cleanup()
+
+    def test_payload_not_unpacked(self):
+        handler = PackageHandler(self._root)
+        for archive in [ MIN_ZIP_PATH, MIN_TARGZ_PATH ]:
+            root = handler.unpack_package(archive, payload=False)
+            self.assertTrue(root.joinpath(METS_XML).is_file())
+            self.assertTrue(root.joinpath('schemas', 'mets.xsd').is_file())
+            self.assertTrue(root.joinpath('representations', 'rep1', 'data').is_dir())
+            self.assertFalse(root.joinpath(PAYLOAD).exists())
+            self.assertTrue(root.parent.name.endswith('.metadata'))
+
+    def test_full_unpacking_reused(self):
+        handler = PackageHandler(self._root)
+        full = handler.unpack_package(MIN_ZIP_PATH)
+        self.assertEqual(handler.unpack_package(MIN_ZIP_PATH, payload=False), full)
+
+    def test_lazy_payload(self):
+        context = PackageHandler(self._root).prepare_context(MIN_TARGZ_PATH, payload=False)
+        view = context.view
+        self.assertIsInstance(view, ExtractingView)
+        self.assertFalse(context.root.joinpath(PAYLOAD).exists())
+        self.assertEqual(view.list_dir('representations/rep1/data'), (set(), { '.gitkeep' }))
+        self.assertTrue(view.is_file(PAYLOAD))
+        self.assertIn(PAYLOAD, list(view.iter_files()))
+        self.assertEqual(view.size(PAYLOAD), 0)
+        self.assertFalse(context.root.joinpath(PAYLOAD).exists())
+        unpacked = sorted(path for path in context.root.rglob('*'))
+        with view.open(PAYLOAD) as stream:
+            self.assertEqual(stream.read(), b'')
+        # Payload is extracted outside the cache entry, which keeps its recorded size
+        extracted = view.materialise(PAYLOAD)
+        self.assertTrue(extracted.is_file())
+        self.assertFalse(context.root.joinpath(PAYLOAD).exists())
+        self.assertEqual(sorted(path for path in context.root.rglob('*')), unpacked)
+        self.assertEqual(len([ path for path in view.iter_files() if path == PAYLOAD ]), 1)
+        context.close()
+        self.assertFalse(extracted.exists())
+
+    def test_archive_not_reread(self):
+        archive = self._root.joinpath('package.tar.gz')
+        moved = self._root.joinpath('moved.tar.gz')
+        shutil.copyfile(MIN_TARGZ_PATH, archive)
+        handler = PackageHandler(self._root.joinpath('cache'))
+        # The second context is a cache hit
+        for _ in range(2):
+            context = handler.prepare_context(archive, payload=False)
+            # Metadata and the payload listing are read without the archive
+            os.replace(archive, moved)
+            with context.view.open(METS_XML) as stream:
+                self.assertTrue(stream.read())
+            self.assertTrue(context.view.is_file(PAYLOAD))
+            self.assertEqual(context.view.size(PAYLOAD), 0)
+            self.assertEqual(context.view.list_dir('representations/rep1/data'),
+                             (set(), { '.gitkeep' }))
+            os.replace(moved, archive)
+            context.close()
+
+    def test_tar_payload_single_pass(self):
+        package = self._root.joinpath('package')
+        shutil.copytree(UNPACKED_PATH, package)
+        package.joinpath('representations', 'rep1', 'data', 'more.txt').write_bytes(b'more')
+        archive = self._root.joinpath('package.tar.gz')
+        with tarfile.open(archive, 'w:gz') as tar_ip:
+            tar_ip.add(package, arcname='package')
+        context = PackageHandler(self._root.joinpath('cache')).prepare_context(archive,
+                                                                               payload=False)
+        self.assertIsNotNone(context.view.materialise('representations/rep1/data/RODA-in.png'))
+        # Every payload file was extracted by the first pass
+        archive.unlink()
+        with context.view.open('representations/rep1/data/more.txt') as stream:
+            self.assertEqual(stream.read(), b'more')
+        context.close()
+
+    def test_structure_metadata_only(self):
+        handler = PackageHandler(self._root)
+        _, selective = STRUCT.validate(handler.prepare_context(MIN_ZIP_PATH, payload=False))
+        _, extracted = STRUCT.validate(handler.prepare_context(MIN_ZIP_PATH, in_place=False))
+        self.assertEqual(selective, extracted)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Module containing tests covering manifest sampling."""
+import unittest
+from importlib_resources import files
+
+import tests.resources.ips.unpacked as UNPACKED
+
+from eark_validator.infopacks.manifest import Manifests
+from eark_validator.infopacks.sampling import (
+    ManifestSampler,
+    defect_bound,
+    is_required,
+    sample_size
+)
+
+PACKAGE = '733dc055-34be-4260-85c7-5549a7083031'
+
+class SamplingTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._manifest = Manifests.from_directory(files(UNPACKED).joinpath(PACKAGE), 'MD5')
+        cls._required = [ entry for entry in cls._manifest.entries if is_required(entry) ]
+
+    def test_required(self):
+        paths = [ str(entry.path) for entry in self._required ]
+        self.assertIn('METS.xml', paths)
+        self.assertIn('representations/rep1/METS.xml', paths)
+        self.assertIn('metadata/descriptive/ead2002.xml', paths)
+        self.assertLess(len(self._required), self._manifest.file_count)
+
+    def test_count(self):
+        sample, summary = ManifestSampler(count=2, seed=7).sample(self._manifest)
+        self.assertEqual(sample.file_count, len(self._required) + 2)
+        self.assertEqual(summary.file_count, sample.file_count)
+        self.assertEqual(summary.total_files, self._manifest.file_count)
+        self.assertEqual(summary.seed, 7)
+        self.assertLess(summary.fraction, 1.0)
+        self.assertGreater(summary.max_defect_rate, 0.0)
+
+    def test_seed_repeats(self):
+        first, _ = ManifestSampler(count=3, seed=42).sample(self._manifest)
+        second, _ = ManifestSampler(count=3, seed=42).sample(self._manifest)
+        self.assertEqual(first.entries, second.entries)
+        self.assertIsInstance(ManifestSampler().seed, int)
+
+    def test_manifest_order(self):
+        sample, _ = ManifestSampler(count=5, seed=1).sample(self._manifest)
+        positions = [ self._manifest.entries.index(entry) for entry in sample.entries ]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_byte_budget(self):
+        required_bytes = sum(entry.size for entry in self._required)
+        _, summary = ManifestSampler(max_bytes=1024, seed=3).sample(self._manifest)
+        self.assertLessEqual(summary.byte_count, required_bytes + 1024)
+        self.assertLess(summary.byte_fraction, 1.0)
+        # Files over the remaining budget are skipped, so no bound is claimed
+        self.assertGreater(summary.excluded_files, 0)
+        self.assertGreater(summary.excluded_bytes, 0)
+        self.assertIsNone(summary.max_defect_rate)
+        _, summary = ManifestSampler(max_bytes=10**9, seed=3).sample(self._manifest)
+        self.assertEqual(summary.excluded_files, 0)
+        self.assertEqual(summary.max_defect_rate, 0.0)
+
+    def test_no_limits(self):
+        sample, summary = ManifestSampler(seed=5).sample(self._manifest)
+        self.assertEqual(sample.file_count, self._manifest.file_count)
+        self.assertEqual(summary.fraction, 1.0)
+        self.assertEqual(summary.max_defect_rate, 0.0)
+
+    def test_confidence(self):
+        self.assertEqual(sample_size(0.95, 0.01), 299)
+        self.assertAlmostEqual(defect_bound(299, 10000, 0.95), 0.01, places=4)
+        self.assertEqual(defect_bound(0, 10, 0.95), 1.0)
+        _, summary = ManifestSampler(confidence=0.5, defect_rate=0.5, seed=9).sample(self._manifest)
+        self.assertEqual(summary.file_count, len(self._required) + 1)
+        self.assertEqual(summary.confidence, 0.5)
+        with self.assertRaises(ValueError):
+            ManifestSampler(confidence=1.0)
+        with self.assertRaises(ValueError):
+            ManifestSampler(defect_rate=0)
+
+    def test_validate_sample(self):
+        bad_root = files(UNPACKED).joinpath(PACKAGE + '-bad')
+        is_valid, issues, summary = Manifests.validate_sample(self._manifest,
+                                                              ManifestSampler(count=0, seed=2),
+                                                              bad_root)
+        # The METS and metadata files that differ are always sampled
+        self.assertFalse(is_valid)
+        self.assertEqual(len(issues), 3)
+        self.assertEqual(summary.file_count, len(self._required))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -28,6 +28,7 @@ import unittest
 from pathlib import Path
 
 from eark_validator import structure as STRUCT
+from eark_validator.infopacks.package_handler import PackageHandler
 from eark_validator.model import Severity
 from tests.utils_test import contains_rule_id
 
@@ -157,6 +158,18 @@ class StructValidationTests(unittest.TestCase):
         self.assertTrue(contains_rule_id(details.infos, 'CSIPSTR3',
                                          severity=Severity.INFORMATION))
 
+    def test_context_archive(self):
+        """Test that a prepared archive context is reported as an archive."""
+        ip_path = Path(os.path.join(self.ip_res_root, 'minimal',
+                               'minimal_IP_with_schemas.zip'))
+        context = PackageHandler().prepare_context(ip_path)
+        _, details = STRUCT.validate(context)
+        self.assertEqual(details.status, STRUCT.StructureStatus.WELLFORMED,
+                        EXP_WELLFORMED.format(details.status))
+        self.assertFalse(contains_rule_id(details.messages, 'CSIPSTR3',
+                                          severity=Severity.INFORMATION))
+        self.assertEqual(STRUCT.StructureChecker(context).name, 'minimal_IP_with_schemas.zip')
+
     def test_str4_nomets(self):
         """Test package with no METS.xml file"""
         ip_path = Path(os.path.join(self.ip_res_root, 'struct',
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Module containing tests covering the I/O rate limiter."""
+import os
+from pathlib import Path
+import tempfile
+import time
+import unittest
+
+from eark_validator.infopacks.archives import extract_members, stream_tar
+from eark_validator.infopacks.manifest import Manifests, MultiChecksummer
+from eark_validator.infopacks.throttle import IOThrottle
+from eark_validator.model import ChecksumAlg
+
+MIN_ROOT = os.path.join(os.path.dirname(__file__), 'resources', 'ips', 'minimal')
+MIN_TAR_PATH = Path(os.path.join(MIN_ROOT, 'minimal_IP_with_schemas.tar'))
+MIN_ZIP_PATH = Path(os.path.join(MIN_ROOT, 'minimal_IP_with_schemas.zip'))
+GOOD_PATH = Path(os.path.join(os.path.dirname(__file__), 'resources', 'ips', 'unpacked',
+                              '733dc055-34be-4260-85c7-5549a7083031'))
+
+class IOThrottleTest(unittest.TestCase):
+    def test_unlimited(self):
+        throttle = IOThrottle()
+        self.assertIsNone(throttle.bytes_per_second)
+        self.assertEqual(throttle.consume(1024 * 1024 * 1024), 0.0)
+        self.assertEqual(throttle.statistics.bytes, 1024 * 1024 * 1024)
+        self.assertEqual(throttle.statistics.operations, 1)
+
+    def test_byte_rate(self):
+        throttle = IOThrottle(bytes_per_second=100_000, burst=0.1)
+        start = time.monotonic()
+        # The burst allowance is spent first, the rest is delayed
+        for _ in range(3):
+            throttle.consume(10_000)
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+        self.assertGreater(throttle.statistics.waited, 0.0)
+
+    def test_iops(self):
+        throttle = IOThrottle(iops=100, burst=0.01)
+        start = time.monotonic()
+        for _ in range(11):
+            throttle.consume(0)
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+        self.assertEqual(throttle.statistics.operations, 11)
+
+    def test_adjust(self):
+        throttle = IOThrottle(bytes_per_second=1000)
+        self.assertGreater(throttle.consume(1000), 0.5)
+        throttle.bytes_per_second = None
+        self.assertEqual(throttle.consume(1000), 0.0)
+        throttle.iops = 10
+        self.assertEqual(throttle.iops, 10)
+        with self.assertRaises(ValueError):
+            throttle.bytes_per_second = 0
+        with self.assertRaises(ValueError):
+            IOThrottle(burst=0)
+
+    def test_hashing(self):
+        throttle = IOThrottle(bytes_per_second=1024 * 1024 * 1024)
+        mets = GOOD_PATH.joinpath('METS.xml')
+        MultiChecksummer([ ChecksumAlg.MD5 ], throttle=throttle).hash_file(mets)
+        self.assertEqual(throttle.statistics.bytes, os.path.getsize(mets))
+
+    def test_manifest(self):
+        throttle = IOThrottle(bytes_per_second=1024 * 1024 * 1024, iops=100_000)
+        manifest = Manifests.from_directory(GOOD_PATH, 'MD5', throttle=throttle)
+        self.assertEqual(throttle.statistics.bytes, manifest.total_size)
+        self.assertGreaterEqual(throttle.statistics.operations, manifest.file_count * 2)
+        throttle = IOThrottle(bytes_per_second=1024 * 1024 * 1024)
+        is_valid, _ = Manifests.validate_manifest(manifest, throttle=throttle)
+        self.assertTrue(is_valid)
+        self.assertEqual(throttle.statistics.bytes, manifest.total_size)
+
+    def test_extraction(self):
+        with tempfile.TemporaryDirectory() as dest:
+            throttle = IOThrottle(bytes_per_second=1024 * 1024 * 1024)
+            stats = extract_members(MIN_ZIP_PATH, Path(dest), throttle=throttle)
+            self.assertEqual(throttle.statistics.bytes, stats.bytes)
+        with tempfile.TemporaryDirectory() as dest:
+            throttle = IOThrottle(bytes_per_second=1024 * 1024 * 1024)
+            extract_members(MIN_TAR_PATH, Path(dest), throttle=throttle)
+            self.assertEqual(throttle.statistics.bytes, os.path.getsize(MIN_TAR_PATH))
+        with tempfile.TemporaryDirectory() as dest:
+            throttle = IOThrottle(bytes_per_second=1024 * 1024 * 1024)
+            stream_tar(MIN_TAR_PATH, Path(dest), throttle=throttle)
+            self.assertEqual(throttle.statistics.bytes, os.path.getsize(MIN_TAR_PATH))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# E-ARK Validation
+# Copyright (C) 2019
+# All rights reserved.
+#
+# Licensed to the E-ARK project under one
+# or more contributor license agreements. See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership. The E-ARK project licenses
+# this file to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License. You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Module containing tests covering the unpacked archive cache."""
+import os
+from pathlib import Path
+import tempfile
+import threading
+import unittest
+
+from eark_validator.infopacks.package_handler import PackageHandler
+from eark_validator.infopacks.unpack_cache import UnpackCache
+
+MIN_ZIP_PATH = Path(os.path.join(os.path.dirname(__file__), 'resources', 'ips', 'minimal',
+                                 'minimal_IP_with_schemas.zip'))
+
+def _populate(size: int):
+    def populate(destination: Path) -> None:
+        destination.mkdir(parents=True)
+        with open(destination.joinpath('content.bin'), 'wb') as file:
+            file.write(b'0' * size)
+    return populate
+
+def _fail(destination: Path) -> None:
+    destination.mkdir(parents=True)
+    destination.joinpath('partial.bin').write_bytes(b'partial')
+    raise OSError('Extraction failed')
+
+class UnpackCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._test_dir = tempfile.TemporaryDirectory()
+        self._root = Path(self._test_dir.name)
+
+    def tearDown(self):
+        self._test_dir.cleanup()
+
+    def test_reuse(self):
+        cache = UnpackCache(self._root)
+        calls = []
+        def populate(destination: Path) -> None:
+            calls.append(destination)
+            _populate(10)(destination)
+        first = cache.get_or_create('key', populate)
+        second = cache.get_or_create('key', populate)
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(cache.is_complete('key'))
+        self.assertEqual(cache.statistics.hits, 1)
+        self.assertEqual(cache.statistics.misses, 1)
+        self.assertEqual(cache.statistics.hit_rate, 0.5)
+
+    def test_reuse_across_instances(self):
+        UnpackCache(self._root).get_or_create('key', _populate(10))
+        cache = UnpackCache(self._root)
+        cache.get_or_create('key', _fail)
+        self.assertEqual(cache.statistics.hits, 1)
+
+    def test_partial_discarded(self):
+        cache = UnpackCache(self._root)
+        with self.assertRaises(OSError):
+            cache.get_or_create('key', _fail)
+        self.assertFalse(cache.is_complete('key'))
+        self.assertFalse(cache.entry_path('key').exists())
+        entry = cache.get_or_create('key', _populate(10))
+        self.assertEqual(os.listdir(entry), [ 'content.bin' ])
+
+    def test_size(self):
+        cache = UnpackCache(self._root)
+        cache.get_or_create('one', _populate(10))
+        cache.get_or_create('two', _populate(20))
+        self.assertEqual(cache.size(), 30)
+
+    def test_evict_lru(self):
+        cache = UnpackCache(self._root, max_bytes=25)
+        cache.get_or_create('one', _populate(10))
+        os.utime(self._root.joinpath('one.complete'), (0, 0))
+        cache.get_or_create('two', _populate(10))
+        os.utime(self._root.joinpath('two.complete'), (1, 1))
+        cache.get_or_create('three', _populate(10))
+        self.assertFalse(cache.is_complete('one'))
+        self.assertTrue(cache.is_complete('two'))
+        self.assertTrue(cache.is_complete('three'))
+        self.assertEqual(cache.statistics.evictions, 1)
+
+    def test_evict_skips_locked(self):
+        cache = UnpackCache(self._root)
+        cache.get_or_create('one', _populate(10))
+        cache.get_or_create('two', _populate(10))
+        cache.max_bytes = 0
+        with cache.lock('one'):
+            self.assertEqual(cache.evict(), 1)
+        self.assertTrue(cache.is_complete('one'))
+        self.assertFalse(cache.is_complete('two'))
+
+    def test_concurrent_workers(self):
+        cache = UnpackCache(self._root)
+        calls = []
+        def populate(destination: Path) -> None:
+            calls.append(destination)
+            _populate(10)(destination)
+        workers = [ threading.Thread(target=cache.get_or_create, args=('key', populate))
+                    for _ in range(4) ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.statistics.hits, 3)
+
+    def test_clear(self):
+        cache = UnpackCache(self._root)
+        cache.get_or_create('key', _populate(10))
+        cache.clear()
+        self.assertFalse(cache.is_complete('key'))
+        self.assertEqual(cache.size(), 0)
+
+    def test_evict_skips_leased(self):
+        cache = UnpackCache(self._root)
+        lease = cache.acquire('one', _populate(10))
+        cache.get_or_create('two', _populate(10))
+        cache.max_bytes = 0
+        self.assertEqual(cache.evict(), 1)
+        cache.clear()
+        self.assertTrue(cache.is_complete('one'))
+        self.assertTrue(lease.path.joinpath('content.bin').is_file())
+        lease.close()
+        self.assertEqual(cache.evict(), 1)
+        self.assertFalse(cache.is_complete('one'))
+        # Lock files are removed with their entries
+        self.assertEqual(sorted(os.listdir(self._root)), [])
+
+    def test_lease(self):
+        cache = UnpackCache(self._root)
+        self.assertIsNone(cache.lease('key'))
+        cache.get_or_create('key', _populate(10))
+        with cache.lease('key') as first, cache.lease('key') as second:
+            self.assertEqual(first.path, second.path)
+            cache.clear()
+            self.assertTrue(cache.is_complete('key'))
+        cache.clear()
+        self.assertFalse(cache.is_complete('key'))
+
+    def test_context_lease(self):
+        handler = PackageHandler(self._root, max_cache_bytes=0)
+        context = handler.prepare_context(MIN_ZIP_PATH, in_place=False)
+        self.assertEqual(handler.cache.evict(), 0)
+        self.assertTrue(context.view.is_file('METS.xml'))
+        context.close()
+        self.assertEqual(handler.cache.evict(), 1)
+        self.assertFalse(context.root.exists())
+
+    def test_package_handler_reuse(self):
+        handler = PackageHandler(self._root)
+        first = handler.unpack_package(MIN_ZIP_PATH)
+        second = handler.unpack_package(MIN_ZIP_PATH)
+        self.assertEqual(first, second)
+        self.assertEqual(handler.cache.statistics.misses, 1)
+        self.assertEqual(handler.cache.statistics.hits, 1)
+
+if __name__ == '__main__':
+    unittest.main()